@@ -2,14 +2,14 @@ import datetime
 import functools
 import random
 import os
-import subprocess
 import tempfile
 import logging
 import hashlib
 import pytz
 import tiktoken
 
-from project_utils.constants import PythonConstants
+from project_utils import process_runner, tracing
+from project_utils.constants import ProcessConstants, PythonConstants
 
 
 class ISTFormatter(logging.Formatter):
@@ -81,12 +81,26 @@ def get_ist_time():
     return formatted_time
 
 
-def execute_bash_script(script: str):
+def summarize_bash_script(script_content: str, max_length: int = 300) -> str:
+    """Joins the commands of a script (without comments and the conda hook) into one line, eg: for traces."""
+    if not tracing.is_enabled():
+        return ""
+    commands = [
+        x.strip()
+        for x in script_content.split("\n")
+        if x.strip() and not x.strip().startswith("#") and "conda shell.bash hook" not in x
+    ]
+    return " ; ".join(commands)[:max_length]
+
+
+def execute_bash_script(script: str, timeout: float = ProcessConstants.BASH_TIMEOUT_SEC, **run_kwargs):
     """
     Execute a bash script with the given content.
 
     Args:
         script (str): The script can either be the path to a bash file or the contents of the bash file itself.
+        timeout (float, optional): Seconds after which the script (and everything it started) is killed.
+        **run_kwargs: Passed to `process_runner.run_process` (eg: `on_stdout`, `cancel_event`).
 
     Returns:
         dict: A dictionary containing the following keys:
@@ -95,6 +109,9 @@ def execute_bash_script(script: str):
             - 'exit_status': The exit status code of the executed script.
             - 'script_content': The content of the script that was executed.
             - 'running_timestamp': The timestamp when the script was executed.
+            - 'timed_out': Whether the script was killed because of the timeout.
+            - 'wall_sec': The duration of the script.
+            - 'max_rss_kb': The max resident set size of the script (and its waited-for descendants).
     """
 
     # script can either be the path to a bash file or the contents of the
@@ -114,13 +131,20 @@ def execute_bash_script(script: str):
         else:
             script_content = open(script_path, "r").read()
         assert os.path.exists(script_path)
-        result = subprocess.run(["bash", script_path], capture_output=True, text=True)
+        with tracing.span(
+            "bash", "subprocess", commands=summarize_bash_script(script_content)
+        ) as span:
+            result = process_runner.run_process(["bash", script_path], timeout=timeout, **run_kwargs)
+            span.set(exit_status=result.exit_status, timed_out=result.timed_out, max_rss_kb=result.max_rss_kb)
     return {
         "stdout": result.stdout,
         "stderr": result.stderr,
-        "exit_status": result.returncode,
+        "exit_status": result.exit_status,
         "script_content": script_content,
         "running_timestamp": get_ist_time(),
+        "timed_out": result.timed_out,
+        "wall_sec": result.wall_sec,
+        "max_rss_kb": result.max_rss_kb,
     }
 
 
@@ -160,6 +184,12 @@ def with_tempfile(prefix="", dir=PythonConstants.DIR_TEMP_FILES):
     return decorator
 
 
+@functools.lru_cache(maxsize=None)
+def get_token_encoder(model_name: str = "gpt-3.5-turbo"):
+    """Returns the (process-wide cached) tiktoken encoding used to count tokens."""
+    return tiktoken.encoding_for_model(model_name)
+
+
 def estimate_token_cnt(code: str) -> int:
     """Estimate the number of tokens in the given code.
 
@@ -169,8 +199,7 @@ def estimate_token_cnt(code: str) -> int:
     Returns:
         int: The estimated number of tokens in the code.
     """
-    encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-    tokens = encoding.encode(code)
+    tokens = get_token_encoder().encode(code)
     return len(tokens)
 
 
@@ -186,12 +215,73 @@ def truncate_string_per_token(string_to_truncate, tokens_to_keep):
         str: The truncated string.
 
     """
-    encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+    encoding = get_token_encoder()
     tokens = encoding.encode(string_to_truncate)
     # logger.debug(f"Truncating from {len(tokens)} to {tokens_to_keep}")
     return encoding.decode(tokens[:tokens_to_keep])
 
 
+class TokenBudgetBuilder:
+    """
+    Assembles a string out of fragments while keeping it within a token budget.
+
+    Every fragment is encoded exactly once and the token count of the string is tracked as a running
+    total (the sum of the fragment counts). Fragments are kept whole while they fit; the first one
+    which does not fit is cut to the remaining budget (if `truncate_overflow`), and every later
+    fragment is dropped.
+    """
+
+    def __init__(self, max_tokens: int, truncate_overflow: bool = True):
+        """
+        Args:
+            max_tokens (int): The token budget.
+            truncate_overflow (bool): Whether to keep the prefix of the first fragment which overflows the budget.
+        """
+        self.max_tokens = max_tokens
+        self.truncate_overflow = truncate_overflow
+        self.encoding = get_token_encoder()
+        self.fragments = []
+        self.token_cnt = 0
+        self.dropped_fragments = 0
+
+    @property
+    def remaining_tokens(self) -> int:
+        return max(self.max_tokens - self.token_cnt, 0)
+
+    @property
+    def is_full(self) -> bool:
+        return self.token_cnt >= self.max_tokens or self.dropped_fragments > 0
+
+    def add(self, fragment: str) -> bool:
+        """
+        Appends a fragment, if it fits in the remaining budget.
+
+        Args:
+            fragment (str): The fragment to append.
+
+        Returns:
+            bool: True if the whole fragment was appended.
+        """
+        if self.is_full:
+            self.dropped_fragments += 1
+            return False
+        tokens = self.encoding.encode(fragment)
+        if len(tokens) <= self.remaining_tokens:
+            self.fragments.append(fragment)
+            self.token_cnt += len(tokens)
+            return True
+        if self.truncate_overflow and self.remaining_tokens > 0:
+            tokens = tokens[: self.remaining_tokens]
+            self.fragments.append(self.encoding.decode(tokens))
+            self.token_cnt += len(tokens)
+        self.dropped_fragments += 1
+        return False
+
+    def build(self) -> str:
+        """Returns the concatenation of the appended fragments."""
+        return "".join(self.fragments)
+
+
 def fetch_hash(message) -> str:
     """
     Calculates the SHA256 hash of the given message.
@@ -56,6 +56,25 @@ class PythonConstants(Constants):
     if not os.path.exists(DIR_TEMP_FILES):
         os.makedirs(DIR_TEMP_FILES, exist_ok=True)
 
+    # Share one conda environment between all the tasks with the same install spec (repo, version,
+    # python, packages, ...). When disabled, every issue gets its own environment (named after it).
+    SHARE_CONDA_ENVS = os.environ.get('RCB_SHARE_CONDA_ENVS', '1') == '1'
+
+    # Lock files serializing the creation of a given conda environment across processes
+    DIR_FOR_CONDA_ENV_LOCKS = os.path.join(TMP_FOLDER_FOR_PYTHON, 'conda_env_locks')
+    if not os.path.exists(DIR_FOR_CONDA_ENV_LOCKS):
+        os.makedirs(DIR_FOR_CONDA_ENV_LOCKS, exist_ok=True)
+
+    # Package caches shared by all the environment builds (see `provision_environments.py`)
+    SHARED_CONDA_PKGS_DIR = os.environ.get(
+        'RCB_CONDA_PKGS_DIR', os.path.join(TMP_FOLDER_FOR_PYTHON, 'conda_pkgs'))
+    SHARED_PIP_CACHE_DIR = os.environ.get(
+        'RCB_PIP_CACHE_DIR', os.path.join(TMP_FOLDER_FOR_PYTHON, 'pip_cache'))
+
+    # Prebuilt (relocatable) environment packs, restored by extraction on fresh nodes
+    DIR_FOR_ENV_PACKS = os.environ.get(
+        'RCB_ENV_PACKS_DIR', os.path.join(TMP_FOLDER_FOR_PYTHON, 'env_packs'))
+
     # Method related
     MAX_TOKENS_ALLOWED_IN_FEEDBACK = 2500
 
@@ -76,6 +95,10 @@ class PythonConstants(Constants):
     if not os.path.exists(DIR_FOR_TOOL_INFO_CACHE):
         os.makedirs(DIR_FOR_TOOL_INFO_CACHE)
 
+    # for caching the task files with the ground truth class deleted
+    DIR_FOR_PLACEHOLDER_FILE_CACHE = os.path.join(TMP_FOLDER_FOR_PYTHON, 'PLACEHOLDER_FILE_CACHE')
+    os.makedirs(DIR_FOR_PLACEHOLDER_FILE_CACHE, exist_ok=True)
+
     CACHE_FOR_UNIXCODER_EMBEDDINGS = os.path.join(TOOL_OUTPUT_CACHE_DIR, 'cache_unixcoder')
     if not os.path.exists(CACHE_FOR_UNIXCODER_EMBEDDINGS):
         os.makedirs(CACHE_FOR_UNIXCODER_EMBEDDINGS)
@@ -86,3 +109,154 @@ class PythonConstants(Constants):
     REPOCODER_SLIDING_SIZE = 10
 
 
+class DatasetConstants(Constants):
+    """
+    Configuration class for accessing the RepoClassBench task files.
+    """
+
+    # Directory holding `<language>_data.json`
+    DATA_INPUT_DIR = os.path.join(os.path.dirname(__file__), '../data/input')
+
+    # Directory holding the per-language results of benchmark runs (see `repoclassbench/runner.py`)
+    DATA_OUTPUT_DIR = os.environ.get(
+        'RCB_DATA_OUTPUT_DIR', os.path.join(os.path.dirname(__file__), '../data/output'))
+
+    # Either `json` (parse the task file once per process) or `sqlite` (compact on-disk index with
+    # lazily loaded large fields, shared across processes)
+    DATASET_BACKEND = os.environ.get('RCB_DATASET_BACKEND', 'json')
+
+    # Where the sqlite version of the task files is stored
+    DATASET_CACHE_DIR = os.path.join(
+        os.path.dirname(__file__), '../temp/dataset_cache')
+
+    # Large fields which are only loaded on access by the sqlite backend
+    LAZY_FIELDS = ('ground_truth_class_body',
+                   'detailed_description', 'sketchy_description')
+
+    # Background preparation of upcoming tasks (see `repoclassbench/dataset/prefetch.py`)
+    PREFETCH_LOOKAHEAD = int(os.environ.get('RCB_PREFETCH_LOOKAHEAD', 2))
+    PREFETCH_MAX_WORKERS = int(os.environ.get('RCB_PREFETCH_MAX_WORKERS', 2))
+
+
+class TraceConstants(Constants):
+    """
+    Configuration class for the span tracing of setup, tools and evaluation (see `project_utils/tracing.py`).
+    """
+
+    TRACE_ENABLED = os.environ.get('RCB_TRACE', '0') == '1'
+
+    # Where the per-task Chrome traces and the per-process summaries are written
+    TRACE_DIR = os.environ.get(
+        'RCB_TRACE_DIR', os.path.join(os.path.dirname(__file__), '../temp/traces'))
+
+
+class ProcessConstants(Constants):
+    """
+    Configuration class for the subprocesses run by setup and evaluation (see `project_utils/process_runner.py`).
+    """
+
+    # Timeouts (in seconds) after which the process group is killed. Unset / empty means no timeout.
+    BASH_TIMEOUT_SEC = (
+        float(os.environ['RCB_BASH_TIMEOUT_SEC'])
+        if os.environ.get('RCB_BASH_TIMEOUT_SEC') else None)
+    PYTEST_TIMEOUT_SEC = float(os.environ.get('RCB_PYTEST_TIMEOUT_SEC', 1800))
+    MAVEN_TIMEOUT_SEC = float(os.environ.get('RCB_MAVEN_TIMEOUT_SEC', 1800))
+    DOTNET_TIMEOUT_SEC = float(os.environ.get('RCB_DOTNET_TIMEOUT_SEC', 1800))
+
+    # Delay between the SIGTERM and the SIGKILL of a process group
+    KILL_GRACE_SEC = float(os.environ.get('RCB_KILL_GRACE_SEC', 10))
+
+    # Bytes of each output stream kept in memory; longer outputs can be written in full to SPILL_DIR
+    MAX_OUTPUT_BYTES = int(os.environ.get('RCB_MAX_OUTPUT_BYTES', 64 * 1024 * 1024))
+    SPILL_DIR = os.environ.get(
+        'RCB_PROCESS_SPILL_DIR', os.path.join(os.path.dirname(__file__), '../temp/process_output'))
+    # Spill files left over by their callers are removed after this long
+    SPILL_MAX_AGE_SEC = float(os.environ.get('RCB_PROCESS_SPILL_MAX_AGE_SEC', 24 * 60 * 60))
+
+    # Max number of concurrent processes per group, eg: "maven=2,dotnet=2"
+    CONCURRENCY_LIMITS = {
+        group.strip(): int(limit)
+        for group, limit in (
+            item.split('=') for item in os.environ.get('RCB_PROCESS_LIMITS', '').split(',') if '=' in item)
+    }
+
+
+class JavaConstants(Constants):
+    """
+    Configuration class for the evaluation of the Java tasks.
+    """
+
+    # "mvn": a cold `mvn test` per candidate.
+    # "daemon": a warm Maven daemon (mvnd), an offline local repository and incremental builds
+    # (see `repoclassbench/evaluator/java_evaluator_utils/maven_session.py`).
+    # "javac": the candidate is compiled with javac against the precompiled module and the test class
+    # is run with the JUnit console launcher (see `repoclassbench/evaluator/java_evaluator_utils/direct_runner.py`).
+    EVAL_MODE = os.environ.get('RCB_JAVA_EVAL_MODE', 'mvn')
+
+    # The Maven daemon executable (`mvnd` from the PATH is used if it does not exist)
+    MVND_PATH = os.environ.get(
+        'RCB_MVND_PATH', os.path.join(os.path.dirname(__file__), '../external/java/maven-mvnd/bin/mvnd'))
+
+    # Local repository of the "daemon" mode, seeded by the first (online) run of each module
+    MAVEN_LOCAL_REPO = os.environ.get(
+        'RCB_MAVEN_LOCAL_REPO', os.path.join(os.path.dirname(__file__), '../temp/java/m2_repository'))
+
+    # State of the "daemon" mode sessions (seeding, compiled API and sources), by module
+    MAVEN_SESSION_DIR = os.environ.get(
+        'RCB_MAVEN_SESSION_DIR', os.path.join(os.path.dirname(__file__), '../temp/java/maven_sessions'))
+
+    # JUnit console launcher of the "javac" mode (downloaded through Maven if missing)
+    JUNIT_CONSOLE_VERSION = '1.9.3'
+    JUNIT_CONSOLE_JAR = os.environ.get(
+        'RCB_JUNIT_CONSOLE_JAR',
+        os.path.join(os.path.dirname(__file__),
+                     f'../external/java/junit-platform-console-standalone-{JUNIT_CONSOLE_VERSION}.jar'))
+
+    # Cached classpaths and per-candidate class overlays of the "javac" mode
+    DIRECT_WORK_DIR = os.environ.get(
+        'RCB_JAVA_DIRECT_WORK_DIR', os.path.join(os.path.dirname(__file__), '../temp/java/direct_runner'))
+
+    # The local Maven repository shared (read-only) by the Java evaluation sandboxes, which each
+    # get a hardlinked overlay of it (see `repoclassbench/evaluator/java_evaluator_utils/sandbox.py`)
+    SHARED_MAVEN_REPO = os.environ.get(
+        'RCB_SHARED_MAVEN_REPO', os.path.expanduser('~/.m2/repository'))
+    SANDBOX_DIR = os.environ.get(
+        'RCB_JAVA_SANDBOX_DIR', os.path.join(os.path.dirname(__file__), '../temp/java/sandboxes'))
+
+    # Number of concurrent evaluations of `evaluate_many`
+    EVAL_WORKERS = int(os.environ.get('RCB_JAVA_EVAL_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+    # Persisted symbol indexes of the repositories explored by the Java tools
+    # (see `repotools/java_tools/symbol_index.py`)
+    SYMBOL_INDEX_DIR = os.environ.get(
+        'RCB_JAVA_SYMBOL_INDEX_DIR', os.path.join(os.path.dirname(__file__), '../temp/java/symbol_index'))
+
+    # Per-snippet embeddings of the Java UniXcoder, keyed by the hash of the snippet content (one
+    # subdirectory per repository)
+    EMBEDDING_CACHE_DIR = os.environ.get(
+        'RCB_JAVA_EMBEDDING_CACHE_DIR', os.path.join(os.path.dirname(__file__), '../temp/java/unixcoder_cache'))
+    # The persisted embeddings are merged into one file once they span this many files
+    EMBEDDING_CACHE_MAX_SHARDS = int(os.environ.get('RCB_JAVA_EMBEDDING_CACHE_MAX_SHARDS', 32))
+    # The embeddings of the repositories scored last are kept in memory, in one store per repository
+    EMBEDDING_CACHE_MAX_REPOS = int(os.environ.get('RCB_JAVA_EMBEDDING_CACHE_MAX_REPOS', 2))
+    # Embeddings computed without being persisted (`use_cache=False`) kept in memory, per repository
+    EMBEDDING_CACHE_MAX_UNPERSISTED = int(os.environ.get('RCB_JAVA_EMBEDDING_CACHE_MAX_UNPERSISTED', 20000))
+
+    # Eclipse JDT LS servers are kept alive between the `JavaTools` of a repository
+    # (see `repotools/java_tools/server_pool.py`), with their workspace data persisted here
+    JDTLS_WORKSPACE_DIR = os.environ.get(
+        'RCB_JDTLS_WORKSPACE_DIR', os.path.join(os.path.dirname(__file__), '../temp/java/jdtls_workspaces'))
+    # Index of the JDK and library classes, shared by all the servers
+    JDTLS_SHARED_INDEX_DIR = os.environ.get(
+        'RCB_JDTLS_SHARED_INDEX_DIR', os.path.join(os.path.dirname(__file__), '../temp/java/working_repo/.cache/.jdt/index'))
+    # Idle servers are stopped (least recently used first) while the servers use more memory than this
+    JDTLS_POOL_MEMORY_MB = int(os.environ.get('RCB_JDTLS_POOL_MEMORY_MB', 8192))
+    # Seconds to wait for a server to be ready before using it anyway
+    JDTLS_START_TIMEOUT_SEC = float(os.environ.get('RCB_JDTLS_START_TIMEOUT_SEC', 10))
+    # Documents the completion probes of the Java tools run in concurrently (a class info takes 6 probes)
+    JDTLS_PROBE_DOCUMENTS = int(os.environ.get('RCB_JDTLS_PROBE_DOCUMENTS', 6))
+
+    # Cached class infos and signatures of the Java tools, by source fingerprint of the repository
+    # (see `repotools/java_tools/result_cache.py`)
+    TOOL_RESULT_CACHE_DIR = os.environ.get(
+        'RCB_JAVA_TOOL_RESULT_CACHE_DIR', os.path.join(os.path.dirname(__file__), '../temp/java/tool_results'))
@@ -0,0 +1,265 @@
+"""Process-wide, indexed access to the RepoClassBench task files (`data/input/<language>_data.json`).
+
+Every dataset, evaluator and repo-initializer used to re-open and re-parse the task file and scan it
+linearly for its task. The store parses each file once per process, keeps a `task_id -> record`
+index, and is shared by all three languages.
+
+With `RCB_DATASET_BACKEND=sqlite`, the task file is additionally converted (once, and again whenever
+the JSON file changes) into a compact sqlite database. Processes then only read the small fields of
+each record, while large fields such as `ground_truth_class_body` and the descriptions are fetched
+lazily on first access.
+
+NOTE: Records are shared across callers and must be treated as read-only.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from project_utils.constants import DatasetConstants
+
+SUPPORTED_LANGUAGES = ("python", "java", "csharp")
+
+# (language, backend) -> DatasetStore
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_data_file_path(language: str) -> str:
+    """Returns the path to the task file of the given language."""
+    assert language in SUPPORTED_LANGUAGES, f"Unsupported language: {language}"
+    return os.path.normpath(
+        os.path.join(DatasetConstants.DATA_INPUT_DIR, f"{language}_data.json")
+    )
+
+
+class LazyTaskRecord(dict):
+    """
+    A task record whose large fields are only read from the sqlite database on first access.
+
+    Behaves like a regular dictionary for item access, `get` and membership checks.
+    """
+
+    def __init__(self, small_fields: dict, lazy_keys, loader):
+        super().__init__(small_fields)
+        self._lazy_keys = set(lazy_keys)
+        self._loader = loader
+
+    def __missing__(self, key):
+        if key not in self._lazy_keys:
+            raise KeyError(key)
+        value = self._loader(self["task_id"], key)
+        self[key] = value
+        return value
+
+    def __contains__(self, key):
+        return super().__contains__(key) or key in self._lazy_keys
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def materialize(self) -> dict:
+        """Returns a plain dictionary with all the fields loaded."""
+        return {key: self[key] for key in list(self.keys()) + sorted(self._lazy_keys)}
+
+
+class DatasetStore:
+    """
+    Indexed, in-memory view of the task file of one language.
+
+    Args:
+        language (str): One of `SUPPORTED_LANGUAGES`.
+        backend (str): `json` or `sqlite`.
+    """
+
+    def __init__(self, language: str, backend: str = "json"):
+        assert backend in ["json", "sqlite"], f"Unsupported backend: {backend}"
+        self.language = language
+        self.backend = backend
+        self.data_file_path = get_data_file_path(language)
+        assert os.path.exists(self.data_file_path)
+
+        self._connection = None
+        self._connection_lock = threading.Lock()
+        if backend == "json":
+            with open(self.data_file_path, "r") as f:
+                self.records = json.load(f)
+        else:
+            self.records = self._load_from_sqlite()
+
+        # task_id -> position in the dataset
+        self.index = {}
+        for i, record in enumerate(self.records):
+            assert record["task_id"] not in self.index, (
+                f"Duplicate task_id: {record['task_id']}"
+            )
+            self.index[record["task_id"]] = i
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, i: int) -> dict:
+        return self.records[i]
+
+    @property
+    def task_ids(self):
+        """The task IDs in dataset order."""
+        return [record["task_id"] for record in self.records]
+
+    def get(self, task_id: str):
+        """
+        Fetches the record of the given task.
+
+        Args:
+            task_id (str): The RepoClassBench task ID.
+
+        Returns:
+            dict: The task record, or None if no such task exists.
+        """
+        i = self.index.get(task_id)
+        return None if i is None else self.records[i]
+
+    ############################################
+    # sqlite backend
+    @property
+    def sqlite_path(self) -> str:
+        return os.path.join(DatasetConstants.DATASET_CACHE_DIR, f"{self.language}.sqlite")
+
+    def _source_signature(self) -> str:
+        file_stat = os.stat(self.data_file_path)
+        return f"{file_stat.st_size}:{file_stat.st_mtime_ns}"
+
+    def _get_connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+        return self._connection
+
+    def _is_sqlite_fresh(self) -> bool:
+        if not os.path.exists(self.sqlite_path):
+            return False
+        try:
+            row = self._get_connection().execute(
+                "SELECT value FROM meta WHERE key = 'source_signature'"
+            ).fetchone()
+        except sqlite3.DatabaseError:
+            return False
+        return row is not None and row[0] == self._source_signature()
+
+    def _build_sqlite(self):
+        """(Re)creates the sqlite version of the task file."""
+        os.makedirs(DatasetConstants.DATASET_CACHE_DIR, exist_ok=True)
+        with open(self.data_file_path, "r") as f:
+            records = json.load(f)
+
+        # Build next to the final location and swap it in, so that concurrent readers never see a partial database
+        tmp_path = f"{self.sqlite_path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        connection = sqlite3.connect(tmp_path)
+        connection.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE tasks (idx INTEGER PRIMARY KEY, task_id TEXT UNIQUE, record TEXT);
+            CREATE TABLE lazy_fields (task_id TEXT, field TEXT, value TEXT, PRIMARY KEY (task_id, field));
+            """
+        )
+        for i, record in enumerate(records):
+            small_fields = {
+                k: v for k, v in record.items() if k not in DatasetConstants.LAZY_FIELDS
+            }
+            small_fields["__lazy_keys__"] = [
+                k for k in DatasetConstants.LAZY_FIELDS if k in record
+            ]
+            connection.execute(
+                "INSERT INTO tasks VALUES (?, ?, ?)",
+                (i, record["task_id"], json.dumps(small_fields)),
+            )
+            connection.executemany(
+                "INSERT INTO lazy_fields VALUES (?, ?, ?)",
+                [
+                    (record["task_id"], k, json.dumps(record[k]))
+                    for k in small_fields["__lazy_keys__"]
+                ],
+            )
+        connection.execute(
+            "INSERT INTO meta VALUES ('source_signature', ?)", (self._source_signature(),)
+        )
+        connection.commit()
+        connection.close()
+
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        os.replace(tmp_path, self.sqlite_path)
+
+    def _load_lazy_field(self, task_id: str, field: str):
+        with self._connection_lock:
+            row = (
+                self._get_connection()
+                .execute(
+                    "SELECT value FROM lazy_fields WHERE task_id = ? AND field = ?",
+                    (task_id, field),
+                )
+                .fetchone()
+            )
+        if row is None:
+            raise KeyError(field)
+        return json.loads(row[0])
+
+    def _load_from_sqlite(self):
+        with self._connection_lock:
+            if not self._is_sqlite_fresh():
+                self._build_sqlite()
+            rows = (
+                self._get_connection()
+                .execute("SELECT record FROM tasks ORDER BY idx")
+                .fetchall()
+            )
+        records = []
+        for (serialized_record,) in rows:
+            small_fields = json.loads(serialized_record)
+            lazy_keys = small_fields.pop("__lazy_keys__")
+            records.append(
+                LazyTaskRecord(small_fields, lazy_keys, self._load_lazy_field)
+            )
+        return records
+
+
+def get_dataset_store(language: str, backend: str = None) -> DatasetStore:
+    """
+    Returns the process-wide store for the given language, loading it on first use.
+
+    Args:
+        language (str): One of `SUPPORTED_LANGUAGES`.
+        backend (str, optional): `json` or `sqlite`. Defaults to `DatasetConstants.DATASET_BACKEND`.
+
+    Returns:
+        DatasetStore: The shared store.
+    """
+    backend = backend or DatasetConstants.DATASET_BACKEND
+    key = (language, backend)
+    if key not in _STORES:
+        with _STORES_LOCK:
+            if key not in _STORES:
+                _STORES[key] = DatasetStore(language, backend)
+    return _STORES[key]
+
+
+def load_dataset(language: str) -> list:
+    """Returns all the (shared, read-only) task records of the given language in dataset order."""
+    return get_dataset_store(language).records
+
+
+def fetch_task_elem(language: str, task_id: str):
+    """
+    Fetches the (shared, read-only) record of a task.
+
+    Args:
+        language (str): One of `SUPPORTED_LANGUAGES`.
+        task_id (str): The RepoClassBench task ID.
+
+    Returns:
+        dict: The task record, or None if not found.
+    """
+    return get_dataset_store(language).get(task_id)
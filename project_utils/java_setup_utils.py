@@ -0,0 +1,206 @@
+"""One-time installation of the Java toolchain (JDK, Maven, Eclipse JDT LS) in `external/java`.
+
+Each component is downloaded, extracted and made accessible (`chmod 0o777`, as the archives lose the
+permission bits) once. A completion stamp then records the checksum of the archive, a digest of
+the extracted tree and the identity of the component directory, so that later constructions of
+`JavaDataset` / `JavaTools` only read the stamp and stat the directory.
+
+    python -m project_utils.java_setup_utils           # installs every component
+    python -m project_utils.java_setup_utils --verify  # re-checks the installed trees against their stamps
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import gdown
+
+from project_utils import tracing
+from project_utils.common_utils import fetch_ist_adjusted_logger
+
+logger = fetch_ist_adjusted_logger()
+
+PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JAVA_EXTERNAL_DIR = os.path.join(PROJECT_ROOT_DIR, "external/java")
+STAMP_VERSION = 1
+
+
+@dataclass(frozen=True)
+class JavaComponent:
+    """A directory of `external/java`, extracted from a zip archive."""
+
+    name: str  # The directory (and archive) name
+    archive_url: str
+
+
+JDK = JavaComponent("jdk-17.0.6", "https://drive.google.com/uc?id=1HIJICJgQQvM_LzbSVRdBlQyiD_kY5BNc")
+MAVEN = JavaComponent("apache-maven-3.8.7", "https://drive.google.com/uc?id=1JFzF2oAzS8D31fhtpn3uIWhhWJTGG-5i")
+LANGUAGE_SERVER = JavaComponent(
+    "language-server-files", "https://drive.google.com/uc?id=1QS8cae9VqWoFrSA88ozty4gMhBRSNKC8"
+)
+ALL_COMPONENTS = (JDK, MAVEN, LANGUAGE_SERVER)
+
+
+def _component_dir(component: JavaComponent) -> str:
+    return os.path.join(JAVA_EXTERNAL_DIR, component.name)
+
+
+def _archive_path(component: JavaComponent) -> str:
+    return os.path.join(JAVA_EXTERNAL_DIR, component.name + ".zip")
+
+
+def _stamp_path(component: JavaComponent) -> str:
+    return os.path.join(JAVA_EXTERNAL_DIR, f".{component.name}.installed.json")
+
+
+def _dir_identity(path: str) -> list:
+    path_stat = os.stat(path)
+    return [path_stat.st_dev, path_stat.st_ino]
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fetch_tree_digest(root: str) -> str:
+    """Digest of the relative paths, sizes and modes of the entries of a tree (not of their content)."""
+    digest = hashlib.sha256()
+    for dir_path, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(dir_path, name)
+            path_stat = os.lstat(path)
+            digest.update(f"{os.path.relpath(path, root)}\0{path_stat.st_size}\0{path_stat.st_mode}\n".encode())
+    return digest.hexdigest()
+
+
+def _load_stamp(component: JavaComponent):
+    try:
+        with open(_stamp_path(component), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def is_installed(component: JavaComponent) -> bool:
+    """Constant time check: the stamp exists and still describes the component directory."""
+    stamp = _load_stamp(component)
+    if stamp is None or stamp.get("version") != STAMP_VERSION:
+        return False
+    try:
+        return stamp["dir_identity"] == _dir_identity(_component_dir(component))
+    except FileNotFoundError:
+        return False
+
+
+def verify(component: JavaComponent) -> bool:
+    """Full check: the installed tree still has the paths, sizes and modes it was installed with."""
+    stamp = _load_stamp(component)
+    return (
+        is_installed(component)
+        and stamp["tree_digest"] == fetch_tree_digest(_component_dir(component))
+    )
+
+
+@contextmanager
+def _install_lock(component: JavaComponent):
+    """Serializes the installation of a component across processes."""
+    os.makedirs(JAVA_EXTERNAL_DIR, exist_ok=True)
+    with open(os.path.join(JAVA_EXTERNAL_DIR, f".{component.name}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _make_accessible(root: str) -> None:
+    os.chmod(root, 0o777)
+    for dir_path, dirs, files in os.walk(root):
+        for name in dirs + files:
+            path = os.path.join(dir_path, name)
+            if not os.path.islink(path):
+                os.chmod(path, 0o777)
+
+
+@tracing.traced(category="setup")
+def install(component: JavaComponent, force: bool = False) -> None:
+    """
+    Downloads (if needed), extracts and stamps a component.
+
+    An existing directory without a stamp (installed before the stamps) is kept and only stamped.
+
+    Args:
+        component (JavaComponent): The component.
+        force (bool): Whether to extract the component again, even if it is installed.
+    """
+    with _install_lock(component):
+        if not force and is_installed(component):
+            return
+        component_dir = _component_dir(component)
+        archive_path = _archive_path(component)
+        if force and os.path.isdir(component_dir):
+            shutil.rmtree(component_dir)
+
+        if not os.path.isdir(component_dir):
+            if not os.path.exists(archive_path):
+                logger.info(f"Downloading {component.name}")
+                gdown.download(component.archive_url, archive_path + ".part", quiet=False)
+                os.rename(archive_path + ".part", archive_path)
+            logger.info(f"Extracting {component.name}")
+            tmp_dir = os.path.join(JAVA_EXTERNAL_DIR, f".{component.name}.tmp-{os.getpid()}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            with zipfile.ZipFile(archive_path, "r") as zip_ref:
+                zip_ref.extractall(tmp_dir)
+            extracted_dir = os.path.join(tmp_dir, component.name)
+            os.rename(extracted_dir if os.path.isdir(extracted_dir) else tmp_dir, component_dir)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        ## Give permissions (the zip archives do not keep the executable bits)
+        _make_accessible(component_dir)
+        stamp = {
+            "version": STAMP_VERSION,
+            "component": component.name,
+            "archive_sha256": _file_sha256(archive_path) if os.path.exists(archive_path) else None,
+            "tree_digest": fetch_tree_digest(component_dir),
+            "dir_identity": _dir_identity(component_dir),
+        }
+        tmp_stamp_path = _stamp_path(component) + ".tmp"
+        with open(tmp_stamp_path, "w") as f:
+            json.dump(stamp, f, indent=1)
+        os.replace(tmp_stamp_path, _stamp_path(component))
+        logger.info(f"Installed {component.name}")
+
+
+def ensure_installed(*components: JavaComponent) -> None:
+    """Installs the components which are not installed yet (a stamp check for the others)."""
+    for component in components:
+        if not is_installed(component):
+            install(component)
+
+
+def main():
+    parser = ArgumentParser(description="Install the Java toolchain in external/java")
+    parser.add_argument("--force", action="store_true", help="Extract the components again")
+    parser.add_argument("--verify", action="store_true", help="Check the installed trees against their stamps")
+    args = parser.parse_args()
+    for component in ALL_COMPONENTS:
+        if args.verify:
+            status = "ok" if verify(component) else "NOT OK (reinstall with --force)"
+            print(f"{component.name}: {status}")
+        else:
+            install(component, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Runs subprocesses with timeouts, cancellation, bounded output capture and resource accounting.
+
+    result = process_runner.run_process(
+        ["mvn", "test"], cwd=repo_dir, timeout=1800, merge_stderr=True,
+        concurrency_group="maven", on_stdout=lambda chunk: print(chunk, end=""),
+    )
+    result.exit_status, result.timed_out, result.wall_sec, result.max_rss_kb
+
+- Every process is started in its own session, so that a timeout (or a cancellation through a
+  `threading.Event`) kills the whole process group: SIGTERM, then SIGKILL after a grace period.
+- Output is read by background threads. Only the last `max_output_bytes` of each stream are kept
+  in memory; with `keep_spill`, a stream which exceeds that is also written in full to a spill file,
+  which the caller owns (and deletes). Spill files older than `ProcessConstants.SPILL_MAX_AGE_SEC`
+  are removed when a new one is created.
+- The process is reaped with `wait4`, which reports the CPU time and the max RSS of the process
+  (and of the descendants it waited for).
+- `concurrency_group` bounds the number of processes of a kind (eg: `maven`) running at once,
+  across the threads of the process (see `ProcessConstants.CONCURRENCY_LIMITS`).
+"""
+
+import codecs
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from project_utils.constants import ProcessConstants
+
+# Interval at which a running process is checked for a timeout or a cancellation
+POLL_INTERVAL_SEC = 0.05
+READ_CHUNK_BYTES = 64 * 1024
+
+_LIMITERS = {}
+_LIMITERS_GUARD = threading.Lock()
+
+
+def set_concurrency_limit(group: str, max_concurrency: int) -> None:
+    """Sets the number of processes of `group` which may run at once (must be called before the first use of the group)."""
+    with _LIMITERS_GUARD:
+        _LIMITERS[group] = threading.BoundedSemaphore(max_concurrency)
+
+
+def _fetch_limiter(group: str):
+    with _LIMITERS_GUARD:
+        if group not in _LIMITERS:
+            limit = ProcessConstants.CONCURRENCY_LIMITS.get(group)
+            _LIMITERS[group] = None if limit is None else threading.BoundedSemaphore(limit)
+        return _LIMITERS[group]
+
+
+@dataclass
+class ProcessResult:
+    """The outcome of `run_process`."""
+
+    args: object
+    exit_status: Optional[int]  # Negative when killed by a signal (like `subprocess`)
+    stdout: str  # The captured output (only its tail if `stdout_truncated`)
+    stderr: str
+    timed_out: bool = False
+    cancelled: bool = False
+    wall_sec: float = 0.0
+    user_cpu_sec: float = 0.0
+    sys_cpu_sec: float = 0.0
+    max_rss_kb: int = 0
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+    stdout_spill_path: Optional[str] = None  # The complete output, when it did not fit in memory (owned by the caller)
+    stderr_spill_path: Optional[str] = None
+
+    def check(self) -> str:
+        """
+        Mimics `subprocess.check_output`.
+
+        Returns:
+            str: The output.
+
+        Raises:
+            subprocess.CalledProcessError: If the exit status is not 0 (including timeouts).
+        """
+        if self.exit_status != 0:
+            raise subprocess.CalledProcessError(
+                self.exit_status, self.args, output=self.stdout, stderr=self.stderr
+            )
+        return self.stdout
+
+
+def remove_old_spill_files(spill_dir: str, max_age_sec: float = ProcessConstants.SPILL_MAX_AGE_SEC) -> int:
+    """Removes the spill files of `spill_dir` older than `max_age_sec`. Returns the number of removed files."""
+    removed = 0
+    now = time.time()
+    try:
+        names = os.listdir(spill_dir)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if not (name.startswith("rcb_") and name.endswith(".log")):
+            continue
+        path = os.path.join(spill_dir, name)
+        try:
+            if now - os.path.getmtime(path) > max_age_sec:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+class OutputCapture:
+    """
+    Keeps the tail of a stream in memory and, once it overflows, the whole stream in a spill file.
+
+    Args:
+        max_bytes (int): The number of bytes kept in memory.
+        spill_dir (str, optional): Where the spill file is created. None disables spilling.
+        spill_prefix (str): Prefix of the spill file name.
+        callback (Callable[[str], None], optional): Called with every decoded chunk, as it is read.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: str = None, spill_prefix: str = "rcb_output_", callback=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_prefix = spill_prefix
+        self.callback = callback
+        self.buffer = bytearray()
+        self.total_bytes = 0
+        self.spill_path = None
+        self._spill_file = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def write(self, chunk: bytes) -> None:
+        self.total_bytes += len(chunk)
+        if self._spill_file is not None:
+            self._spill_file.write(chunk)
+        self.buffer += chunk
+        if len(self.buffer) > self.max_bytes:
+            if self._spill_file is None and self.spill_dir is not None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                remove_old_spill_files(self.spill_dir)
+                fd, self.spill_path = tempfile.mkstemp(prefix=self.spill_prefix, suffix=".log", dir=self.spill_dir)
+                self._spill_file = os.fdopen(fd, "wb")
+                # Everything read so far is still in the buffer at this point
+                self._spill_file.write(self.buffer)
+            del self.buffer[: len(self.buffer) - self.max_bytes]
+        if self.callback is not None:
+            self.callback(self._decoder.decode(chunk))
+
+    def close(self) -> None:
+        if self.callback is not None:
+            tail = self._decoder.decode(b"", final=True)
+            if tail:
+                self.callback(tail)
+        if self._spill_file is not None:
+            self._spill_file.close()
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > len(self.buffer)
+
+    def getvalue(self) -> str:
+        return bytes(self.buffer).decode("utf-8", errors="replace")
+
+
+def _pump(stream, capture: OutputCapture) -> None:
+    try:
+        while True:
+            chunk = os.read(stream.fileno(), READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            capture.write(chunk)
+    finally:
+        stream.close()
+        capture.close()
+
+
+def _kill_process_group(proc: subprocess.Popen, grace_sec: float) -> None:
+    """SIGTERM to the process group, then SIGKILL if the leader is still there after `grace_sec`."""
+    for sig, wait_sec in [(signal.SIGTERM, grace_sec), (signal.SIGKILL, 0)]:
+        try:
+            os.killpg(proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            # Already gone, or (eg: under `sudo`) not ours to signal
+            return
+        deadline = time.monotonic() + wait_sec
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                return
+            time.sleep(POLL_INTERVAL_SEC)
+
+
+def run_process(
+    args,
+    cwd: str = None,
+    env: dict = None,
+    shell: bool = False,
+    timeout: float = None,
+    input: str = None,
+    merge_stderr: bool = False,
+    on_stdout: Callable[[str], None] = None,
+    on_stderr: Callable[[str], None] = None,
+    max_output_bytes: int = ProcessConstants.MAX_OUTPUT_BYTES,
+    spill_dir: Optional[str] = ProcessConstants.SPILL_DIR,
+    keep_spill: bool = False,
+    cancel_event: threading.Event = None,
+    concurrency_group: str = None,
+    kill_grace_sec: float = ProcessConstants.KILL_GRACE_SEC,
+) -> ProcessResult:
+    """
+    Runs a process until it exits, times out or is cancelled.
+
+    Args:
+        args: The command (a list, or a string with `shell=True`).
+        cwd (str, optional): The working directory.
+        env (dict, optional): The environment. Defaults to the current one.
+        shell (bool): Whether to run the command through the shell.
+        timeout (float, optional): Seconds after which the process group is killed. None waits forever.
+        input (str, optional): Written to the standard input of the process.
+        merge_stderr (bool): Whether stderr is captured along with stdout (like `stderr=STDOUT`).
+        on_stdout (Callable[[str], None], optional): Called with every chunk of stdout, as it is produced.
+        on_stderr (Callable[[str], None], optional): Called with every chunk of stderr, as it is produced.
+        max_output_bytes (int): Bytes of each stream kept in memory (the tail).
+        spill_dir (str, optional): Where streams which do not fit in memory are written in full (with `keep_spill`).
+        keep_spill (bool): Whether to write the streams which do not fit in memory to spill files
+            (`ProcessResult.*_spill_path`), which the caller then deletes.
+        cancel_event (threading.Event, optional): Setting it kills the process group.
+        concurrency_group (str, optional): Waits for a slot of the group before starting the process.
+        kill_grace_sec (float): Delay between SIGTERM and SIGKILL.
+
+    Returns:
+        ProcessResult: The result.
+    """
+    limiter = None if concurrency_group is None else _fetch_limiter(concurrency_group)
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        start_time = time.monotonic()
+        proc = subprocess.Popen(
+            args,
+            cwd=cwd,
+            env=env,
+            shell=shell,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+            start_new_session=True,
+        )
+        captures = {"stdout": OutputCapture(max_output_bytes, spill_dir if keep_spill else None, "rcb_stdout_", on_stdout)}
+        pumps = [threading.Thread(target=_pump, args=(proc.stdout, captures["stdout"]), daemon=True)]
+        if not merge_stderr:
+            captures["stderr"] = OutputCapture(max_output_bytes, spill_dir if keep_spill else None, "rcb_stderr_", on_stderr)
+            pumps.append(threading.Thread(target=_pump, args=(proc.stderr, captures["stderr"]), daemon=True))
+        for pump in pumps:
+            pump.start()
+        if input is not None:
+            try:
+                proc.stdin.write(input.encode())
+            except BrokenPipeError:
+                pass
+            proc.stdin.close()
+
+        timed_out = cancelled = False
+        rusage = None
+        while True:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+            if pid != 0:
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                break
+            if timeout is not None and time.monotonic() - start_time > timeout:
+                timed_out = True
+            elif cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+            if timed_out or cancelled:
+                # Reaps the process (through `poll`), so no rusage is available afterwards
+                _kill_process_group(proc, kill_grace_sec)
+                if proc.poll() is None:
+                    proc.wait()
+                rusage = None
+                break
+            time.sleep(POLL_INTERVAL_SEC)
+        wall_sec = time.monotonic() - start_time
+
+        if timed_out or cancelled:
+            # Descendants which left the group may still hold the pipes open
+            for pump in pumps:
+                pump.join(timeout=kill_grace_sec)
+        else:
+            for pump in pumps:
+                pump.join()
+    finally:
+        if limiter is not None:
+            limiter.release()
+
+    stderr_capture = captures.get("stderr")
+    return ProcessResult(
+        args=args,
+        exit_status=proc.returncode,
+        stdout=captures["stdout"].getvalue(),
+        stderr="" if stderr_capture is None else stderr_capture.getvalue(),
+        timed_out=timed_out,
+        cancelled=cancelled,
+        wall_sec=wall_sec,
+        user_cpu_sec=0.0 if rusage is None else rusage.ru_utime,
+        sys_cpu_sec=0.0 if rusage is None else rusage.ru_stime,
+        max_rss_kb=0 if rusage is None else rusage.ru_maxrss,
+        stdout_truncated=captures["stdout"].truncated,
+        stderr_truncated=False if stderr_capture is None else stderr_capture.truncated,
+        stdout_spill_path=captures["stdout"].spill_path,
+        stderr_spill_path=None if stderr_capture is None else stderr_capture.spill_path,
+    )
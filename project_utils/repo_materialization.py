@@ -0,0 +1,370 @@
+"""Helpers to materialize working copies of the benchmark repositories.
+
+Setting up a task used to copy the full original repository every time
+(`cp -r`, `shutil.copytree`, or delete + re-copy). The helpers below make the
+common cases cheap:
+
+* A fresh copy uses `cp -a --reflink=auto`, which shares data blocks on
+  copy-on-write filesystems (btrfs, XFS, APFS-like setups) and silently falls
+  back to a regular copy elsewhere.
+* An existing copy is brought back in line with the original by only copying
+  the files whose size/mtime differ and deleting the extra ones.
+* Read-only consumers can use a hardlink farm, and git repositories can be
+  checked out as a `git worktree` sharing the object store.
+"""
+
+import os
+import shutil
+import stat
+import subprocess
+import time
+
+from project_utils.common_utils import fetch_ist_adjusted_logger
+
+logger = fetch_ist_adjusted_logger()
+
+# Supported materialization strategies
+STRATEGIES = ("auto", "copy", "hardlink", "worktree")
+
+
+def _new_stats(strategy):
+    return {
+        "strategy": strategy,
+        "copied_files": 0,
+        "linked_files": 0,
+        "removed_paths": 0,
+        "elapsed_sec": 0.0,
+    }
+
+
+def _remove_path(path):
+    """Removes a file, symlink or directory tree."""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def _is_git_worktree(path):
+    """A linked worktree has a `.git` *file* pointing to the main repository."""
+    return os.path.isfile(os.path.join(path, ".git"))
+
+
+def _entry_differs(source_stat, target_path):
+    """Checks whether the target file needs to be (re)copied from the source."""
+    try:
+        target_stat = os.lstat(target_path)
+    except FileNotFoundError:
+        return True
+    if stat.S_IFMT(source_stat.st_mode) != stat.S_IFMT(target_stat.st_mode):
+        return True
+    return (
+        source_stat.st_size != target_stat.st_size
+        or source_stat.st_mtime_ns != target_stat.st_mtime_ns
+    )
+
+
+def _symlink_differs(source_path, target_path):
+    """Symlinks are compared by their destination (their mtime changes on every copy)."""
+    if not os.path.islink(target_path):
+        return True
+    return os.readlink(source_path) != os.readlink(target_path)
+
+
+def _copy_entry(source_path, target_path, source_stat):
+    """Copies a single file or symlink, preserving metadata."""
+    if os.path.lexists(target_path):
+        _remove_path(target_path)
+    if stat.S_ISLNK(source_stat.st_mode):
+        os.symlink(os.readlink(source_path), target_path)
+    else:
+        shutil.copy2(source_path, target_path)
+
+
+def clone_tree(source_dir: str, target_dir: str) -> bool:
+    """
+    Creates `target_dir` as a copy of `source_dir`, sharing data blocks where the filesystem supports it.
+
+    Args:
+        source_dir (str): The directory to copy.
+        target_dir (str): The directory to create. Must not exist yet.
+
+    Returns:
+        bool: True if the copy-on-write aware `cp` was used, False if the Python fallback was used.
+    """
+    assert not os.path.lexists(target_dir), f"{target_dir} already exists"
+    os.makedirs(os.path.dirname(os.path.abspath(target_dir)), exist_ok=True)
+
+    if shutil.which("cp") is not None:
+        result = subprocess.run(
+            ["cp", "-a", "--reflink=auto", source_dir, target_dir],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode == 0:
+            return True
+        # e.g. BSD `cp` does not know about --reflink
+        logger.debug(f"Reflink copy failed, falling back to copytree: {result.stderr}")
+        if os.path.lexists(target_dir):
+            shutil.rmtree(target_dir)
+
+    shutil.copytree(source_dir, target_dir, symlinks=True)
+    return False
+
+
+def sync_tree(source_dir: str, target_dir: str, ignore_names=(), stats=None) -> dict:
+    """
+    Makes `target_dir` identical to `source_dir` by only touching the entries which differ.
+
+    Files are compared by type, size and modification time. Entries present in the target but not
+    in the source are deleted.
+
+    Args:
+        source_dir (str): The reference directory.
+        target_dir (str): The directory to update (created if missing).
+        ignore_names (Iterable[str]): File/directory names which are neither copied nor deleted.
+        stats (dict, optional): Statistics dictionary to update in place.
+
+    Returns:
+        dict: Statistics about the number of copied and removed entries.
+    """
+    stats = stats if stats is not None else _new_stats("sync")
+    ignore_names = set(ignore_names)
+    os.makedirs(target_dir, exist_ok=True)
+
+    for root, dirs, files in os.walk(source_dir):
+        rel_root = os.path.relpath(root, source_dir)
+        target_root = os.path.normpath(os.path.join(target_dir, rel_root))
+
+        dirs[:] = [d for d in dirs if d not in ignore_names]
+        wanted = set(dirs) | {f for f in files if f not in ignore_names}
+
+        # Delete whatever does not exist in the source anymore
+        for name in os.listdir(target_root):
+            if name in wanted or name in ignore_names:
+                continue
+            _remove_path(os.path.join(target_root, name))
+            stats["removed_paths"] += 1
+
+        # Symlinks to directories are reported in `dirs` by os.walk
+        for name in list(dirs):
+            source_path = os.path.join(root, name)
+            target_path = os.path.join(target_root, name)
+            if os.path.islink(source_path):
+                dirs.remove(name)
+                if _symlink_differs(source_path, target_path):
+                    _copy_entry(source_path, target_path, os.lstat(source_path))
+                    stats["copied_files"] += 1
+            elif not os.path.isdir(target_path) or os.path.islink(target_path):
+                if os.path.lexists(target_path):
+                    _remove_path(target_path)
+                os.makedirs(target_path)
+
+        for name in files:
+            if name in ignore_names:
+                continue
+            source_path = os.path.join(root, name)
+            target_path = os.path.join(target_root, name)
+            source_stat = os.lstat(source_path)
+            if stat.S_ISLNK(source_stat.st_mode):
+                needs_copy = _symlink_differs(source_path, target_path)
+            else:
+                needs_copy = _entry_differs(source_stat, target_path)
+            if needs_copy:
+                _copy_entry(source_path, target_path, source_stat)
+                stats["copied_files"] += 1
+    return stats
+
+
+def link_tree(source_dir: str, target_dir: str, stats=None) -> dict:
+    """
+    Creates `target_dir` as a hardlink farm of `source_dir`.
+
+    NOTE: Files are shared with the source. Only use this for read-only consumers: writing to a
+    linked file in place (eg: `open(path, "w")`) modifies the source as well.
+
+    Args:
+        source_dir (str): The directory to mirror.
+        target_dir (str): The directory to create.
+        stats (dict, optional): Statistics dictionary to update in place.
+
+    Returns:
+        dict: Statistics about the number of linked/copied entries.
+    """
+    stats = stats if stats is not None else _new_stats("hardlink")
+    for root, dirs, files in os.walk(source_dir):
+        target_root = os.path.normpath(
+            os.path.join(target_dir, os.path.relpath(root, source_dir))
+        )
+        os.makedirs(target_root, exist_ok=True)
+        for name in list(dirs):
+            source_path = os.path.join(root, name)
+            if os.path.islink(source_path):
+                dirs.remove(name)
+                os.symlink(os.readlink(source_path), os.path.join(target_root, name))
+        for name in files:
+            source_path = os.path.join(root, name)
+            target_path = os.path.join(target_root, name)
+            if os.path.islink(source_path):
+                os.symlink(os.readlink(source_path), target_path)
+                continue
+            try:
+                os.link(source_path, target_path)
+                stats["linked_files"] += 1
+            except OSError:
+                # Cross-device or unsupported filesystem
+                shutil.copy2(source_path, target_path)
+                stats["copied_files"] += 1
+    return stats
+
+
+def overlay_tree(source_dir: str, target_dir: str, copy_if=None, stats=None) -> dict:
+    """
+    Makes `target_dir` a writable overlay of `source_dir`: files missing from the target are
+    hardlinked, while entries already present in the target are left alone (they may be newer).
+
+    NOTE: Consumers may add or replace files (eg: a new download written through a rename), but must
+    not rewrite linked files in place. Files they do rewrite in place should be matched by `copy_if`.
+
+    Args:
+        source_dir (str): The shared (read-only) directory.
+        target_dir (str): The overlay (created if missing).
+        copy_if (Callable[[str], bool], optional): Whether a file (by name) is copied rather than linked.
+        stats (dict, optional): Statistics dictionary to update in place.
+
+    Returns:
+        dict: Statistics about the number of linked/copied entries.
+    """
+    stats = stats if stats is not None else _new_stats("overlay")
+    for root, dirs, files in os.walk(source_dir):
+        target_root = os.path.normpath(
+            os.path.join(target_dir, os.path.relpath(root, source_dir))
+        )
+        os.makedirs(target_root, exist_ok=True)
+        for name in list(dirs):
+            source_path = os.path.join(root, name)
+            if os.path.islink(source_path):
+                dirs.remove(name)
+                if not os.path.lexists(os.path.join(target_root, name)):
+                    os.symlink(os.readlink(source_path), os.path.join(target_root, name))
+        for name in files:
+            source_path = os.path.join(root, name)
+            target_path = os.path.join(target_root, name)
+            if os.path.lexists(target_path):
+                continue
+            if os.path.islink(source_path):
+                os.symlink(os.readlink(source_path), target_path)
+                continue
+            if copy_if is None or not copy_if(name):
+                try:
+                    os.link(source_path, target_path)
+                    stats["linked_files"] += 1
+                    continue
+                except OSError:
+                    # Cross-device or unsupported filesystem
+                    pass
+            shutil.copy2(source_path, target_path)
+            stats["copied_files"] += 1
+    return stats
+
+
+def add_worktree(source_dir: str, target_dir: str, git_ref: str = "HEAD") -> bool:
+    """
+    Checks out `git_ref` of the git repository at `source_dir` as a detached worktree in `target_dir`.
+
+    Only tracked files are present in the worktree.
+
+    Returns:
+        bool: True if the worktree was created.
+    """
+    if not os.path.isdir(os.path.join(source_dir, ".git")):
+        return False
+    result = subprocess.run(
+        [
+            "git",
+            "-C",
+            source_dir,
+            "worktree",
+            "add",
+            "--force",
+            "--detach",
+            os.path.abspath(target_dir),
+            git_ref,
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        logger.warning(f"`git worktree add` failed for {source_dir}: {result.stderr}")
+        return False
+    return True
+
+
+def remove_materialized_repo(target_dir: str, source_dir: str = None):
+    """
+    Removes a materialized repository, unregistering it if it is a git worktree.
+
+    Args:
+        target_dir (str): The directory to remove.
+        source_dir (str, optional): The main repository of the worktree (if any).
+    """
+    if not os.path.lexists(target_dir):
+        return
+    is_worktree = _is_git_worktree(target_dir)
+    _remove_path(target_dir)
+    if is_worktree and source_dir is not None:
+        subprocess.run(
+            ["git", "-C", source_dir, "worktree", "prune"], capture_output=True
+        )
+
+
+def materialize_repo(
+    source_dir: str,
+    target_dir: str,
+    strategy: str = "auto",
+    ignore_names=(),
+    git_ref: str = "HEAD",
+) -> dict:
+    """
+    Materializes a working copy of `source_dir` at `target_dir`.
+
+    Strategies:
+        - "auto": Sync an existing target (copy only the entries which differ), otherwise create a
+                  copy-on-write aware copy.
+        - "copy": Always start from a fresh copy-on-write aware copy.
+        - "hardlink": Fresh hardlink farm. Only for read-only consumers.
+        - "worktree": Fresh `git worktree` of `git_ref` (falls back to "copy" for non-git sources).
+
+    Args:
+        source_dir (str): The original (read-only) repository.
+        target_dir (str): Where the working copy should live.
+        strategy (str): One of `STRATEGIES`.
+        ignore_names (Iterable[str]): Names to leave untouched while syncing (only used by "auto").
+        git_ref (str): The revision to check out (only used by "worktree").
+
+    Returns:
+        dict: Statistics about the materialization, including the strategy actually used and the elapsed time.
+    """
+    assert strategy in STRATEGIES, f"Unknown strategy: {strategy}"
+    assert os.path.isdir(source_dir), f"{source_dir} does not exist"
+    start_time = time.perf_counter()
+
+    if strategy == "auto" and os.path.isdir(target_dir) and not _is_git_worktree(
+        target_dir
+    ):
+        stats = sync_tree(source_dir, target_dir, ignore_names, _new_stats("sync"))
+    else:
+        remove_materialized_repo(target_dir, source_dir)
+        stats = None
+        if strategy == "worktree":
+            if add_worktree(source_dir, target_dir, git_ref):
+                stats = _new_stats("worktree")
+        elif strategy == "hardlink":
+            stats = link_tree(source_dir, target_dir)
+        if stats is None:
+            used_reflink = clone_tree(source_dir, target_dir)
+            stats = _new_stats("reflink" if used_reflink else "copy")
+
+    stats["elapsed_sec"] = time.perf_counter() - start_time
+    logger.debug(f"Materialized {target_dir} from {source_dir}: {stats}")
+    return stats
@@ -0,0 +1,280 @@
+"""Lightweight hierarchical span tracing.
+
+Tracing is off unless `RCB_TRACE=1` is set (or `enable()` is called); `span()` then returns a
+shared no-op context manager and `traced` functions only pay for a flag check.
+
+    from project_utils import tracing
+
+    with tracing.span("git reset", category="git", repo=repo_path):
+        ...
+
+    @tracing.traced(category="evaluation")
+    def evaluate(self, code): ...
+
+    with tracing.trace_task("python-42"):
+        ...  # every span opened in this context is written to <TRACE_DIR>/python-42.trace.json
+
+Spans nest through a `contextvars.ContextVar`, so the hierarchy is tracked per thread and per
+asyncio task. Spans are recorded as Chrome trace "complete" events (open the files in
+chrome://tracing or https://ui.perfetto.dev). Spans opened outside of `trace_task` (eg: in executor
+threads, which do not inherit the context) go to a per-process trace written at exit, along with
+an aggregate summary table (count, total, mean and max duration per span name).
+"""
+
+import asyncio
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from project_utils.constants import TraceConstants
+
+_enabled = TraceConstants.TRACE_ENABLED
+
+# The innermost open span of the current thread / asyncio task
+_current_span = ContextVar("rcb_current_span", default=None)
+# The task whose trace the spans of the current context belong to
+_current_task = ContextVar("rcb_current_task", default=None)
+
+_lock = threading.Lock()
+# task name (None for the spans opened outside of `trace_task`) -> list of Chrome trace events
+_events = {}
+# (category, name) -> [count, total_us, max_us]
+_summary = {}
+_next_span_id = [0]
+
+
+def enable(enabled: bool = True) -> None:
+    """Turns tracing on (or off) for the current process."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _fetch_tid() -> int:
+    """Spans of different asyncio tasks of a thread are shown on different tracks."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return id(task) % (1 << 31)
+    return threading.get_native_id()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set(self, **kwargs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """An open span. Use `span()` rather than creating it directly."""
+
+    def __init__(self, name: str, category: str, args: dict):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def set(self, **kwargs) -> None:
+        """Attaches more arguments to the span (eg: the exit status, once known)."""
+        self.args.update(kwargs)
+
+    def __enter__(self):
+        with _lock:
+            _next_span_id[0] += 1
+            self.span_id = _next_span_id[0]
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self)
+        self._start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        dur_us = (time.perf_counter_ns() - self._start_ns) / 1000
+        _current_span.reset(self._token)
+        args = {k: v if isinstance(v, (int, float, bool, type(None))) else str(v) for k, v in self.args.items()}
+        args["span_id"] = self.span_id
+        if self.parent is not None:
+            args["parent_id"] = self.parent.span_id
+        if exc_type is not None:
+            args["exception"] = exc_type.__name__
+        event = {
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": self._start_ns / 1000,
+            "dur": dur_us,
+            "pid": os.getpid(),
+            "tid": _fetch_tid(),
+            "args": args,
+        }
+        with _lock:
+            _events.setdefault(_current_task.get(), []).append(event)
+            stats = _summary.setdefault((self.category, self.name), [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += dur_us
+            stats[2] = max(stats[2], dur_us)
+        return False
+
+
+def span(name: str, category: str = "", **args):
+    """
+    Opens a span (as a context manager).
+
+    Args:
+        name (str): The span name (spans are aggregated by name in the summary).
+        category (str): The span category (eg: `setup`, `evaluation`, `tools`).
+        **args: Arguments shown with the span.
+
+    Returns:
+        A context manager, which is a no-op when tracing is disabled.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, category, args)
+
+
+def traced(name: str = None, category: str = ""):
+    """
+    Decorator wrapping every call of a (sync or async) function in a span.
+
+    Args:
+        name (str, optional): The span name. Defaults to the qualified name of the function.
+        category (str): The span category.
+    """
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await func(*args, **kwargs)
+                with Span(span_name, category, {}):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, category, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _write_chrome_trace(events, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def _trace_file_name(task_name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(task_name)) + ".trace.json"
+
+
+@contextmanager
+def trace_task(task_name: str, trace_dir: str = None):
+    """
+    Collects the spans opened in this context into a per-task trace file.
+
+    Args:
+        task_name (str): The task name (used as the file name).
+        trace_dir (str, optional): Where the trace is written. Defaults to `TraceConstants.TRACE_DIR`.
+
+    Yields:
+        str: The path of the trace file (None when tracing is disabled).
+    """
+    if not _enabled:
+        yield None
+        return
+    path = os.path.join(trace_dir or TraceConstants.TRACE_DIR, _trace_file_name(task_name))
+    token = _current_task.set(task_name)
+    try:
+        with Span(str(task_name), "task", {}):
+            yield path
+    finally:
+        _current_task.reset(token)
+        with _lock:
+            events = _events.pop(task_name, [])
+        _write_chrome_trace(events, path)
+
+
+def fetch_summary() -> list:
+    """
+    Aggregates the spans recorded so far by the process.
+
+    Returns:
+        List[dict]: {category, name, count, total_ms, mean_ms, max_ms}, by decreasing total time.
+    """
+    with _lock:
+        items = list(_summary.items())
+    rows = [
+        {
+            "category": category,
+            "name": name,
+            "count": count,
+            "total_ms": total_us / 1000,
+            "mean_ms": total_us / 1000 / count,
+            "max_ms": max_us / 1000,
+        }
+        for (category, name), (count, total_us, max_us) in items
+    ]
+    return sorted(rows, key=lambda x: x["total_ms"], reverse=True)
+
+
+def format_summary(rows=None) -> str:
+    """Formats the summary as a fixed-width table."""
+    rows = fetch_summary() if rows is None else rows
+    lines = [f"{'category':<12} {'name':<60} {'count':>7} {'total_ms':>12} {'mean_ms':>10} {'max_ms':>10}"]
+    for row in rows:
+        lines.append(
+            f"{row['category'][:12]:<12} {row['name'][:60]:<60} {row['count']:>7} "
+            f"{row['total_ms']:>12.1f} {row['mean_ms']:>10.1f} {row['max_ms']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def reset() -> None:
+    """Drops everything recorded so far."""
+    with _lock:
+        _events.clear()
+        _summary.clear()
+
+
+@atexit.register
+def _write_process_outputs() -> None:
+    if not _enabled or len(_summary) == 0:
+        return
+    trace_dir = TraceConstants.TRACE_DIR
+    os.makedirs(trace_dir, exist_ok=True)
+    with _lock:
+        events = [e for task_events in _events.values() for e in task_events]
+    if len(events) > 0:
+        _write_chrome_trace(events, os.path.join(trace_dir, f"process-{os.getpid()}.trace.json"))
+    rows = fetch_summary()
+    with open(os.path.join(trace_dir, f"summary-{os.getpid()}.json"), "w") as f:
+        json.dump(rows, f, indent=1)
+    logging.getLogger("__main__").info("Trace summary:\n%s", format_summary(rows))
@@ -0,0 +1,373 @@
+"""End-to-end performance benchmark of the dataset setup, the tools and the evaluators.
+
+Usage:
+    python -m repoclassbench.benchmarks.perf_suite [--language python] [--repeat 3] \
+        [--dataset-task python:0] [--output results.json] [--baseline baseline.json] [--update-baseline]
+
+For every language, the suite times:
+- `tools_init`: building the tools (and their indexes) on a local fixture repository
+- `tools.<method>`: every `BaseTools` method on a fixed query set (`QUERY_SETS`)
+- `dataset_setup` / `evaluate_ground_truth`: setting up a dataset task and evaluating its ground
+  truth class, for the tasks passed with `--dataset-task` (these need the downloaded dataset)
+
+The fixtures are the repositories used by the tool tests (`repotools/tests/<language>`). Cases whose
+dependencies are missing are reported as `skipped`, not as failures.
+
+Results are written as JSON. With `--baseline`, the median of every case is compared with the
+stored one: a case regresses when it is slower by more than `--threshold` (relative) and by more
+than `--min-delta-sec` (absolute, to ignore noise on fast cases), or when it now fails with an error.
+The exit status is 1 if any case regressed. `--update-baseline` stores the current results as the new baseline.
+"""
+
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from typing import Callable, List
+
+from project_utils import common_utils as utils
+from project_utils import tracing
+from project_utils.constants import PythonConstants
+
+logger = utils.fetch_ist_adjusted_logger()
+
+LANGUAGES = ("python", "java", "csharp")
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_SEC = 0.05
+
+FIXTURES = {
+    "python": {
+        "repo_root_dir": os.path.join(
+            PythonConstants.ProjectDir, "repotools/tests/python/python_minibenchmark"
+        ),
+        "file_path": "python/test_imports.py",
+    },
+    "java": {
+        "repo_root_dir": os.path.join(PythonConstants.ProjectDir, "repotools/tests/java/example_repo/repo1"),
+        "file_path": "src/main/java/io/github/AddComplex2.java",
+    },
+    "csharp": {
+        "repo_root_dir": os.path.join(
+            PythonConstants.ProjectDir, "repotools/tests/csharp/example_repo/Geometry"
+        ),
+        "file_path": "Shapes/Circle.cs",
+    },
+}
+
+# BaseTools method -> list of (args) tuples, per language
+QUERY_SETS = {
+    "python": {
+        "get_imports": [("python/test_imports.py",)],
+        "get_relevant_code": [("class to deal with Polar Complex numbers",)],
+        "get_signature": [("class_A", "cal")],
+        "get_method_body": [("class_A", "cal"), ("ComplexList", "msr_add")],
+        "get_class_info": [("class_A",)],
+        "get_related_snippets": [("about Goliath",)],
+    },
+    "java": {
+        "get_imports": [("public class A {\n    public static void main(String[] args) {\n        Complex c1;\n    }\n}",)],
+        "get_relevant_code": [("Setting imaginary numbers",)],
+        "get_signature": [("Complex", "setImaginary")],
+        "get_method_body": [("Complex", "setImaginary")],
+        "get_class_info": [("Complex", "addition")],
+        "get_related_snippets": [("Class dealing with Complex numbers",)],
+    },
+    "csharp": {
+        "get_imports": [("namespace Geometry.Tests;\npublic class CircleTest\n{\n    public Circle Unit { get; } = new Circle(new Point(0, 0), 1);\n}\n",)],
+        "get_relevant_code": [("distance between two points",)],
+        "get_signature": [("Point", "DistanceTo")],
+        "get_method_body": [("Circle", "Contains")],
+        "get_class_info": [("Circle", "area of a circle")],
+        "get_related_snippets": [("check whether a point lies inside a circle",)],
+    },
+}
+
+
+class SkipCase(Exception):
+    """Raised by a case whose dependencies (packages, dataset files, toolchains) are not available."""
+
+
+@dataclass
+class BenchmarkCase:
+    """A timed operation. `func` is called `warmup + repeat` times; only the last `repeat` calls are timed."""
+
+    name: str
+    language: str
+    stage: str
+    func: Callable[[], object]
+    repeat: int = 1
+    warmup: int = 0
+    samples_sec: List[float] = field(default_factory=list)
+
+
+def run_case(case: BenchmarkCase) -> dict:
+    """
+    Runs a case.
+
+    Args:
+        case (BenchmarkCase): The case.
+
+    Returns:
+        dict: {name, language, stage, status (ok|skipped|error), samples_sec, median_sec, min_sec, max_sec, error}
+    """
+    result = {"name": case.name, "language": case.language, "stage": case.stage, "error": None}
+    try:
+        for _ in range(case.warmup):
+            case.func()
+        for _ in range(case.repeat):
+            start_time = time.perf_counter()
+            case.func()
+            case.samples_sec.append(time.perf_counter() - start_time)
+        result["status"] = "ok"
+    except SkipCase as E:
+        result["status"] = "skipped"
+        result["error"] = str(E)
+    except Exception:
+        result["status"] = "error"
+        result["error"] = traceback.format_exc()
+        logger.exception(f"Benchmark case {case.name} failed")
+    result["samples_sec"] = case.samples_sec
+    if len(case.samples_sec) > 0:
+        result["median_sec"] = statistics.median(case.samples_sec)
+        result["min_sec"] = min(case.samples_sec)
+        result["max_sec"] = max(case.samples_sec)
+    logger.info(
+        f"[{result['status']}] {case.name}: "
+        + (f"median {result['median_sec']:.3f}s" if "median_sec" in result else "no samples")
+    )
+    return result
+
+
+def _build_tools(language: str):
+    try:
+        if language == "csharp":
+            from repotools.csharp_tools import CSharpTools
+
+            fixture = FIXTURES["csharp"]
+            return CSharpTools(
+                fixture["repo_root_dir"],
+                "",
+                os.path.join(fixture["repo_root_dir"], fixture["file_path"]),
+            )
+        from repotools import Tools
+    except ImportError as E:
+        raise SkipCase(f"tools of {language} cannot be imported: {E}")
+
+    fixture = FIXTURES[language]
+    if language == "java":
+        return Tools(language="java", class_name=None, **fixture)
+    # The fixture is analysed with the interpreter running the suite
+    env_name = os.path.basename(os.path.dirname(os.path.dirname(sys.executable)))
+    tools = Tools(language="python", class_name=None, env_name=env_name, **fixture)
+    tools.load_all_fqdns()
+    tools.create_fqdn_index()
+    tools.prep_embedding_tool()
+    return tools
+
+
+def fetch_tool_cases(language: str, repeat: int) -> List[BenchmarkCase]:
+    """Returns the `tools_init` case and one case per `BaseTools` method (sharing the tools built by `tools_init`)."""
+    state = {}
+
+    def init_tools():
+        state["tools"] = _build_tools(language)
+
+    def call_method(method_name):
+        def _call():
+            if "tools" not in state:
+                raise SkipCase("the tools could not be built")
+            for args in QUERY_SETS[language][method_name]:
+                getattr(state["tools"], method_name)(*args)
+
+        return _call
+
+    cases = [BenchmarkCase(f"{language}.tools_init", language, "tools_init", init_tools)]
+    for method_name in QUERY_SETS[language]:
+        cases.append(
+            BenchmarkCase(
+                f"{language}.tools.{method_name}",
+                language,
+                "tools",
+                call_method(method_name),
+                repeat=repeat,
+                # The first call may fill caches, which is timed by `tools_init` in spirit
+                warmup=1,
+            )
+        )
+    return cases
+
+
+def fetch_dataset_cases(language: str, task_index: int) -> List[BenchmarkCase]:
+    """Returns the `dataset_setup` and `evaluate_ground_truth` cases of a dataset task."""
+    state = {}
+
+    def setup():
+        try:
+            from repoclassbench.dataset import Dataset
+        except ImportError as E:
+            raise SkipCase(f"dataset of {language} cannot be imported: {E}")
+        dataset = Dataset(language=language, specification="detailed", delete_relatives=False)
+        state["task"] = dataset.get_instance_and_setup_env(task_index)
+
+    def evaluate():
+        if "task" not in state:
+            raise SkipCase("the task could not be set up")
+        evaluation = state["task"].evaluator.evaluate(state["task"].ground_truth)
+        if evaluation.test_status is False:
+            raise AssertionError(f"The ground truth of task {task_index} does not pass")
+
+    return [
+        BenchmarkCase(f"{language}.{task_index}.dataset_setup", language, "dataset_setup", setup),
+        BenchmarkCase(
+            f"{language}.{task_index}.evaluate_ground_truth", language, "evaluate_ground_truth", evaluate
+        ),
+    ]
+
+
+def fetch_metadata() -> dict:
+    """Describes the machine and the revision the results were measured on."""
+    try:
+        git_commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=PythonConstants.ProjectDir,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except FileNotFoundError:
+        git_commit = None
+    return {
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": git_commit,
+        "measured_at": utils.get_ist_time(),
+    }
+
+
+def compare_to_baseline(
+    results: List[dict],
+    baseline: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta_sec: float = DEFAULT_MIN_DELTA_SEC,
+) -> List[dict]:
+    """
+    Compares the medians of the cases with a baseline.
+
+    Args:
+        results (List[dict]): The results of `run_case`.
+        baseline (dict): A previous output of the suite.
+        threshold (float): Relative slowdown above which a case regresses.
+        min_delta_sec (float): Absolute slowdown below which a case never regresses.
+
+    Returns:
+        List[dict]: {name, baseline_sec, current_sec, ratio, regressed} for the cases measured in the
+            baseline and measured (or failed) in this run. A failed case regresses, with no current_sec.
+    """
+    baseline_medians = {
+        x["name"]: x["median_sec"] for x in baseline["results"] if "median_sec" in x
+    }
+    ans = []
+    for result in results:
+        if result["name"] not in baseline_medians:
+            continue
+        baseline_sec = baseline_medians[result["name"]]
+        if result.get("status") == "error":
+            ans.append(
+                {
+                    "name": result["name"],
+                    "baseline_sec": baseline_sec,
+                    "current_sec": None,
+                    "ratio": None,
+                    "regressed": True,
+                }
+            )
+            continue
+        if "median_sec" not in result:
+            continue
+        current_sec = result["median_sec"]
+        ans.append(
+            {
+                "name": result["name"],
+                "baseline_sec": baseline_sec,
+                "current_sec": current_sec,
+                "ratio": current_sec / baseline_sec if baseline_sec > 0 else None,
+                "regressed": current_sec > baseline_sec * (1 + threshold)
+                and current_sec - baseline_sec > min_delta_sec,
+            }
+        )
+    return ans
+
+
+def format_comparison(comparison: List[dict]) -> str:
+    lines = [f"{'case':<60} {'baseline_s':>11} {'current_s':>11} {'ratio':>7}"]
+    for row in comparison:
+        ratio = "-" if row["ratio"] is None else f"{row['ratio']:.2f}"
+        current = "error" if row["current_sec"] is None else f"{row['current_sec']:.3f}"
+        flag = "  REGRESSED" if row["regressed"] else ""
+        lines.append(
+            f"{row['name'][:60]:<60} {row['baseline_sec']:>11.3f} {current:>11} {ratio:>7}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = ArgumentParser(description="Performance benchmark of RepoClassBench setup, tools and evaluation")
+    parser.add_argument("--language", choices=LANGUAGES, action="append", default=None)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed calls per tool method")
+    parser.add_argument("--dataset-task", action="append", default=[],
+                        help="`<language>:<task index>` to time the setup and ground truth evaluation of")
+    parser.add_argument("--output", default=None, help="Where the results are written (JSON)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-delta-sec", type=float, default=DEFAULT_MIN_DELTA_SEC)
+    args = parser.parse_args()
+
+    languages = args.language or list(LANGUAGES)
+    cases = []
+    for language in languages:
+        for spec in args.dataset_task:
+            task_language, _, task_index = spec.partition(":")
+            if task_language == language:
+                cases.extend(fetch_dataset_cases(language, int(task_index)))
+        cases.extend(fetch_tool_cases(language, args.repeat))
+
+    output = {"metadata": fetch_metadata(), "results": [run_case(case) for case in cases]}
+    if tracing.is_enabled():
+        output["trace_summary"] = tracing.fetch_summary()
+
+    output_json = json.dumps(output, indent=1)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            f.write(output_json)
+    else:
+        print(output_json)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(output_json)
+        logger.info(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        logger.warning(f"No baseline found at {args.baseline}, skipping the comparison")
+        return
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    comparison = compare_to_baseline(output["results"], baseline, args.threshold, args.min_delta_sec)
+    print(format_comparison(comparison))
+    if any(row["regressed"] for row in comparison):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 from repoclassbench.dataset.java_dataset import JavaDataset
 from repoclassbench.dataset.python_dataset import PythonDataset
 from repoclassbench.dataset.csharp_dataset import CSharpDataset
+from repoclassbench.dataset.prefetch import PrefetchingIterator
 
 
 class Dataset:
@@ -25,3 +26,16 @@ class Dataset:
 
     def __len__(self):
         return len(self._dataset)
+
+    def iter_prefetched(self, indices=None, **kwargs) -> PrefetchingIterator:
+        """
+        Iterates over `(index, TaskData)` pairs, setting up the upcoming tasks in the background.
+
+        Args:
+            indices (List[int], optional): The task indices to visit, in order. Defaults to all of them.
+            **kwargs: `lookahead` and `max_workers` (see `PrefetchingIterator`).
+
+        Returns:
+            PrefetchingIterator: The iterator.
+        """
+        return PrefetchingIterator(self._dataset, indices=indices, **kwargs)
@@ -42,3 +42,11 @@ class BaseDataset(ABC):
     @abstractmethod
     def get_instance_and_setup_env(self, i: int) -> TaskData:
         """Sets up the environment and returns the i'th element of the dataset"""
+
+    def workspace_key(self, i: int) -> str:
+        """
+        Returns the key of the working directory (and environment) mutated while setting up the i'th element.
+
+        Elements with different keys can be set up concurrently, elements sharing a key cannot.
+        """
+        return str(i)
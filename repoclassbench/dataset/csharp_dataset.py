@@ -1,8 +1,6 @@
 """CSharp dataset setup"""
 
 import os
-import json
-import shutil
 import pickle
 import logging
 import pathlib
@@ -12,7 +10,10 @@ from repoclassbench.evaluator.csharp_evaluator import (
     CSharpEvaluator,
 )
 from repoclassbench.dataset.base_dataset import BaseDataset, TaskData
+from project_utils import tracing
 from project_utils.csharp_setup_utils import setup_dotnet, download_data, PROJECT_ROOT_DIR, DOTNET_ROOT_DIR
+from project_utils.repo_materialization import materialize_repo
+from project_utils import dataset_store
 
 class CSharpDataset(BaseDataset):
     """Class to load the CSharp dataset."""
@@ -26,7 +27,7 @@ class CSharpDataset(BaseDataset):
     def __init__(self, specification: str, delete_relatives: bool) -> None:
         self.specification = specification
         self.delete_relatives = delete_relatives
-        self.data = json.load(open("data/input/csharp_data.json", "r"))
+        self.data = dataset_store.load_dataset("csharp")
         pathlib.Path(self.original_repo_dir).mkdir(parents=True, exist_ok=True)
         # TODO: Check with security team whether external dir can be uploaded to GitHub
         # If yes, below line becomes redundant
@@ -37,6 +38,11 @@ class CSharpDataset(BaseDataset):
     def __len__(self) -> int:
         return len(self.data)
 
+    def workspace_key(self, i: int) -> str:
+        # Tasks of the same repository share the working repo
+        return self.data[i]["repo_metadata"]["repo_name"]
+
+    @tracing.traced(category="setup")
     def get_instance_and_setup_env(self, i: int) -> TaskData:
         data_instance = self.data[i]
         task_fname = data_instance["file"]
@@ -50,10 +56,8 @@ class CSharpDataset(BaseDataset):
             self.eval_repo_dir, data_instance["repo_metadata"]["repo_name"]
         )
 
-        if pathlib.Path(working_repo_path).exists():
-            shutil.rmtree(working_repo_path)
-        ## Copy the original repo to working repo
-        shutil.copytree(original_repo_path, working_repo_path)
+        ## Bring the working repo in line with the original repo
+        materialize_repo(original_repo_path, working_repo_path)
 
         if self.delete_relatives:
             raise NotImplementedError("Not yet implemented for CSharp")
@@ -2,12 +2,14 @@
 
 import os
 import zipfile
-import json
-import shutil
+from project_utils import tracing
+from project_utils.repo_materialization import materialize_repo
+from project_utils import dataset_store, java_setup_utils
 from repoclassbench.evaluator.java_evaluator import (
     JavaEvaluationMetadata,
     JavaEvaluator,
 )
+from repoclassbench.evaluator.java_evaluator_utils.sandbox import JavaSandbox
 from repoclassbench.dataset.base_dataset import BaseDataset, TaskData
 import gdown
 
@@ -18,35 +20,10 @@ class JavaDataset(BaseDataset):
     def __init__(self, specification: str, delete_relatives: bool) -> None:
         self.specification = specification
         self.delete_relatives = delete_relatives
-        self.data = json.load(open("data/input/java_data.json", "r"))
+        self.data = dataset_store.load_dataset("java")
         self._download_data()
-        ## Extract jdk and maven
-
-        os.makedirs("external/java",exist_ok=True)
-
-        if not os.path.exists("external/java/jdk-17.0.6"):
-            if not os.path.exists("external/java/jdk-17.0.6.zip"):
-                data_url = "https://drive.google.com/uc?id=1HIJICJgQQvM_LzbSVRdBlQyiD_kY5BNc"
-                gdown.download(data_url, "external/java/jdk-17.0.6.zip", quiet=False)            
-            with zipfile.ZipFile("external/java/jdk-17.0.6.zip", "r") as zip_ref:
-                zip_ref.extractall("external/java")
-        
-        if not os.path.exists("external/java/apache-maven-3.8.7"):
-            if not os.path.exists("external/java/apache-maven-3.8.7.zip"):
-                data_url = "https://drive.google.com/uc?id=1JFzF2oAzS8D31fhtpn3uIWhhWJTGG-5i"
-                gdown.download(data_url, "external/java/apache-maven-3.8.7.zip", quiet=False)                        
-            with zipfile.ZipFile(
-                "external/java/apache-maven-3.8.7.zip", "r"
-            ) as zip_ref:
-                zip_ref.extractall("external/java")
-        ## Give permissions
-        for root, dirs, files in os.walk("external/java"):
-            for d in dirs:
-                os.chmod(
-                    os.path.join(root, d), 0o777
-                )  # Set permissions for directories
-            for f in files:
-                os.chmod(os.path.join(root, f), 0o777)  # Set permissions for files
+        ## Extract jdk and maven (once; later constructions only check the install stamps)
+        java_setup_utils.ensure_installed(java_setup_utils.JDK, java_setup_utils.MAVEN)
 
     def _download_data(self) -> None:
         if os.path.exists("temp/java/original_repo"):
@@ -68,32 +45,56 @@ class JavaDataset(BaseDataset):
     def __len__(self) -> int:
         return len(self.data)
 
-    def get_instance_and_setup_env(self, i: int) -> TaskData:
+    def workspace_key(self, i: int) -> str:
+        # Tasks of the same repository share the working repo
+        return self.data[i]["repo_metadata"]["repo_name"]
+
+    def fetch_evaluator(self, i: int, sandbox: JavaSandbox = None) -> JavaEvaluator:
+        """
+        Builds the evaluator of the i'th task.
+
+        Args:
+            i (int): The task index.
+            sandbox (JavaSandbox, optional): Evaluates in the sandbox directories rather than in the
+                shared ones, so that evaluations can run concurrently (see `java_evaluator_utils.sandbox`).
+        """
+        data_instance = self.data[i]
+        return JavaEvaluator(
+            repo_name=data_instance["repo_metadata"]["repo_name"],
+            file_name=data_instance["file"],
+            evaluation_metadata=JavaEvaluationMetadata(
+                **data_instance["evaluation_metadata"]
+            ),
+            **(
+                {}
+                if sandbox is None
+                else {"eval_root": sandbox.eval_root, "local_repo": sandbox.local_repo}
+            ),
+        )
+
+    @tracing.traced(category="setup")
+    def get_instance_and_setup_env(self, i: int, sandbox: JavaSandbox = None) -> TaskData:
         data_instance = self.data[i]
         if self.delete_relatives:
             raise NotImplementedError("Not implemented yet")
-        
-        ## Delete the working repo
-        if os.path.exists("temp/java/working_repo"):
-            shutil.rmtree("temp/java/working_repo")
+        working_root = "temp/java/working_repo/" if sandbox is None else sandbox.working_root
 
-        ## Copy the original repo to working repo
-        shutil.copytree(
+        ## Bring the working repo in line with the original repo
+        materialize_repo(
             "temp/java/original_repo/" + data_instance["repo_metadata"]["repo_name"],
-            "temp/java/working_repo/" + data_instance["repo_metadata"]["repo_name"],
-            dirs_exist_ok=True,
+            os.path.join(working_root, data_instance["repo_metadata"]["repo_name"]),
         )
 
         ## Delete the test code. This should only be available during evaluation and not in the working repo.
         for file in os.walk(
-            "temp/java/working_repo/" + data_instance["repo_metadata"]["repo_name"]
+            os.path.join(working_root, data_instance["repo_metadata"]["repo_name"])
         ):
             if "src/test" in file and ".java" in file:
                 with open(file, "w") as f:
                     pass
 
         ## Delete ground truth from working repo
-        with open("temp/java/working_repo/" + data_instance["file"], "w") as file:
+        with open(os.path.join(working_root, data_instance["file"]), "w") as file:
             pass
 
         ## Read ground truth
@@ -108,15 +109,8 @@ class JavaDataset(BaseDataset):
                 if self.specification == "detailed"
                 else data_instance["sketchy_description"]
             ),
-            evaluator=JavaEvaluator(
-                repo_name=data_instance["repo_metadata"]["repo_name"],
-                file_name=data_instance["file"],
-                evaluation_metadata=JavaEvaluationMetadata(
-                    **data_instance["evaluation_metadata"]
-                ),
-            ),
-            repo_dir="temp/java/working_repo/"
-            + data_instance["repo_metadata"]["repo_name"],
+            evaluator=self.fetch_evaluator(i, sandbox),
+            repo_dir=os.path.join(working_root, data_instance["repo_metadata"]["repo_name"]),
             repo_metadata=data_instance["repo_metadata"],
             ground_truth=ground_truth,
         )
@@ -0,0 +1,131 @@
+"""Background preparation of upcoming tasks while the current one is being worked on.
+
+`get_instance_and_setup_env(i)` does all the setup synchronously (materializing the working repo,
+resetting it, conda/pip checks, ground-truth deletion, ...), while the agent then spends minutes on
+the task with the CPU mostly idle. `PrefetchingIterator` prepares the next `lookahead` tasks in
+background threads and hands each one over once it is requested.
+
+Every dataset sets up a task inside a working directory identified by `workspace_key(i)` (the issue
+for Python, the repository for Java/C#). Tasks are prepared in place, in those shared directories:
+there is no staging copy. A task is only prepared once every earlier task sharing its key has been
+released, ie. the previous task of the same repository is never modified under the consumer's feet.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from project_utils.common_utils import fetch_ist_adjusted_logger
+from project_utils.constants import DatasetConstants
+
+logger = fetch_ist_adjusted_logger()
+
+
+class PrefetchingIterator:
+    """
+    Iterates over `(index, TaskData)` pairs of a dataset, preparing upcoming tasks in the background.
+
+    The task returned by the previous `next()` call is considered released when `next()` is called
+    again (or when `release()` is called explicitly), so the usual loop works as is:
+
+        with PrefetchingIterator(dataset) as tasks:
+            for i, task in tasks:
+                ... # generate and evaluate
+
+    Args:
+        dataset: A `Dataset` or `BaseDataset` object.
+        indices (List[int], optional): The task indices to visit, in order. Defaults to all of them.
+        lookahead (int): How many tasks after the current one may be prepared ahead of time.
+        max_workers (int): Number of background threads.
+
+    `stats` counts the tasks which were ready when requested (`prefetched`), still being prepared
+    (`in_flight`) or set up on request (`synchronous`), and the total time spent waiting for them.
+    """
+
+    def __init__(
+        self,
+        dataset,
+        indices=None,
+        lookahead: int = DatasetConstants.PREFETCH_LOOKAHEAD,
+        max_workers: int = DatasetConstants.PREFETCH_MAX_WORKERS,
+    ) -> None:
+        assert lookahead >= 0 and max_workers >= 1
+        self.dataset = dataset
+        self.indices = list(range(len(dataset))) if indices is None else list(indices)
+        self.lookahead = lookahead
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="rcb-prefetch"
+        )
+        self._next_pos = 0
+        # position -> Future[TaskData] of the tasks being prepared in the background
+        self._futures = {}
+        # workspace key of the task currently handed over to the consumer
+        self._held_key = None
+
+        self.stats = {"prefetched": 0, "in_flight": 0, "synchronous": 0, "wait_sec": 0.0}
+
+    def __iter__(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _schedule(self, start_pos: int) -> None:
+        """Submits the tasks in the lookahead window whose working directory is free."""
+        # Keys which must not be touched: the task held by the consumer and every earlier task of the window
+        blocked_keys = set() if self._held_key is None else {self._held_key}
+        end_pos = min(start_pos + self.lookahead + 1, len(self.indices))
+        for pos in range(start_pos, end_pos):
+            i = self.indices[pos]
+            key = self.dataset.workspace_key(i)
+            if key in blocked_keys:
+                continue
+            blocked_keys.add(key)
+            if pos in self._futures:
+                continue
+
+            logger.debug(f"Prefetching task {i} (workspace: {key})")
+            self._futures[pos] = self._executor.submit(
+                self.dataset.get_instance_and_setup_env, i
+            )
+
+    def release(self) -> None:
+        """Marks the task handed over last as done, allowing its working directory to be reused."""
+        self._held_key = None
+
+    def __next__(self):
+        self.release()
+        if self._next_pos >= len(self.indices):
+            self.close()
+            raise StopIteration
+
+        pos = self._next_pos
+        self._next_pos += 1
+        i = self.indices[pos]
+
+        # Not scheduled by the previous call (first task, or same workspace as the previous task): set up here
+        start_time = time.perf_counter()
+        future = self._futures.pop(pos, None)
+        if future is not None:
+            self.stats["prefetched" if future.done() else "in_flight"] += 1
+            task = future.result()
+        else:
+            task = self.dataset.get_instance_and_setup_env(i)
+            self.stats["synchronous"] += 1
+        wait_sec = time.perf_counter() - start_time
+        self.stats["wait_sec"] += wait_sec
+        logger.debug(f"Task {i} handed over after waiting {wait_sec:.2f}s")
+
+        self._held_key = self.dataset.workspace_key(i)
+        self._schedule(self._next_pos)
+        return i, task
+
+    def close(self) -> None:
+        """Stops prefetching. Tasks already being prepared are allowed to finish."""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=True)
@@ -2,12 +2,14 @@
 
 import os
 import zipfile
-import json
 import gdown
 
+from project_utils import tracing
 from project_utils.constants import PythonConstants
+from project_utils import dataset_store
 from repoclassbench.evaluator.python_evaluator import PythonEvaluator
 from repoclassbench.dataset.base_dataset import BaseDataset, TaskData
+from repoclassbench.dataset.python_setup_utils import environment_manager
 from repoclassbench.dataset.python_setup_utils.python_repo_initializer import (
     PythonRepoInitializer,
 )
@@ -23,8 +25,8 @@ class PythonDataset(BaseDataset):
         self.specification = specification
         self.delete_relatives = delete_relatives
 
-        # Load the dataset from a JSON file
-        self.data = json.load(open("data/input/python_data.json", "r"))
+        # Load the dataset (shared with the rest of the process through the dataset store)
+        self.data = dataset_store.load_dataset("python")
 
         # Download the repositories associated with the dataset
         self._download_data()
@@ -61,6 +63,12 @@ class PythonDataset(BaseDataset):
         # Return the number of items in the dataset
         return len(self.data)
 
+    def workspace_key(self, i: int) -> str:
+        # Tasks of the same issue share the testbed repository, and tasks with the same install spec
+        # share the conda environment (whose editable install points to the checkout being set up)
+        return environment_manager.get_environment_name(self.data[i])
+
+    @tracing.traced(category="setup")
     def get_instance_and_setup_env(self, i: int) -> TaskData:
         """
         Retrieves the task instance data at the given index and sets up the environment for the task.
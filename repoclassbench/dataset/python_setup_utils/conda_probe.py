@@ -0,0 +1,184 @@
+"""Reads conda environment and package metadata directly from the filesystem.
+
+`conda env list` and `conda activate <env> && pip list` take seconds each, and the setup of every
+task used to run them several times even when nothing needed to be installed. The probe answers the
+same questions by reading the `envs` directories (`conda-meta`) and the `site-packages` metadata of
+an environment (`direct_url.json`, `.egg-link`, `__editable__` finders).
+
+Results are cached per environment until its `conda-meta/history` (touched by conda) or its
+`site-packages` directory (touched by pip when a distribution is added or removed) changes.
+
+Functions return None when the filesystem layout is not the expected one, in which case the callers
+fall back to the subprocess-based implementation.
+"""
+
+import glob
+import json
+import os
+import re
+import threading
+from urllib.parse import unquote, urlparse
+
+from project_utils.constants import PythonConstants
+
+# env_dir -> (cache_key, referenced_directories)
+_REFERENCED_DIRS_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_envs_dirs():
+    """Returns the directories holding the named conda environments."""
+    envs_dirs = [os.path.join(PythonConstants.CONDA_PREFIX, "envs")]
+    for path in os.environ.get("CONDA_ENVS_PATH", "").split(os.pathsep):
+        if path and path not in envs_dirs:
+            envs_dirs.append(path)
+    return [d for d in envs_dirs if os.path.isdir(d)]
+
+
+def list_environments():
+    """
+    Lists the names of the conda environments, like `conda env list` does.
+
+    Returns:
+        List[str]: The environment names (including `base`), or None if the conda installation could not be read.
+    """
+    if not os.path.isdir(os.path.join(PythonConstants.CONDA_PREFIX, "conda-meta")):
+        return None
+    environments = ["base"]
+    for envs_dir in get_envs_dirs():
+        for name in sorted(os.listdir(envs_dir)):
+            if os.path.isdir(os.path.join(envs_dir, name, "conda-meta")):
+                environments.append(name)
+    return environments
+
+
+def get_env_dir(env_name: str):
+    """Returns the prefix of the environment with the given name (None if it does not exist)."""
+    if env_name == "base":
+        return PythonConstants.CONDA_PREFIX
+    for envs_dir in get_envs_dirs():
+        env_dir = os.path.join(envs_dir, env_name)
+        if os.path.isdir(os.path.join(env_dir, "conda-meta")):
+            return env_dir
+    return None
+
+
+def get_site_packages_dirs(env_dir: str):
+    """Returns the `site-packages` directories of the environment."""
+    return sorted(glob.glob(os.path.join(env_dir, "lib", "python*", "site-packages")))
+
+
+def _mtime_ns(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _cache_key(env_dir: str, site_packages_dirs):
+    return (
+        _mtime_ns(os.path.join(env_dir, "conda-meta", "history")),
+        tuple((d, _mtime_ns(d)) for d in site_packages_dirs),
+    )
+
+
+def _read_dist_name(dist_info_dir: str) -> str:
+    """Reads the project name from the `METADATA` file of a `.dist-info` directory."""
+    try:
+        with open(os.path.join(dist_info_dir, "METADATA"), "r", errors="replace") as f:
+            for line in f:
+                if line.startswith("Name:"):
+                    return line[len("Name:"):].strip()
+                if not line.strip():
+                    break
+    except FileNotFoundError:
+        pass
+    return os.path.basename(dist_info_dir).split("-")[0]
+
+
+def _editable_location_from_finder(site_packages_dir: str, dist_name: str):
+    """Reads the project location from a `__editable___<name>_<version>_finder.py` (setuptools PEP 660 installs)."""
+    normalized_name = re.sub(r"[-_.]+", "_", dist_name).lower()
+    for finder_path in glob.glob(os.path.join(site_packages_dir, "__editable___*_finder.py")):
+        if not os.path.basename(finder_path).lower().startswith(f"__editable___{normalized_name}_"):
+            continue
+        with open(finder_path, "r", errors="replace") as f:
+            match = re.search(r"MAPPING\s*(?::[^=]*)?=\s*(\{.*?\})", f.read(), re.DOTALL)
+        if match is None:
+            continue
+        paths = re.findall(r"'([^']+)'|\"([^\"]+)\"", match.group(1))
+        # MAPPING = {'pkg': '/path/to/repo/src/pkg'} -> the package's parent directory
+        locations = [p[0] or p[1] for p in paths[1::2]]
+        if len(locations) > 0:
+            return os.path.dirname(locations[0])
+    return None
+
+
+def _scan_editable_installs(site_packages_dir: str):
+    """Finds the editable installs of a `site-packages` directory as (name, location) pairs."""
+    ans = []
+    has_editable_finders = (
+        len(glob.glob(os.path.join(site_packages_dir, "__editable___*_finder.py"))) > 0
+    )
+    for entry in sorted(os.listdir(site_packages_dir)):
+        entry_path = os.path.join(site_packages_dir, entry)
+        if entry.endswith(".dist-info"):
+            direct_url_path = os.path.join(entry_path, "direct_url.json")
+            if os.path.exists(direct_url_path):
+                with open(direct_url_path, "r") as f:
+                    direct_url = json.load(f)
+                if not direct_url.get("dir_info", {}).get("editable", False):
+                    continue
+                url = urlparse(direct_url["url"])
+                if url.scheme != "file":
+                    continue
+                ans.append((_read_dist_name(entry_path), unquote(url.path)))
+            elif has_editable_finders:
+                # PEP 660 installs made by tools which do not write `direct_url.json`
+                dist_name = _read_dist_name(entry_path)
+                location = _editable_location_from_finder(site_packages_dir, dist_name)
+                if location is not None:
+                    ans.append((dist_name, location))
+        elif entry.endswith(".egg-link"):
+            # Legacy `setup.py develop` installs
+            with open(entry_path, "r") as f:
+                location = f.readline().strip()
+            ans.append((entry[: -len(".egg-link")], location))
+    return ans
+
+
+def get_referenced_directories(env_name: str):
+    """
+    Finds the packages installed in editable mode in an environment, like `pip list` does.
+
+    Args:
+        env_name (str): The conda environment name.
+
+    Returns:
+        List[Tuple[str, str]]: (package name, referenced directory) pairs, or None if the environment could not be read.
+    """
+    env_dir = get_env_dir(env_name)
+    if env_dir is None:
+        return None
+    site_packages_dirs = get_site_packages_dirs(env_dir)
+    if len(site_packages_dirs) == 0:
+        return None
+
+    cache_key = _cache_key(env_dir, site_packages_dirs)
+    with _CACHE_LOCK:
+        cached = _REFERENCED_DIRS_CACHE.get(env_dir)
+    if cached is not None and cached[0] == cache_key:
+        return list(cached[1])
+
+    ans = []
+    for site_packages_dir in site_packages_dirs:
+        ans.extend(_scan_editable_installs(site_packages_dir))
+    with _CACHE_LOCK:
+        _REFERENCED_DIRS_CACHE[env_dir] = (cache_key, ans)
+    return list(ans)
+
+
+def clear_cache():
+    """Drops all the cached results."""
+    with _CACHE_LOCK:
+        _REFERENCED_DIRS_CACHE.clear()
@@ -9,6 +9,8 @@ from copy import deepcopy
 from project_utils.common_utils import fetch_ist_adjusted_logger
 import repoclassbench.dataset.python_setup_utils.swebench_related_constants as swebench_related_constants
 from project_utils.constants import PythonConstants
+from project_utils import dataset_store
+from repoclassbench.dataset.python_setup_utils import conda_probe
 
 logger = fetch_ist_adjusted_logger()
 
@@ -23,15 +25,7 @@ def fetch_repotools_task_elem(repoclassbench_id: str):
     Returns:
         dict: The repository tools task element matching the repoclassbench_id, or None if not found.
     """
-    file_path = os.path.join(PythonConstants.ProjectDir, "data/input/python_data.json")
-    assert os.path.exists(file_path)
-    with open(file_path, "r") as f:
-        data = json.load(f)
-    relevant_elems = [x for x in data if x["task_id"] == repoclassbench_id]
-    if len(relevant_elems) == 0:
-        return None
-    assert len(relevant_elems) == 1
-    return relevant_elems[0]
+    return dataset_store.fetch_task_elem("python", repoclassbench_id)
 
 
 # def fetch_repo_to_commit_mapping():
@@ -50,6 +44,11 @@ def get_conda_environments():
     Returns:
         list: A list of conda environment names.
     """
+    # Read the envs directories directly when possible
+    environments = conda_probe.list_environments()
+    if environments is not None:
+        return environments
+
     # Run the 'conda env list' command and capture its output
     output = subprocess.check_output(["conda", "env", "list"]).decode("utf-8")
 
@@ -287,6 +286,11 @@ def get_referenced_directories(env_name: str) -> List:
     Returns:
         List: A list of tuples containing the package name and the referenced directory path.
     """
+    # Read the site-packages metadata directly when possible
+    paths_referenced = conda_probe.get_referenced_directories(env_name)
+    if paths_referenced is not None:
+        return paths_referenced
+
     output = conda_pip_list(env_name)
     paths_referenced = []
     _stat = False
@@ -0,0 +1,274 @@
+"""Conda environments shared between the tasks with the same install spec.
+
+Environments used to be created per issue (`CONDA_ENV_NAME = SWEBENCH_ISSUE_ID`), even when several
+issues share the same repository and `MAP_VERSION_TO_INSTALL` entry. Here, an environment is keyed
+by its install spec (repo, version, python, packages, pip_packages, ...) and built once. If a legacy
+per-issue environment with the same spec already exists, it is cloned instead of being rebuilt.
+
+The editable install of the task checkout (`run_folder_state_installation_script`) is not part of
+the shared environment: it is re-pointed to the checkout of the current task during setup.
+"""
+
+import fcntl
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from project_utils import common_utils as utils
+from project_utils.constants import PythonConstants
+from repoclassbench.dataset.python_setup_utils import (
+    data_utils,
+    swebench_related_constants,
+)
+
+logger = utils.fetch_ist_adjusted_logger()
+
+# Installation settings of the litestar task (which is not a part of SWE-Bench)
+LITESTAR_INSTALL_OBJ = {
+    "python": "3.8",
+    "install": "pdm install --dev ; pip install -e .",
+}
+
+# Keys of the `MAP_VERSION_TO_INSTALL` entries which influence the environment itself
+# (`install` and `pre_install` are run per checkout)
+ENV_SPEC_KEYS = ("python", "packages", "pip_packages", "no_use_env")
+
+# env_name -> threading.Lock
+_ENV_LOCKS = {}
+_ENV_LOCKS_GUARD = threading.Lock()
+
+
+def get_install_related_obj(repotools_elem: dict) -> dict:
+    """
+    Fetches the installation settings (python version, packages, install commands) of a task.
+
+    Args:
+        repotools_elem (dict): The RepoClassBench task element.
+
+    Returns:
+        dict: The `MAP_VERSION_TO_INSTALL` entry of the task (or the litestar settings).
+    """
+    swebench_elem = repotools_elem["repo_metadata"]["setup_details"]
+    if swebench_elem is None:
+        assert "litestar" in repotools_elem["repo_metadata"]["issue_id"]
+        return LITESTAR_INSTALL_OBJ
+    return swebench_related_constants.MAP_VERSION_TO_INSTALL[swebench_elem["repo"]][
+        swebench_elem["version"]
+    ]
+
+
+def get_environment_spec(repotools_elem: dict) -> dict:
+    """
+    Returns the install spec which fully determines the (shared) conda environment of a task.
+
+    Args:
+        repotools_elem (dict): The RepoClassBench task element.
+
+    Returns:
+        dict: The install spec.
+    """
+    install_related_obj = get_install_related_obj(repotools_elem)
+    swebench_elem = repotools_elem["repo_metadata"]["setup_details"]
+    spec = {k: install_related_obj[k] for k in ENV_SPEC_KEYS if k in install_related_obj}
+    if swebench_elem is None:
+        spec["repo"] = "litestar-org/litestar"
+        spec["version"] = None
+        spec["litestar"] = True
+        return spec
+
+    spec["repo"] = swebench_elem["repo"]
+    spec["version"] = swebench_elem["version"]
+    if spec.get("packages") in ["requirements.txt", "environment.yml"]:
+        # The requirement files are fetched at this commit
+        spec["requirements_commit"] = swebench_elem.get(
+            "environment_setup_commit", swebench_elem["base_commit"]
+        )
+    return spec
+
+
+def get_environment_name(repotools_elem: dict) -> str:
+    """
+    Returns the name of the conda environment to be used for a task.
+
+    With `PythonConstants.SHARE_CONDA_ENVS`, the name is derived from the install spec, eg:
+    `rcb_pylint-dev__pylint_3.0_1a2b3c4d`. Otherwise, the issue ID is used.
+
+    Args:
+        repotools_elem (dict): The RepoClassBench task element.
+
+    Returns:
+        str: The conda environment name.
+    """
+    if not PythonConstants.SHARE_CONDA_ENVS:
+        return repotools_elem["repo_metadata"]["issue_id"]
+    spec = get_environment_spec(repotools_elem)
+    spec_hash = utils.fetch_hash(json.dumps(spec, sort_keys=True))[:8]
+    slug = re.sub(r"[^A-Za-z0-9_.-]", "_", spec["repo"].replace("/", "__"))
+    if spec["version"] is None:
+        return f"rcb_{slug}_{spec_hash}"
+    return f"rcb_{slug}_{spec['version']}_{spec_hash}"
+
+
+@contextmanager
+def _environment_lock(env_name: str):
+    """Serializes the creation of an environment across threads and processes."""
+    with _ENV_LOCKS_GUARD:
+        thread_lock = _ENV_LOCKS.setdefault(env_name, threading.Lock())
+    lock_path = os.path.join(PythonConstants.DIR_FOR_CONDA_ENV_LOCKS, f"{env_name}.lock")
+    with thread_lock, open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _fetch_installation_script(repotools_elem: dict, env_name: str) -> str:
+    """Formats the environment installation template (`00_environment_installation.sh`) for a task."""
+    install_related_obj = get_install_related_obj(repotools_elem)
+    swebench_elem = repotools_elem["repo_metadata"]["setup_details"]
+    issue_id = repotools_elem["repo_metadata"]["issue_id"]
+
+    # requirements.txt, environment.yml are downloaded here
+    dump_dir = os.path.join(PythonConstants.DIR_TEMP_FILES, env_name)
+    os.makedirs(dump_dir, exist_ok=True)
+
+    ####################
+    # Set default commands for installation
+    defaults = {
+        k: ""
+        for k in [
+            "requirements_cmd",
+            "environment_yaml_cmd",
+            "pip_cmd",
+            "pip_packages_cmd",
+            "requirements_pip_cmd",
+            "yaml_pip_cmd",
+        ]
+    }
+    defaults["env_name"] = env_name
+
+    # Determine the type of package installation
+    install_packages_type = (
+        install_related_obj["packages"] if "packages" in install_related_obj else ""
+    )
+
+    set_val = {}
+
+    # Handle different types of package installations
+    if install_packages_type == "requirements.txt":
+        # Command to create a Conda environment with a specific Python version
+        cmd_use = f"conda create -n {env_name} python={install_related_obj['python']} -y"
+        set_val["requirements_cmd"] = cmd_use
+        # Get the path to the requirements.txt file
+        path_to_reqs = data_utils.get_requirements(swebench_elem, dump_dir)
+        # Command to install packages from requirements.txt using pip
+        set_val["requirements_pip_cmd"] = f"pip install -r {path_to_reqs}"
+    elif install_packages_type == "environment.yml":
+        # Get the path to the environment.yml file
+        path_to_reqs = data_utils.get_environment_yml(swebench_elem, env_name, dump_dir)
+        if not (
+            "no_use_env" in install_related_obj and install_related_obj["no_use_env"]
+        ):
+            # Command to create a Conda environment from environment.yml
+            cmd_use = f"conda env create --file {path_to_reqs}"
+            set_val["environment_yaml_cmd"] = cmd_use
+        else:
+            # Command to create a Conda environment with a specific Python version
+            cmd_use = f"conda create -c conda-forge -n {env_name} python={install_related_obj['python']} -y"
+            set_val["environment_yaml_cmd"] = cmd_use
+            # Command to update the Conda environment from environment.yml
+            set_val["yaml_pip_cmd"] = f"conda env update -f {path_to_reqs}"
+    else:
+        # Command to create a Conda environment with specific packages
+        _pkgs = install_packages_type
+        cmd_use = f"conda create -n {env_name} python={install_related_obj['python']} {_pkgs} -y"
+        set_val["pip_cmd"] = cmd_use
+
+    ##################################
+    # Handle additional pip packages
+    if "pip_packages" in install_related_obj:
+        _pip_pkgs = install_related_obj["pip_packages"]
+        set_val["pip_packages_cmd"] = f"pip install {_pip_pkgs}"
+    if "litestar" in issue_id:
+        # Read and set the specific installation script for litestar
+        set_val["pip_packages_cmd"] = (
+            "\n"
+            + open(
+                os.path.join(
+                    PythonConstants.ProjectDir,
+                    "repoclassbench/dataset/python_setup_utils/script_templates/03_litestar_specific_installation.txt",
+                )
+            ).read()
+            + "\n"
+        )
+    #############################
+
+    # Merge default and specific commands
+    args_use = {**defaults, **set_val}
+
+    # Read and format the bash template for environment installation
+    with open(
+        os.path.join(
+            PythonConstants.ProjectDir,
+            "repoclassbench/dataset/python_setup_utils/script_templates/00_environment_installation.sh",
+        ),
+        "r",
+    ) as f:
+        bash_template = f.read()
+    return bash_template.format(**args_use)
+
+
+def _fetch_clone_script(source_env_name: str, env_name: str) -> str:
+    return f"""
+#!/bin/bash
+
+eval "$(conda shell.bash hook)"
+conda create --clone {source_env_name} -n {env_name} -y
+"""
+
+
+def ensure_environment(repotools_elem: dict, env_name: str = None) -> dict:
+    """
+    Makes sure that the conda environment of a task exists, building it only if no task built it before.
+
+    Args:
+        repotools_elem (dict): The RepoClassBench task element.
+        env_name (str, optional): The environment name. Defaults to `get_environment_name(repotools_elem)`.
+
+    Returns:
+        dict: A dictionary with the following keys:
+            - 'env_name': The environment name.
+            - 'action': One of `exists`, `cloned` or `built`.
+            - 'script': The bash script which was run (None if the environment already existed).
+            - 'result': The result of `execute_bash_script` (None if the environment already existed).
+    """
+    env_name = env_name or get_environment_name(repotools_elem)
+    issue_id = repotools_elem["repo_metadata"]["issue_id"]
+    ans = {"env_name": env_name, "action": "exists", "script": None, "result": None}
+
+    with _environment_lock(env_name):
+        existing_envs = data_utils.get_conda_environments()
+        if env_name in existing_envs:
+            logger.debug(f"Conda env {env_name} already exists, so skipping environment installation")
+            return ans
+
+        if issue_id != env_name and issue_id in existing_envs:
+            # A legacy per-issue environment with the same spec is cheaper to clone than to rebuild
+            logger.info(f"Cloning legacy conda env {issue_id} into {env_name}")
+            ans["action"] = "cloned"
+            ans["script"] = _fetch_clone_script(issue_id, env_name)
+            ans["result"] = utils.execute_bash_script(ans["script"])
+            if ans["result"]["exit_status"] == 0:
+                return ans
+            logger.error(
+                f"Cloning {issue_id} failed, building {env_name} from scratch: {ans['result']['stderr']}"
+            )
+
+        logger.info(f"Building conda env {env_name} for {issue_id}")
+        ans["action"] = "built"
+        ans["script"] = _fetch_installation_script(repotools_elem, env_name)
+        ans["result"] = utils.execute_bash_script(ans["script"])
+    return ans
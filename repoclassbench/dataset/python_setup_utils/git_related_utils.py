@@ -1,15 +1,87 @@
 import os
+import time
 from git import Repo, GitCommandError
+from project_utils import tracing
 from project_utils.common_utils import fetch_ist_adjusted_logger
 
 
 logger = fetch_ist_adjusted_logger()
 
+# Maximum number of paths passed to a single `git restore` call
+RESTORE_BATCH_SIZE = 500
 
+
+def commit_exists(repo: Repo, commit_id: str) -> bool:
+    """
+    Checks whether the commit object exists, without walking the history.
+
+    Args:
+        repo (Repo): The repository.
+        commit_id (str): The (possibly abbreviated) commit ID.
+
+    Returns:
+        bool: True if the commit exists.
+    """
+    try:
+        repo.git.cat_file("-e", f"{commit_id}^{{commit}}")
+        return True
+    except GitCommandError:
+        return False
+
+
+def get_dirty_paths(repo: Repo):
+    """
+    Lists the tracked paths whose index or working tree state differs from HEAD.
+
+    Untracked files are not reported (`reset --hard` leaves them alone as well).
+
+    Args:
+        repo (Repo): The repository.
+
+    Returns:
+        List[str]: Paths relative to the repository root (both sides of a rename are included).
+    """
+    output = repo.git.status("--porcelain", "-z", "--untracked-files=no")
+    entries = [x for x in output.split("\0") if len(x) > 0]
+    dirty_paths = []
+    i = 0
+    while i < len(entries):
+        status, path = entries[i][:2], entries[i][3:]
+        dirty_paths.append(path)
+        if "R" in status or "C" in status:
+            # Renames and copies are followed by the original path
+            i += 1
+            dirty_paths.append(entries[i])
+        i += 1
+    return dirty_paths
+
+
+def restore_paths(repo: Repo, source: str, paths) -> None:
+    """
+    Restores the index and working tree state of the given paths from `source`.
+
+    Paths which do not exist in `source` are removed, which matches what `reset --hard` does.
+    """
+    with repo.git.custom_environment(GIT_LITERAL_PATHSPECS="1"):
+        for i in range(0, len(paths), RESTORE_BATCH_SIZE):
+            repo.git.restore(
+                "--source",
+                source,
+                "--staged",
+                "--worktree",
+                "--",
+                *paths[i : i + RESTORE_BATCH_SIZE],
+            )
+
+
+@tracing.traced(category="git")
 def reset_to_commit(repo_path: str, commit_id: str):
     """
     Reset the repository to a specific commit without affecting .gitignore files.
 
+    When HEAD already points to the commit, only the tracked paths which are dirty are restored
+    (a no-op for a clean checkout). Otherwise, a hard reset is performed.
+
     Args:
         repo_path (str): Path to the repository.
         commit_id (str): The commit ID to reset to.
@@ -17,6 +89,7 @@ def reset_to_commit(repo_path: str, commit_id: str):
     Returns:
         bool: True if reset was successful, False otherwise.
     """
+    start_time = time.perf_counter()
     try:
         # Initialize the repository object
         repo = Repo(repo_path)
@@ -27,13 +100,35 @@ def reset_to_commit(repo_path: str, commit_id: str):
             return False
 
         # Check if the commit_id exists in the repository
-        if commit_id not in repo.git.rev_list("--all"):
+        if not commit_exists(repo, commit_id):
             logger.error(f"Commit ID {commit_id} does not exist in the repository.")
             return False
 
-        # Perform a hard reset to the specified commit
-        repo.git.reset("--hard", commit_id)
-        logger.info(f"Repository has been successfully reset to commit {commit_id}.")
+        target_commit = repo.git.rev_parse(f"{commit_id}^{{commit}}")
+        try:
+            head_commit = repo.git.rev_parse("--verify", "-q", "HEAD")
+        except GitCommandError:
+            # Unborn HEAD
+            head_commit = None
+        if head_commit == target_commit:
+            dirty_paths = get_dirty_paths(repo)
+            mode = f"restored {len(dirty_paths)} dirty paths"
+            if len(dirty_paths) > 0:
+                try:
+                    restore_paths(repo, target_commit, dirty_paths)
+                except GitCommandError as e:
+                    logger.warning(f"Restoring dirty paths failed, falling back to a hard reset: {e}")
+                    repo.git.reset("--hard", target_commit)
+                    mode = "hard reset"
+        else:
+            # Perform a hard reset to the specified commit
+            repo.git.reset("--hard", target_commit)
+            mode = "hard reset"
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        logger.info(
+            f"Repository has been successfully reset to commit {commit_id} ({mode}) in {elapsed_ms:.1f} ms."
+        )
         return True
     except Exception as e:
         logger.exception(f"An error occurred while resetting the repository: {e}")
@@ -0,0 +1,259 @@
+"""Provisions all the conda environments needed by the Python tasks ahead of a run.
+
+Usage:
+    python -m repoclassbench.dataset.python_setup_utils.provision_environments list
+    python -m repoclassbench.dataset.python_setup_utils.provision_environments build --max-workers 4 [--export]
+    python -m repoclassbench.dataset.python_setup_utils.provision_environments export [--env-name NAME]
+    python -m repoclassbench.dataset.python_setup_utils.provision_environments import [--env-name NAME]
+
+`build` computes the distinct install specs of `python_data.json` (see `environment_manager`) and
+builds the missing environments in parallel, with package caches shared between the builds.
+
+`export` writes every environment as a relocatable tarball (using `conda-pack` when installed,
+otherwise a plain tarball which can only be restored under the same conda prefix) to
+`PythonConstants.DIR_FOR_ENV_PACKS`. On a fresh evaluation node, `import` restores them by
+extraction instead of dependency resolution. The editable install of the task checkout is not part
+of a pack; it is redone per task by `PythonRepoInitializer.ensure_final_runnable_state`.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import tarfile
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+from project_utils import common_utils as utils
+from project_utils import dataset_store
+from project_utils.constants import PythonConstants
+from repoclassbench.dataset.python_setup_utils import data_utils, environment_manager
+
+logger = utils.fetch_ist_adjusted_logger()
+
+PACK_SUFFIX = ".tar.gz"
+METADATA_SUFFIX = ".json"
+
+
+def collect_environment_specs(records=None) -> dict:
+    """
+    Computes the distinct environments needed by the Python tasks.
+
+    Args:
+        records (List[dict], optional): The task elements. Defaults to the whole Python dataset.
+
+    Returns:
+        dict: environment name -> a task element using that environment.
+    """
+    records = dataset_store.load_dataset("python") if records is None else records
+    env_to_elem = {}
+    for elem in records:
+        env_to_elem.setdefault(environment_manager.get_environment_name(elem), elem)
+    return env_to_elem
+
+
+def configure_shared_caches(
+    conda_pkgs_dir: str = PythonConstants.SHARED_CONDA_PKGS_DIR,
+    pip_cache_dir: str = PythonConstants.SHARED_PIP_CACHE_DIR,
+) -> None:
+    """Makes all the (child) conda and pip processes of this process share the same package caches."""
+    os.makedirs(conda_pkgs_dir, exist_ok=True)
+    os.makedirs(pip_cache_dir, exist_ok=True)
+    os.environ["CONDA_PKGS_DIRS"] = conda_pkgs_dir
+    os.environ["PIP_CACHE_DIR"] = pip_cache_dir
+
+
+def build_environments(env_to_elem: dict, max_workers: int = 4) -> dict:
+    """
+    Builds the missing environments in parallel.
+
+    Args:
+        env_to_elem (dict): environment name -> a task element using that environment.
+        max_workers (int): Maximum number of concurrent builds.
+
+    Returns:
+        dict: environment name -> {'action', 'exit_status', 'elapsed_sec'}
+    """
+
+    def _build(env_name):
+        start_time = time.perf_counter()
+        try:
+            details = environment_manager.ensure_environment(env_to_elem[env_name], env_name)
+            exit_status = 0 if details["result"] is None else details["result"]["exit_status"]
+            action = details["action"]
+        except Exception as E:
+            logger.exception(f"Building {env_name} failed: {E}")
+            action, exit_status = "failed", None
+        elapsed_sec = time.perf_counter() - start_time
+        logger.info(f"[{env_name}] {action} (exit status: {exit_status}) in {elapsed_sec:.1f}s")
+        return {"action": action, "exit_status": exit_status, "elapsed_sec": elapsed_sec}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(zip(env_to_elem, executor.map(_build, env_to_elem)))
+    return results
+
+
+def _env_dir(env_name: str) -> str:
+    return os.path.join(PythonConstants.CONDA_PREFIX, "envs", env_name)
+
+
+def _conda_pack_executable():
+    return shutil.which("conda-pack") or shutil.which(
+        "conda-pack", path=os.path.join(PythonConstants.CONDA_PREFIX, "bin")
+    )
+
+
+def export_environment(env_name: str, packs_dir: str = PythonConstants.DIR_FOR_ENV_PACKS) -> str:
+    """
+    Exports an environment as a tarball (plus a metadata file) in `packs_dir`.
+
+    Args:
+        env_name (str): The environment to export.
+        packs_dir (str): Where the packs are written.
+
+    Returns:
+        str: The path to the tarball.
+    """
+    assert os.path.isdir(_env_dir(env_name)), f"Conda env {env_name} does not exist"
+    os.makedirs(packs_dir, exist_ok=True)
+    pack_path = os.path.join(packs_dir, env_name + PACK_SUFFIX)
+    tmp_pack_path = pack_path + ".tmp"
+
+    conda_pack = _conda_pack_executable()
+    if conda_pack is not None:
+        method = "conda-pack"
+        subprocess.run(
+            [
+                conda_pack,
+                "-p",
+                _env_dir(env_name),
+                "-o",
+                tmp_pack_path,
+                "--format",
+                "tar.gz",
+                "--ignore-editable-packages",
+                "--ignore-missing-files",
+                "--force",
+            ],
+            check=True,
+            capture_output=True,
+        )
+    else:
+        # Not relocatable: can only be restored under the same conda prefix
+        method = "tarball"
+        logger.warning("conda-pack not found, exporting %s as a plain tarball", env_name)
+        with tarfile.open(tmp_pack_path, "w:gz") as tar:
+            tar.add(_env_dir(env_name), arcname=".")
+    os.replace(tmp_pack_path, pack_path)
+
+    with open(os.path.join(packs_dir, env_name + METADATA_SUFFIX), "w") as f:
+        json.dump(
+            {
+                "env_name": env_name,
+                "method": method,
+                "conda_prefix": os.path.abspath(PythonConstants.CONDA_PREFIX),
+                "exported_at": utils.get_ist_time(),
+            },
+            f,
+            indent=1,
+        )
+    return pack_path
+
+
+def import_environment(env_name: str, packs_dir: str = PythonConstants.DIR_FOR_ENV_PACKS) -> bool:
+    """
+    Restores an environment from its pack, unless it already exists.
+
+    Args:
+        env_name (str): The environment to restore.
+        packs_dir (str): Where the packs are read from.
+
+    Returns:
+        bool: True if the environment was restored.
+    """
+    pack_path = os.path.join(packs_dir, env_name + PACK_SUFFIX)
+    with open(os.path.join(packs_dir, env_name + METADATA_SUFFIX), "r") as f:
+        metadata = json.load(f)
+    env_dir = _env_dir(env_name)
+    if os.path.exists(env_dir):
+        logger.debug(f"Conda env {env_name} already exists, not restoring it")
+        return False
+    if metadata["method"] == "tarball" and os.path.abspath(
+        PythonConstants.CONDA_PREFIX
+    ) != metadata["conda_prefix"]:
+        logger.error(
+            f"{pack_path} is not relocatable (exported from {metadata['conda_prefix']}), skipping it"
+        )
+        return False
+
+    tmp_env_dir = env_dir + ".partial"
+    if os.path.exists(tmp_env_dir):
+        shutil.rmtree(tmp_env_dir)
+    os.makedirs(tmp_env_dir)
+    with tarfile.open(pack_path, "r:gz") as tar:
+        # The "data" filter rejects the members which would be written outside of the target directory
+        tar.extractall(tmp_env_dir, filter="data")
+    os.rename(tmp_env_dir, env_dir)
+
+    if metadata["method"] == "conda-pack":
+        # Rewrites the prefixes embedded in the environment
+        try:
+            subprocess.run(
+                [os.path.join(env_dir, "bin", "conda-unpack")], check=True, capture_output=True
+            )
+        except Exception:
+            # A half relocated environment would otherwise be taken as restored by the next imports
+            shutil.rmtree(env_dir, ignore_errors=True)
+            raise
+    logger.info(f"Restored conda env {env_name} from {pack_path}")
+    return True
+
+
+def main():
+    parser = ArgumentParser(description="Provision the conda environments of the Python tasks")
+    parser.add_argument("command", choices=["list", "build", "export", "import"])
+    parser.add_argument("--env-name", action="append", default=None,
+                        help="Restrict to the given environment(s)")
+    parser.add_argument("--max-workers", type=int, default=4,
+                        help="Maximum number of concurrent environment builds")
+    parser.add_argument("--packs-dir", default=PythonConstants.DIR_FOR_ENV_PACKS)
+    parser.add_argument("--export", action="store_true",
+                        help="Export every environment after building it")
+    args = parser.parse_args()
+
+    env_to_elem = collect_environment_specs()
+    if args.env_name is not None:
+        env_to_elem = {k: v for k, v in env_to_elem.items() if k in args.env_name}
+
+    if args.command == "list":
+        existing_envs = set(data_utils.get_conda_environments())
+        for env_name, elem in env_to_elem.items():
+            status = "present" if env_name in existing_envs else "missing"
+            print(f"{env_name}\t{status}\t{json.dumps(environment_manager.get_environment_spec(elem))}")
+        return
+
+    if args.command == "import":
+        for env_name in env_to_elem:
+            if os.path.exists(os.path.join(args.packs_dir, env_name + PACK_SUFFIX)):
+                import_environment(env_name, args.packs_dir)
+            else:
+                logger.warning(f"No pack found for {env_name}")
+        return
+
+    if args.command == "build":
+        configure_shared_caches()
+        results = build_environments(env_to_elem, args.max_workers)
+        print(json.dumps(results, indent=1))
+        if not args.export:
+            return
+        env_to_elem = {
+            k: v for k, v in env_to_elem.items() if results[k]["exit_status"] == 0
+        }
+
+    for env_name in env_to_elem:
+        print(export_environment(env_name, args.packs_dir))
+
+
+if __name__ == "__main__":
+    main()
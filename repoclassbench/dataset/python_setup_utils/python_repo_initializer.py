@@ -2,19 +2,22 @@ from typing import Final
 import os
 import json
 import sys
+import threading
 from repoclassbench.dataset.python_setup_utils import (
     data_utils,
+    environment_manager,
     git_related_utils,
-    swebench_related_constants,
 )
 
 # absolute imports
 from project_utils import common_utils as utils
+from project_utils import repo_materialization, tracing
 from project_utils.constants import PythonConstants
 
 logger = utils.fetch_ist_adjusted_logger()
 
 
+@tracing.traced(category="lint")
 def fetch_linter_errors(file_name):
     """
     Fetches linter errors for a specified Python file within a specified conda environment.
@@ -99,6 +102,7 @@ pylint --errors-only --output-format=json {file_name}
     return {"error_list": json_arr, "hint_str": hint_str}
 
 
+@tracing.traced(category="setup")
 @utils.with_tempfile(prefix="tmp_import_py_")
 def remove_unused_imports(file_content, temp_file=None):
     """
@@ -134,6 +138,63 @@ ruff --fix --fix-only --fixable F401 --show-fixes {temp_file_path}  --output-for
     return new_content
 
 
+# cache key -> {'content': placeholder file content, 'gt_has_linter_error': bool}
+_PLACEHOLDER_FILE_CACHE = {}
+_PLACEHOLDER_FILE_CACHE_LOCK = threading.Lock()
+
+
+def fetch_placeholder_cache_key(task_id, ground_truth_file_body, remove_useless_imports) -> str:
+    """Key of the placeholder version of a file: (task ID, hash of the original file, import cleanup flag)."""
+    return utils.fetch_hash(
+        json.dumps(
+            [
+                task_id,
+                utils.fetch_hash(ground_truth_file_body),
+                bool(remove_useless_imports),
+            ]
+        )
+    )
+
+
+def load_placeholder_file(cache_key):
+    """
+    Looks up the placeholder version of a file, in memory and then on disk.
+
+    Args:
+        cache_key (str): The key returned by `fetch_placeholder_cache_key`.
+
+    Returns:
+        dict: {'content', 'gt_has_linter_error'}, or None on a cache miss.
+    """
+    with _PLACEHOLDER_FILE_CACHE_LOCK:
+        if cache_key in _PLACEHOLDER_FILE_CACHE:
+            return _PLACEHOLDER_FILE_CACHE[cache_key]
+    cache_path = os.path.join(PythonConstants.DIR_FOR_PLACEHOLDER_FILE_CACHE, f"{cache_key}.json")
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, "r") as f:
+            cached = json.load(f)
+    except Exception as E:
+        logger.warning(f"Ignoring unreadable placeholder cache file {cache_path}: {E}")
+        return None
+    with _PLACEHOLDER_FILE_CACHE_LOCK:
+        _PLACEHOLDER_FILE_CACHE[cache_key] = cached
+    return cached
+
+
+def store_placeholder_file(cache_key, content, gt_has_linter_error):
+    """Stores the placeholder version of a file in memory and on disk."""
+    cached = {"content": content, "gt_has_linter_error": gt_has_linter_error}
+    with _PLACEHOLDER_FILE_CACHE_LOCK:
+        _PLACEHOLDER_FILE_CACHE[cache_key] = cached
+    cache_path = os.path.join(PythonConstants.DIR_FOR_PLACEHOLDER_FILE_CACHE, f"{cache_key}.json")
+    tmp_cache_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_cache_path, "w") as f:
+        json.dump(cached, f)
+    os.replace(tmp_cache_path, cache_path)
+
+
 class PythonRepoInitializer:
     """
     A class to initialize and manage the state of a Python repository for testing and development.
@@ -171,24 +232,16 @@ class PythonRepoInitializer:
             )
         )
 
-        self.CONDA_ENV_NAME: Final[str] = self.SWEBENCH_ISSUE_ID
+        # The conda environment is shared by all the tasks with the same install spec
+        self.CONDA_ENV_NAME: Final[str] = environment_manager.get_environment_name(
+            self.REPOTOOLS_ELEM
+        )
 
         # Get installation preferences like version of python to install etc
         self.SWEBENCH_ELEM = self.REPOTOOLS_ELEM["repo_metadata"]["setup_details"]
-        if self.SWEBENCH_ELEM is None:
-            # If no specific element is found, use default installation settings
-            assert "litestar" in self.SWEBENCH_ISSUE_ID
-            self.install_related_obj = {
-                "python": "3.8",
-                "install": "pdm install --dev ; pip install -e .",
-            }
-        else:
-            # Use the installation settings from the fetched swebench element
-            self.install_related_obj = (
-                swebench_related_constants.MAP_VERSION_TO_INSTALL[
-                    self.SWEBENCH_ELEM["repo"]
-                ][self.SWEBENCH_ELEM["version"]]
-            )
+        self.install_related_obj = environment_manager.get_install_related_obj(
+            self.REPOTOOLS_ELEM
+        )
 
     @property
     def CONDA_ENV_PATH(self):
@@ -227,6 +280,18 @@ class PythonRepoInitializer:
         assert os.path.exists(abs_path)
         return abs_path
 
+    def is_repo_dir(self, path: str) -> bool:
+        """Checks whether `path` is the task checkout (or lies inside it)."""
+        path = os.path.normpath(os.path.abspath(path))
+        return path == self.REPO_DIR or path.startswith(self.REPO_DIR + os.sep)
+
+    @staticmethod
+    def is_testbed_checkout(path: str) -> bool:
+        """Checks whether `path` lies inside the checkout of any task."""
+        testbed_dir = os.path.normpath(os.path.abspath(PythonConstants.TESTBED_FOR_REPOS))
+        return os.path.normpath(os.path.abspath(path)).startswith(testbed_dir + os.sep)
+
+    @tracing.traced(category="setup")
     def ensure_ideal_repo_state(self):
         """
         Ensures that:
@@ -240,7 +305,7 @@ class PythonRepoInitializer:
         if os.path.exists(self.REPO_DIR):
             logger.debug(f"Repo dir: {self.REPO_DIR} already exists")
         else:
-            # If the repository directory does not exist, copy it from the zip
+            # If the repository directory does not exist, materialize it from the extracted zip
             _copy_path = os.path.normpath(
                 os.path.abspath(
                     os.path.join(
@@ -250,7 +315,7 @@ class PythonRepoInitializer:
             )
             logger.debug(f"Repo dir: {self.REPO_DIR} copied from: {_copy_path}")
             assert os.path.exists(_copy_path)
-            os.system("cp -r %s %s" % (_copy_path, self.REPO_DIR))
+            repo_materialization.materialize_repo(_copy_path, self.REPO_DIR)
 
         self.commit_id = self.REPOTOOLS_ELEM["repo_metadata"]["commit_id"]
 
@@ -261,6 +326,7 @@ class PythonRepoInitializer:
         logger.info("Repo checkout to base commit successful.")
         return
 
+    @tracing.traced(category="setup")
     def ensure_final_runnable_state(self, delete_ground_truth_class=False):
         """
         Ensures the repository is in a final runnable state by performing the following steps:
@@ -296,7 +362,7 @@ class PythonRepoInitializer:
         _ref_packages = data_utils.get_referenced_directories(self.CONDA_ENV_NAME)
         logger.info("Packages being referenced are: %s", _ref_packages)
         referenced_paths = [x[1] for x in _ref_packages]
-        already_referencing = any([self.REPO_DIR in x for x in referenced_paths])
+        already_referencing = any([self.is_repo_dir(x) for x in referenced_paths])
 
         logger.info(
             f"[{self.SWEBENCH_ISSUE_ID}] Ref packages (initial): {_ref_packages}"
@@ -313,7 +379,8 @@ class PythonRepoInitializer:
             uninstallation_commands = [
                 f"pip install {x[0]} --upgrade"
                 for x in _ref_packages
-                if self.REPO_DIR not in x[1]
+                if not self.is_repo_dir(x[1])
+                and not self.is_testbed_checkout(x[1])
             ]
             logger.debug(
                 "Potential Uninstallation commands: %s", uninstallation_commands
@@ -321,6 +388,13 @@ class PythonRepoInitializer:
             # Ensure there are no interfering packages
             assert len(uninstallation_commands) == 0
 
+            # The (shared) environment may still point to the checkout of another task
+            uninstallation_commands = [
+                f"pip uninstall -y {x[0]}"
+                for x in _ref_packages
+                if not self.is_repo_dir(x[1]) and self.is_testbed_checkout(x[1])
+            ]
+
             uninstallation_commands = "\n".join(uninstallation_commands)
             uninstall_bash_script = f"""
 #!/bin/bash
@@ -354,7 +428,7 @@ conda activate {self.CONDA_ENV_NAME}
             f"[{self.SWEBENCH_ISSUE_ID}] Later (ref packages): %s", _ref_packages
         )
         referenced_paths = [x[1] for x in _ref_packages]
-        already_referencing = any([self.REPO_DIR in x for x in referenced_paths])
+        already_referencing = any([self.is_repo_dir(x) for x in referenced_paths])
         logger.debug(
             f"Is {self.REPO_DIR} being referenced after all environment-related setup: {already_referencing}"
         )
@@ -365,6 +439,7 @@ conda activate {self.CONDA_ENV_NAME}
         if delete_ground_truth_class:
             self.delete_ground_truth_class()
 
+    @tracing.traced(category="setup")
     def delete_ground_truth_class(self, remove_useless_imports=True):
         """
         Delete the ground truth class from the repository.
@@ -373,10 +448,27 @@ conda activate {self.CONDA_ENV_NAME}
             remove_useless_imports (bool): Flag indicating whether to remove useless imports.
                                             Defaults to True.
 
+        The placeholder version of the file (and whether the ground truth has linter errors) is
+        cached per (task ID, hash of the original file), so that pylint and ruff only run the
+        first time the class is deleted.
+
         Raises:
             AssertionError: If the ground truth class is not found in the file.
 
         """
+        _ground_truth_file_body = open(self.file_to_modify_abs, "r").read()
+        _ground_truth_class_body = self.REPOTOOLS_ELEM["ground_truth_class_body"]
+        cache_key = fetch_placeholder_cache_key(
+            self.REPOTOOLS_TASK_ID, _ground_truth_file_body, remove_useless_imports
+        )
+        cached = load_placeholder_file(cache_key)
+        if cached is not None:
+            self.gt_has_linter_error = cached["gt_has_linter_error"]
+            with open(self.file_to_modify_abs, "w") as f:
+                f.write(cached["content"])
+            logger.debug(f"Ground truth class removed from: {self.file_to_modify_abs} (cached)")
+            return
+
         # Ensure there is no linter error with the ground truth class
         _linter_error_df_on_gt = fetch_linter_errors(self.file_to_modify_abs)
         self.gt_has_linter_error = False
@@ -388,8 +480,6 @@ conda activate {self.CONDA_ENV_NAME}
             # assert(False)
 
         # Extract the ground truth implementation of the class
-        _ground_truth_file_body = open(self.file_to_modify_abs, "r").read()
-        _ground_truth_class_body = self.REPOTOOLS_ELEM["ground_truth_class_body"]
         assert _ground_truth_file_body.count(_ground_truth_class_body) == 1
 
         # Replace the ground truth class with a placeholder text
@@ -416,21 +506,26 @@ conda activate {self.CONDA_ENV_NAME}
             )
             == 0
         )
+        store_placeholder_file(
+            cache_key,
+            _ground_truth_file_body_after_removing_useless_imports,
+            self.gt_has_linter_error,
+        )
         logger.debug(f"Ground truth class removed from: {self.file_to_modify_abs}")
 
+    @tracing.traced(category="setup")
     def run_environment_installation_script(self):
         """Runs the top-level environment installation script.
 
-        This method is responsible for executing the environment installation process.
-        It checks if the Conda environment already exists and skips the installation if it does.
-        It handles different types of package installations based on the provided configuration.
-        After executing the installation script, it checks the exit status and logs any errors encountered.
+        The environment is shared by all the tasks with the same install spec, so it is only built
+        (or cloned from a legacy per-issue environment) if no earlier task created it.
+        See `environment_manager.ensure_environment`.
 
         Returns:
             None
         """
         logger.debug(
-            f"[{self.SWEBENCH_ISSUE_ID}] [Environment installation] Fetching environment installation script"
+            f"[{self.SWEBENCH_ISSUE_ID}] [Environment installation] Ensuring conda env: {self.CONDA_ENV_NAME}"
         )
 
         self.init_install_result = {
@@ -439,110 +534,13 @@ conda activate {self.CONDA_ENV_NAME}
             "exit_status": None,
         }
 
-        # Check if the Conda environment already exists
-        if self.CONDA_ENV_NAME in data_utils.get_conda_environments():
-            logger.debug(
-                "Conda env already exists, so skipping environment installation"
-            )
-            return
-
-        ####################
-        # Set default commands for installation
-        defaults = {
-            k: ""
-            for k in [
-                "requirements_cmd",
-                "environment_yaml_cmd",
-                "pip_cmd",
-                "pip_packages_cmd",
-                "requirements_pip_cmd",
-                "yaml_pip_cmd",
-            ]
-        }
-        defaults["env_name"] = self.CONDA_ENV_NAME
-
-        # Determine the type of package installation
-        self.install_packages_type = (
-            self.install_related_obj["packages"]
-            if "packages" in self.install_related_obj
-            else ""
-        )
-
-        set_val = {}
-
-        # Handle different types of package installations
-        if self.install_packages_type == "requirements.txt":
-            # Command to create a Conda environment with a specific Python version
-            cmd_use = f"conda create -n {self.CONDA_ENV_NAME} python={self.install_related_obj['python']} -y"
-            set_val["requirements_cmd"] = cmd_use
-            # Get the path to the requirements.txt file
-            path_to_reqs = data_utils.get_requirements(
-                self.SWEBENCH_ELEM, self.use_dir_for_dump_path
-            )
-            # Command to install packages from requirements.txt using pip
-            set_val["requirements_pip_cmd"] = f"pip install -r {path_to_reqs}"
-        elif self.install_packages_type == "environment.yml":
-            # Get the path to the environment.yml file
-            path_to_reqs = data_utils.get_environment_yml(
-                self.SWEBENCH_ELEM, self.CONDA_ENV_NAME, self.use_dir_for_dump_path
-            )
-            if not (
-                "no_use_env" in self.install_related_obj
-                and self.install_related_obj["no_use_env"]
-            ):
-                # Command to create a Conda environment from environment.yml
-                cmd_use = f"conda env create --file {path_to_reqs}"
-                set_val["environment_yaml_cmd"] = cmd_use
-            else:
-                # Command to create a Conda environment with a specific Python version
-                cmd_use = f"conda create -c conda-forge -n {self.CONDA_ENV_NAME} python={self.install_related_obj['python']} -y"
-                set_val["environment_yaml_cmd"] = cmd_use
-                # Command to update the Conda environment from environment.yml
-                set_val["yaml_pip_cmd"] = f"conda env update -f {path_to_reqs}"
-        else:
-            # Command to create a Conda environment with specific packages
-            _pkgs = self.install_packages_type
-            cmd_use = f"conda create -n {self.CONDA_ENV_NAME} python={self.install_related_obj['python']} {_pkgs} -y"
-            set_val["pip_cmd"] = cmd_use
-
-        ##################################
-        # Handle additional pip packages
-        if "pip_packages" in self.install_related_obj:
-            _pip_pkgs = self.install_related_obj["pip_packages"]
-            set_val["pip_packages_cmd"] = f"pip install {_pip_pkgs}"
-        if "litestar" in self.SWEBENCH_ISSUE_ID:
-            assert "litestar" in self.SWEBENCH_ISSUE_ID
-            # Read and set the specific installation script for litestar
-            set_val["pip_packages_cmd"] = (
-                "\n"
-                + open(
-                    os.path.join(
-                        PythonConstants.ProjectDir,
-                        "repoclassbench/dataset/python_setup_utils/script_templates/03_litestar_specific_installation.txt",
-                    )
-                ).read()
-                + "\n"
-            )
-        #############################
-
-        # Merge default and specific commands
-        args_use = {**defaults, **set_val}
-
-        # Read and format the bash template for environment installation
-        with open(
-            os.path.join(
-                PythonConstants.ProjectDir,
-                "repoclassbench/dataset/python_setup_utils/script_templates/00_environment_installation.sh",
-            ),
-            "r",
-        ) as f:
-            bash_template = f.read()
-        self.init_install_bash_script = bash_template.format(**args_use)
-
-        # Execute the bash script for environment installation
-        self.init_install_result = utils.execute_bash_script(
-            self.init_install_bash_script
+        env_details = environment_manager.ensure_environment(
+            self.REPOTOOLS_ELEM, self.CONDA_ENV_NAME
         )
+        if env_details["action"] == "exists":
+            return
+        self.init_install_bash_script = env_details["script"]
+        self.init_install_result = env_details["result"]
 
         # Check if the script execution was successful
         if self.init_install_result["exit_status"] != 0:
@@ -552,6 +550,7 @@ conda activate {self.CONDA_ENV_NAME}
 
         logger.debug("Environment installation (top-level) complete")
 
+    @tracing.traced(category="setup")
     def run_folder_state_installation_script(self, repo_dir_path: str):
         """Run folder-specific environment installation script.
 
@@ -4,9 +4,11 @@ from dataclasses import dataclass
 import os
 import pathlib
 import re
-import shutil
 import subprocess
 
+from project_utils import process_runner, tracing
+from project_utils.constants import ProcessConstants
+from project_utils.repo_materialization import materialize_repo
 from repoclassbench.evaluator.base_evaluator import BaseEvaluator, EvaluationData
 from typing import List, Optional, Tuple
 
@@ -44,27 +46,24 @@ class CSharpEvaluator(BaseEvaluator):
         self.final_code_dir = self.evaluation_metadata.eval_dir
         self.total_tests = len(self.evaluation_metadata.testcase_list)
 
-        # Delete eval dir if it exists from a previous run
-        if pathlib.Path(self.evaluation_metadata.eval_dir).exists():
-            shutil.rmtree(self.evaluation_metadata.eval_dir)
-
-        ## Create a copy of the original repo for evaluation
-        shutil.copytree(
+        ## Bring the eval dir (possibly left over from a previous run) in line with the original repo
+        materialize_repo(
             self.evaluation_metadata.original_dir,
             self.evaluation_metadata.eval_dir,
-            dirs_exist_ok=True,
         )
 
         subprocess.check_call(
             "git restore .", shell=True, cwd=self.evaluation_metadata.eval_dir
         )
         try:
-            subprocess.check_output(
+            process_runner.run_process(
                 f"stdbuf -o0 {self.executable_path} clean",
                 shell=True,
                 cwd=self.evaluation_metadata.eval_dir,
                 env=os.environ.copy(),
-            )
+                timeout=ProcessConstants.DOTNET_TIMEOUT_SEC,
+                concurrency_group="dotnet",
+            ).check()
         except subprocess.CalledProcessError as cpe:
             # TODO: add logging code
             pass
@@ -82,19 +81,26 @@ class CSharpEvaluator(BaseEvaluator):
             sanitized_lines.append(line)
         return sanitized_lines
 
+    @tracing.traced(name="dotnet build", category="evaluation")
     def build_proj(self) -> Tuple[bool, Optional[str], Optional[str]]:
         """Attempts to build the project. Output consists of build status and optional error message"""
         # Ideally below command is better. But in practice, can cause some weird errors
         # build_cmd = f"stdbuf -o0 dotnet build {self.sln_path} --nologo -v m"
         build_cmd = f"stdbuf -o0 {self.executable_path} build --nologo -v m"
         start_header = "Build FAILED.\n"
+        result = process_runner.run_process(
+            build_cmd, shell=True, cwd=self.evaluation_metadata.eval_dir,
+            env=os.environ.copy(), timeout=ProcessConstants.DOTNET_TIMEOUT_SEC,
+            concurrency_group="dotnet",
+        )
+        if result.timed_out:
+            return False, result.stdout, (
+                f"The build did not finish within {ProcessConstants.DOTNET_TIMEOUT_SEC:.0f} seconds and was stopped."
+            )
         try:
-            _ = subprocess.check_output(
-                build_cmd, shell=True, cwd=self.evaluation_metadata.eval_dir,
-                env=os.environ.copy(),
-            ).decode()
+            _ = result.check()
         except subprocess.CalledProcessError as e:
-            err_msg: str = e.output.decode()
+            err_msg: str = e.output
             start_idx = err_msg.index(start_header) + len(start_header)
             lines = err_msg[start_idx:].splitlines()
             selected_lines = []
@@ -129,6 +135,7 @@ class CSharpEvaluator(BaseEvaluator):
         # --filter Name=Test1\|FullyQualifiedName=Test2\|Test3
         return "\\|".join(filter_str).replace(" ", "\\ ")
 
+    @tracing.traced(name="dotnet test", category="evaluation")
     def run_tests(
         self, test_filter: List[Tuple[str, str]]
     ) -> Tuple[bool, Optional[str], Optional[str], List[str]]:
@@ -137,14 +144,22 @@ class CSharpEvaluator(BaseEvaluator):
         test_cmd = (
             f"stdbuf -o0 {self.executable_path} test --nologo --filter {filter_str}"
         )
+        result = process_runner.run_process(
+            test_cmd, cwd=self.final_code_dir, shell=True,
+            env=os.environ.copy(), timeout=ProcessConstants.DOTNET_TIMEOUT_SEC,
+            concurrency_group="dotnet",
+        )
+        if result.timed_out:
+            formatted_feedback = (
+                f"The tests did not finish within {ProcessConstants.DOTNET_TIMEOUT_SEC:.0f} seconds and were stopped. "
+                "Check the generated class for infinite loops or blocking calls."
+            )
+            return False, result.stdout, formatted_feedback, [test_entry[0] for test_entry in test_filter]
         try:
-            op = subprocess.check_output(
-                test_cmd, cwd=self.final_code_dir, shell=True,
-                env=os.environ.copy(),
-            ).decode()
+            op = result.check()
             # op = check_output(test_cmd, cwd=self.repo_root_dir).decode()
         except subprocess.CalledProcessError as e:
-            op: str = e.output.decode()
+            op: str = e.output
             err_msg, failed_testcases = self.parse_test_err_msg(op)
             formatted_feedback = (
                 err_msg[:1000]
@@ -189,6 +204,7 @@ class CSharpEvaluator(BaseEvaluator):
             # TODO: Add code for other test frameworks
             raise NotImplementedError("Test framework not supported")
 
+    @tracing.traced(category="evaluation")
     def evaluate(self, code: str) -> EvaluationData:
         """Method to evaluate the code."""
          
@@ -3,9 +3,12 @@
 from dataclasses import dataclass
 import os
 import re
-import shutil
 import subprocess
+from project_utils import process_runner, tracing
+from project_utils.constants import JavaConstants, ProcessConstants
+from project_utils.repo_materialization import materialize_repo
 from repoclassbench.evaluator.base_evaluator import BaseEvaluator, EvaluationData
+from repoclassbench.evaluator.java_evaluator_utils import direct_runner, maven_session
 from tree_sitter_languages import get_parser
 
 
@@ -133,16 +136,31 @@ class JavaEvaluator(BaseEvaluator):
         repo_name: str,
         file_name: str,
         evaluation_metadata: JavaEvaluationMetadata,
+        eval_root: str = "temp/java/eval_repo/",
+        local_repo: str = None,
     ) -> None:
+        """
+        Args:
+            repo_name (str): The repository of the task.
+            file_name (str): The file of the generated class (starting with the repository name).
+            evaluation_metadata (JavaEvaluationMetadata): The test to run.
+            eval_root (str): Where the repository is copied for the evaluation (see `sandbox.JavaSandbox`
+                to run evaluations concurrently).
+            local_repo (str, optional): The local Maven repository. Defaults to the Maven default.
+        """
         self.repo_name = repo_name
         self.file_name = file_name
         self.evaluation_metadata = evaluation_metadata
+        self.eval_root = eval_root
+        self.local_repo = local_repo
 
-        ## Create a copy of the original repo for evaluation
-        shutil.copytree(
+        ## Create a copy of the original repo for evaluation (only files which differ are re-copied)
+        ## The build outputs (created by `sudo mvn`) are kept, as Maven recompiles the stale sources itself
+        assert JavaConstants.EVAL_MODE in ("mvn", "daemon", "javac"), f"Unknown eval mode: {JavaConstants.EVAL_MODE}"
+        materialize_repo(
             "temp/java/original_repo/" + self.repo_name,
-            "temp/java/eval_repo/" + self.repo_name,
-            dirs_exist_ok=True,
+            os.path.join(self.eval_root, self.repo_name),
+            ignore_names=("target",),
         )
 
         ## Setup the environment for evaluation
@@ -153,25 +171,55 @@ class JavaEvaluator(BaseEvaluator):
             os.path.dirname(__file__), "../../external/java/apache-maven-3.8.7/bin/mvn"
         )
 
-        self.final_code_dir = "temp/java/eval_repo/"
+        self.final_code_dir = self.eval_root
         ## Find the directory with the pom.xml file
         for subdir in self.file_name.split("/"):
             self.final_code_dir = os.path.join(self.final_code_dir, subdir)
             if os.path.isfile(os.path.join(self.final_code_dir, "pom.xml")):
                 break
 
+        self.maven_session = (
+            maven_session.fetch_session(self.final_code_dir, self.java_home, self.mvn_path, self.local_repo)
+            if JavaConstants.EVAL_MODE == "daemon"
+            else None
+        )
+        self.direct_runner = None
+        if JavaConstants.EVAL_MODE == "javac":
+            ## Precompile the original module (once per module) while the original file is in place
+            self.direct_runner = direct_runner.fetch_runner(
+                self.final_code_dir, self.java_home, self.mvn_path, self.local_repo
+            )
+            self.direct_runner.prepare()
+
         ## Get the total number of tests
         with open(
-            "temp/java/eval_repo/" + self.evaluation_metadata.test_file, "r"
+            os.path.join(self.eval_root, self.evaluation_metadata.test_file), "r"
         ) as file:
             self.total_tests = file.read().count("@Test")
 
         ## Get the correct package statement (We assume access to this)
-        with open("temp/java/eval_repo/" + self.file_name, "r") as file:
-            self.correct_package_statement = [
-                line for line in file.read().split("\n") if "package" in line
-            ][0]
+        with open(os.path.join(self.eval_root, self.file_name), "r") as file:
+            self.original_code = file.read()
+        self.correct_package_statement = [
+            line for line in self.original_code.split("\n") if "package" in line
+        ][0]
+
+    def fetch_timeout_result(self, result: process_runner.ProcessResult) -> EvaluationData:
+        """Reports a test run killed by the timeout as a failure of all the tests."""
+        feedback = (
+            f"The tests did not finish within {ProcessConstants.MAVEN_TIMEOUT_SEC:.0f} seconds and were stopped. "
+            "Check the generated class for infinite loops or blocking calls."
+        )
+        return EvaluationData(
+            passed_tests=0,
+            failed_tests=self.total_tests,
+            compile_status=None,
+            error_feedback=result.stdout[-10000:],
+            formatted_feedback=feedback,
+            test_status=False,
+        )
 
+    @tracing.traced(category="evaluation")
     def evaluate(self, code: str) -> EvaluationData:
         """Method to evaluate the code."""
 
@@ -183,19 +231,39 @@ class JavaEvaluator(BaseEvaluator):
             code = self.correct_package_statement + "\n" + code
 
         # Write the code to the file
-        with open("temp/java/eval_repo/" + self.file_name, "w") as file:
+        with open(os.path.join(self.eval_root, self.file_name), "w") as file:
             file.write(code)
 
+        if self.direct_runner is not None:
+            return self.evaluate_directly(code)
+
         # Run the tests
         try:
-            java_command = f'export JAVA_HOME={self.java_home} && sudo -E {self.mvn_path} test -Dtest="{self.evaluation_metadata.test_class_name}" -DfailIfNoTests=false -Dsurefire.failIfNoSpecifiedTests=false'
-            java_output = subprocess.check_output(
-                java_command,
-                shell=True,
-                stderr=subprocess.STDOUT,
-                text=True,
-                cwd=self.final_code_dir,
-            )
+            if self.maven_session is not None:
+                java_command = self.maven_session.fetch_test_command(
+                    self.evaluation_metadata.test_class_name, os.path.join(self.eval_root, self.file_name), code
+                )
+            else:
+                java_command = f'export JAVA_HOME={self.java_home} && sudo -E {self.mvn_path} test -Dtest="{self.evaluation_metadata.test_class_name}" -DfailIfNoTests=false -Dsurefire.failIfNoSpecifiedTests=false'
+                if self.local_repo is not None:
+                    java_command += f" -Dmaven.repo.local={os.path.abspath(self.local_repo)}"
+            with tracing.span(
+                "mvn test", "evaluation", test_class=self.evaluation_metadata.test_class_name
+            ) as span:
+                result = process_runner.run_process(
+                    java_command,
+                    shell=True,
+                    merge_stderr=True,
+                    cwd=self.final_code_dir,
+                    timeout=ProcessConstants.MAVEN_TIMEOUT_SEC,
+                    concurrency_group="maven",
+                )
+                span.set(exit_status=result.exit_status, timed_out=result.timed_out)
+            if self.maven_session is not None:
+                self.maven_session.record_run(os.path.join(self.eval_root, self.file_name), code, result.stdout)
+            if result.timed_out:
+                return self.fetch_timeout_result(result)
+            java_output = result.check()
             if "Tests run:" not in java_output:
                 raise Exception("Tests not run, evaluator failure")
 
@@ -267,7 +335,53 @@ class JavaEvaluator(BaseEvaluator):
                 except FileNotFoundError:
                     pass
 
-        if not test_compilation_failure:
+        return self.fetch_evaluation_data(
+            java_output, compilation_failure, test_compilation_failure, test_failure
+        )
+
+    def evaluate_directly(self, code: str) -> EvaluationData:
+        """Evaluates the candidate (already written) with javac and the JUnit console launcher."""
+        result = self.direct_runner.evaluate(
+            os.path.join(self.eval_root, self.file_name),
+            self.original_code,
+            code,
+            self.evaluation_metadata.test_class_name,
+        )
+        if result.process_result is not None:
+            return self.fetch_timeout_result(result.process_result)
+        return self.fetch_evaluation_data(
+            result.output,
+            result.compilation_failure,
+            result.test_compilation_failure,
+            test_failure=result.test_compilation_failure or result.failed_tests > 0,
+            test_counts=(result.passed_tests, result.failed_tests),
+        )
+
+    def fetch_evaluation_data(
+        self,
+        java_output: str,
+        compilation_failure: bool,
+        test_compilation_failure: bool,
+        test_failure: bool,
+        test_counts=None,
+    ) -> EvaluationData:
+        """
+        Builds the evaluation results from the build output.
+
+        Args:
+            java_output (str): The (trimmed) build output.
+            compilation_failure (bool): Whether the main sources failed to compile.
+            test_compilation_failure (bool): Whether the tests could not be compiled (or the main sources).
+            test_failure (bool): Whether some tests failed (or could not run).
+            test_counts (Tuple[int, int], optional): The passed and failed counts. Parsed from the
+                surefire summary of `java_output` if not given.
+        """
+        if test_compilation_failure:
+            passed_tests = 0
+            failed_tests = self.total_tests
+        elif test_counts is not None:
+            passed_tests, failed_tests = test_counts
+        else:
             ## REGEX TO EXTRACT THE NUMBER OF TESTS THAT RAN SUCCESSFULLY
             pattern = re.compile(
                 r"Tests run: (\d+), Failures: (\d+), Errors: (\d+), Skipped: (\d+)",
@@ -278,14 +392,11 @@ class JavaEvaluator(BaseEvaluator):
                 int(match.group(1)) - int(match.group(2)) - int(match.group(3))
             )
             failed_tests = int(match.group(2)) + int(match.group(3))
-        else:
-            passed_tests = 0
-            failed_tests = self.total_tests
 
         if not compilation_failure and test_failure:
 
             test_text = open(
-                "temp/java/eval_repo/" + self.evaluation_metadata.test_file,
+                os.path.join(self.eval_root, self.evaluation_metadata.test_file),
                 encoding="utf-8",
             ).read()
 
@@ -0,0 +1,246 @@
+"""Evaluation of the Java candidates without the Maven lifecycle (the "javac" evaluation mode).
+
+Only the file of the generated class changes between candidates. Once per module (and pom.xml),
+`prepare` compiles the original module and its tests with Maven and caches the test classpath
+(`dependency:build-classpath`). Then, for every candidate:
+
+- javac compiles the candidate into an overlay directory, in front of the precompiled classes.
+  If the candidate changes the declarations of the original file (see `fetch_api_signature`), the
+  main and test sources which mention its class are recompiled along with it.
+- The test class is run with the JUnit console launcher, whose summary gives the passed and failed
+  counts (counted like surefire: skipped and aborted tests are not failures).
+
+The sources are expected in the default Maven layout (`src/main/java` and `src/test/java`).
+"""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+import project_utils.common_utils as utils
+from project_utils import process_runner, tracing
+from project_utils.constants import JavaConstants, ProcessConstants
+from repoclassbench.evaluator.java_evaluator_utils.maven_session import fetch_api_signature
+
+logger = utils.fetch_ist_adjusted_logger()
+
+MAIN_SOURCE_DIR = "src/main/java"
+TEST_SOURCE_DIR = "src/test/java"
+
+JAVAC_ERROR_PATTERN = re.compile(r"^(.+\.java):\d+: error: ", re.MULTILINE)
+CONSOLE_SUMMARY_PATTERN = re.compile(r"\[\s*(\d+) tests (successful|failed|aborted|skipped)\s*\]")
+
+
+@dataclass
+class DirectRunResult:
+    """The outcome of the evaluation of a candidate."""
+
+    output: str  # The javac output on compilation failures, the console launcher output otherwise
+    compilation_failure: bool = False
+    test_compilation_failure: bool = False
+    passed_tests: int = 0
+    failed_tests: int = 0
+    process_result: Optional[process_runner.ProcessResult] = None  # Set when a command timed out
+
+
+def fetch_test_class_pattern(test_class_name: str) -> str:
+    """Translates a surefire `-Dtest` value (simple or qualified names, comma separated) to a class name regex."""
+    names = [name.split("#")[0].strip() for name in test_class_name.split(",")]
+    alternatives = "|".join(re.escape(name) for name in names if name)
+    return rf"^(.*\.)?({alternatives})$"
+
+
+class DirectTestRunner:
+    """
+    Compiles and tests the candidates of a Maven module without Maven.
+
+    Args:
+        module_dir (str): The directory with the `pom.xml` file.
+        java_home (str): The JDK to compile and run the tests with.
+        mvn_path (str): The Maven executable used to prepare the module.
+        local_repo (str, optional): The local Maven repository. Defaults to the Maven default.
+    """
+
+    def __init__(self, module_dir: str, java_home: str, mvn_path: str, local_repo: str = None):
+        self.module_dir = os.path.abspath(module_dir)
+        self.java_home = os.path.abspath(java_home)
+        self.mvn_path = mvn_path
+        self.maven_options = "-B" if local_repo is None else f"-B -Dmaven.repo.local={shlex.quote(os.path.abspath(local_repo))}"
+        module_key = hashlib.sha1(self.module_dir.encode()).hexdigest()
+        self.work_dir = os.path.join(os.path.abspath(JavaConstants.DIRECT_WORK_DIR), module_key)
+        self.classpath_file = os.path.join(self.work_dir, "test-classpath.txt")
+        self.stamp_file = os.path.join(self.work_dir, "stamp.json")
+        self.overlay_dir = os.path.join(self.work_dir, "overlay")
+        self.classes_dir = os.path.join(self.module_dir, "target/classes")
+        self.test_classes_dir = os.path.join(self.module_dir, "target/test-classes")
+        self._dependency_classpath = None
+
+    def _run(self, command: str) -> process_runner.ProcessResult:
+        return process_runner.run_process(
+            f"export JAVA_HOME={shlex.quote(self.java_home)} && {command}",
+            shell=True,
+            merge_stderr=True,
+            cwd=self.module_dir,
+            timeout=ProcessConstants.MAVEN_TIMEOUT_SEC,
+            concurrency_group="maven",
+        )
+
+    def _fetch_stamp(self) -> dict:
+        with open(os.path.join(self.module_dir, "pom.xml"), "rb") as f:
+            return {"pom_sha1": hashlib.sha1(f.read()).hexdigest()}
+
+    @tracing.traced(category="evaluation")
+    def prepare(self) -> None:
+        """
+        Compiles the (original) module and its tests, and caches the test classpath.
+        Does nothing if this has been done for the current pom.xml.
+
+        Raises:
+            subprocess.CalledProcessError: If Maven fails.
+        """
+        stamp = self._fetch_stamp()
+        try:
+            with open(self.stamp_file, "r") as f:
+                if json.load(f) == stamp and os.path.isdir(self.test_classes_dir):
+                    return
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        os.makedirs(self.work_dir, exist_ok=True)
+        if not os.path.isfile(JavaConstants.JUNIT_CONSOLE_JAR):
+            jar_dir = os.path.dirname(os.path.abspath(JavaConstants.JUNIT_CONSOLE_JAR))
+            self._run(
+                f"sudo -E {self.mvn_path} {self.maven_options} dependency:copy "
+                f"-Dartifact=org.junit.platform:junit-platform-console-standalone:{JavaConstants.JUNIT_CONSOLE_VERSION} "
+                f"-DoutputDirectory={shlex.quote(jar_dir)}"
+            ).check()
+        self._run(
+            f"sudo -E {self.mvn_path} {self.maven_options} test-compile dependency:build-classpath "
+            f"-Dmdep.includeScope=test -Dmdep.outputFile={shlex.quote(self.classpath_file)}"
+        ).check()
+        with open(self.stamp_file, "w") as f:
+            json.dump(stamp, f)
+        self._dependency_classpath = None
+        logger.info(f"Prepared {self.module_dir} for direct evaluation")
+
+    @property
+    def dependency_classpath(self) -> str:
+        if self._dependency_classpath is None:
+            with open(self.classpath_file, "r") as f:
+                self._dependency_classpath = f.read().strip()
+        return self._dependency_classpath
+
+    def fetch_classpath(self, *extra_entries) -> str:
+        entries = [*extra_entries, self.test_classes_dir, self.classes_dir, self.dependency_classpath]
+        return ":".join(entry for entry in entries if entry)
+
+    def find_dependents(self, modified_file: str) -> List[str]:
+        """Lists the main and test sources mentioning the class of `modified_file`."""
+        class_name = os.path.splitext(os.path.basename(modified_file))[0]
+        mention_pattern = re.compile(rf"\b{re.escape(class_name)}\b")
+        dependents = []
+        for source_dir in [MAIN_SOURCE_DIR, TEST_SOURCE_DIR]:
+            for root, _, files in os.walk(os.path.join(self.module_dir, source_dir)):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if not name.endswith(".java") or os.path.samefile(path, modified_file):
+                        continue
+                    with open(path, "r", errors="replace") as f:
+                        if mention_pattern.search(f.read()):
+                            dependents.append(path)
+        return dependents
+
+    @tracing.traced(name="javac", category="evaluation")
+    def compile(self, modified_file: str, original_code: str, code: str) -> DirectRunResult:
+        """
+        Compiles the candidate (and its dependents if its declarations changed) into the overlay.
+
+        Args:
+            modified_file (str): The path the candidate has been written to.
+            original_code (str): The original content of the file.
+            code (str): The candidate.
+
+        Returns:
+            DirectRunResult: The compilation outcome (the counts are left to `run_tests`).
+        """
+        shutil.rmtree(self.overlay_dir, ignore_errors=True)
+        os.makedirs(self.overlay_dir)
+        sources = [os.path.abspath(modified_file)]
+        signature = fetch_api_signature(code)
+        if signature is None or signature != fetch_api_signature(original_code):
+            sources += self.find_dependents(modified_file)
+        result = self._run(
+            f"{self.java_home}/bin/javac -nowarn -encoding UTF-8 -proc:none -implicit:none "
+            f"-d {shlex.quote(self.overlay_dir)} -cp {shlex.quote(self.fetch_classpath())} "
+            + " ".join(shlex.quote(source) for source in sources)
+        )
+        if result.timed_out:
+            return DirectRunResult(output=result.stdout, process_result=result)
+        if result.exit_status == 0:
+            return DirectRunResult(output=result.stdout)
+        error_files = JAVAC_ERROR_PATTERN.findall(result.stdout)
+        compilation_failure = any(f"/{TEST_SOURCE_DIR}/" not in path for path in error_files) or not error_files
+        return DirectRunResult(
+            output=result.stdout,
+            compilation_failure=compilation_failure,
+            test_compilation_failure=True,
+        )
+
+    @tracing.traced(name="junit console", category="evaluation")
+    def run_tests(self, test_class_name: str) -> DirectRunResult:
+        """
+        Runs the test class against the overlay.
+
+        Args:
+            test_class_name (str): The surefire `-Dtest` value of the task.
+
+        Returns:
+            DirectRunResult: The test outcome.
+        """
+        result = self._run(
+            f"{self.java_home}/bin/java -jar {shlex.quote(os.path.abspath(JavaConstants.JUNIT_CONSOLE_JAR))} "
+            "--disable-banner --disable-ansi-colors --details=tree --details-theme=ascii "
+            f"-cp {shlex.quote(self.fetch_classpath(self.overlay_dir))} "
+            f"--scan-classpath {shlex.quote(self.test_classes_dir)} "
+            f"--include-classname {shlex.quote(fetch_test_class_pattern(test_class_name))}"
+        )
+        if result.timed_out:
+            return DirectRunResult(output=result.stdout, process_result=result)
+        counts = {"successful": 0, "failed": 0, "aborted": 0, "skipped": 0}
+        summary = CONSOLE_SUMMARY_PATTERN.findall(result.stdout)
+        if not summary:
+            raise Exception("Tests not run, evaluator failure" + result.stdout)
+        for count, kind in summary:
+            counts[kind] = int(count)
+        # Like the surefire "Results :" section, the failures section only names the failed tests
+        failures_start = result.stdout.find("Failures (")
+        return DirectRunResult(
+            output=result.stdout[failures_start:] if failures_start >= 0 else result.stdout,
+            passed_tests=counts["successful"] + counts["aborted"] + counts["skipped"],
+            failed_tests=counts["failed"],
+        )
+
+    def evaluate(self, modified_file: str, original_code: str, code: str, test_class_name: str) -> DirectRunResult:
+        """Compiles the candidate (already written to `modified_file`) and runs the tests."""
+        compile_result = self.compile(modified_file, original_code, code)
+        if compile_result.process_result is not None or compile_result.test_compilation_failure:
+            return compile_result
+        return self.run_tests(test_class_name)
+
+
+_runners = {}
+_runners_lock = threading.Lock()
+
+
+def fetch_runner(module_dir: str, java_home: str, mvn_path: str, local_repo: str = None) -> DirectTestRunner:
+    """Returns the runner of a module (shared by all the evaluators of the process)."""
+    key = os.path.abspath(module_dir)
+    with _runners_lock:
+        if key not in _runners:
+            _runners[key] = DirectTestRunner(module_dir, java_home, mvn_path, local_repo)
+        return _runners[key]
@@ -0,0 +1,265 @@
+"""Warm Maven runs for the "daemon" evaluation mode of the Java tasks.
+
+A cold `mvn test` per candidate pays the JVM startup, the plugin resolution, a full compilation of
+the module and of its tests. A `MavenSession` (one per module directory) instead:
+
+- runs the build through the Maven daemon (`mvnd`), whose warm JVMs keep the loaded plugins and
+  the JIT-compiled Maven code between candidates (plain `mvn` is used if `mvnd` is not installed),
+- uses a dedicated local repository, seeded by the first online run of the module, and runs
+  offline (`-o`) afterwards,
+- keeps `target/` between candidates and, when the candidate does not change the API of the
+  modified file (same declarations, only method bodies differ), only recompiles the stale sources.
+  The compiled test classes (and the other classes of the module) are then reused as is, which is
+  sound because their bytecode only depends on the declarations of the modified class.
+
+The session records the hash of the content every file written by a candidate was compiled from.
+When one of them no longer matches (such as a file restored to its original content when the
+evaluation copy is materialized for another task), the compiled classes of the module are deleted
+and it is rebuilt from scratch. The session deletes them itself rather than running the `clean`
+goal, whose plugin is not in the local repository when it was seeded by a plain `test` run.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import threading
+
+import project_utils.common_utils as utils
+from project_utils.constants import JavaConstants
+from tree_sitter_languages import get_parser
+
+logger = utils.fetch_ist_adjusted_logger()
+
+parser = get_parser("java")
+
+# What `clean` would delete for the module to be compiled from scratch
+COMPILED_OUTPUT_DIRS = ("classes", "test-classes", "maven-status")
+
+# Declarations whose body is not part of the API of a class
+BODY_OWNER_TYPES = ("method_declaration", "constructor_declaration", "static_initializer")
+COMMENT_TYPES = ("line_comment", "block_comment", "comment")
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def fetch_api_signature(code: str):
+    """
+    Strips the comments and the bodies of the methods, constructors and initializers of a Java file.
+
+    Args:
+        code (str): The content of the Java file.
+
+    Returns:
+        str: The normalized declarations (None if the file does not parse).
+    """
+    code_bytes = code.encode()
+    tree = parser.parse(code_bytes)
+    if tree.root_node.has_error:
+        return None
+    removed_ranges = []
+    stack = [tree.root_node]
+    while stack:
+        node = stack.pop()
+        if node.type in COMMENT_TYPES:
+            removed_ranges.append((node.start_byte, node.end_byte, b" "))
+            continue
+        if node.type in BODY_OWNER_TYPES or (node.type == "block" and node.parent.type == "class_body"):
+            body = node if node.type == "block" else node.child_by_field_name("body")
+            if body is None and node.type == "static_initializer":
+                body = node.children[-1]
+            if body is not None:
+                removed_ranges.append((body.start_byte, body.end_byte, b" {} "))
+                continue
+        stack.extend(node.children)
+
+    pieces = []
+    last_end = 0
+    for start, end, replacement in sorted(removed_ranges):
+        if start < last_end:
+            continue
+        pieces.append(code_bytes[last_end:start])
+        pieces.append(replacement)
+        last_end = end
+    pieces.append(code_bytes[last_end:])
+    return re.sub(r"\s+", " ", b"".join(pieces).decode(errors="replace")).strip()
+
+
+def fetch_mvnd_executable():
+    """Returns the Maven daemon executable (None if it is not installed)."""
+    if os.path.isfile(JavaConstants.MVND_PATH):
+        return os.path.abspath(JavaConstants.MVND_PATH)
+    return shutil.which("mvnd")
+
+
+class MavenSession:
+    """
+    Builds the `mvn test` commands of the candidates evaluated in a module, and tracks the state
+    (seeded local repository, compiled API and sources) which lets the next candidates skip work.
+
+    The state is kept in `JavaConstants.MAVEN_SESSION_DIR` rather than in the module, whose `target/`
+    (and local repository) Maven creates through `sudo`.
+
+    Args:
+        module_dir (str): The directory with the `pom.xml` file.
+        java_home (str): The JDK to run Maven with.
+        mvn_path (str): The Maven executable used when the daemon is not installed.
+        local_repo (str, optional): The local repository. Defaults to `JavaConstants.MAVEN_LOCAL_REPO`.
+    """
+
+    def __init__(self, module_dir: str, java_home: str, mvn_path: str, local_repo: str = None):
+        self.module_dir = module_dir
+        self.java_home = java_home
+        self.local_repo = os.path.abspath(local_repo or JavaConstants.MAVEN_LOCAL_REPO)
+        self.mvnd_path = fetch_mvnd_executable()
+        if self.mvnd_path is None:
+            logger.warning(
+                "mvnd is not installed (see RCB_MVND_PATH): running plain mvn, offline and incrementally"
+            )
+        self.executable = self.mvnd_path or mvn_path
+
+        with open(os.path.join(module_dir, "pom.xml"), "rb") as f:
+            pom_hash = hashlib.sha1(f.read()).hexdigest()
+        module_key = hashlib.sha1(
+            f"{os.path.abspath(module_dir)}\n{pom_hash}\n{self.local_repo}".encode()
+        ).hexdigest()
+        self.state_path = os.path.join(os.path.abspath(JavaConstants.MAVEN_SESSION_DIR), module_key, "state.json")
+        self.classes_dir = os.path.join(module_dir, "target", "classes")
+
+    def _load_state(self) -> dict:
+        """
+        Returns the state of the session:
+            - 'seeded': Whether a previous run resolved everything the tests of the module need.
+            - 'api_signatures': modified file -> API its classes (and the tests) were compiled against.
+            - 'compiled_sources': modified file -> hash of the content its classes were compiled from
+              (None if unknown).
+        """
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {"seeded": False}
+        if not os.path.isdir(self.classes_dir):
+            # Nothing compiled (yet, or any more)
+            state["api_signatures"] = {}
+            state["compiled_sources"] = {}
+        state.setdefault("api_signatures", {})
+        state.setdefault("compiled_sources", {})
+        return state
+
+    def _save_state(self, state: dict) -> None:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def _fetch_source_hash(path: str):
+        try:
+            with open(path, "rb") as f:
+                return hashlib.sha1(f.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    @property
+    def is_seeded(self) -> bool:
+        """Whether a previous run resolved everything the tests of the module need."""
+        return self._load_state()["seeded"]
+
+    def has_stale_classes(self, modified_file: str) -> bool:
+        """
+        Whether the classes of a file written by a previous candidate do not match its current content.
+
+        The evaluation copy is materialized again between tasks: the files of the previous candidates
+        are restored with their original (older) modification times, so Maven would not recompile them.
+        """
+        compiled_sources = self._load_state()["compiled_sources"]
+        return any(
+            source_hash is None or self._fetch_source_hash(path) != source_hash
+            for path, source_hash in compiled_sources.items()
+            if path != modified_file
+        )
+
+    def can_build_incrementally(self, modified_file: str, code: str) -> bool:
+        """Whether the compiled classes of the module are compatible with the new content of `modified_file`."""
+        signature = fetch_api_signature(code)
+        return (
+            signature is not None
+            and self._load_state()["api_signatures"].get(modified_file) == signature
+            and not self.has_stale_classes(modified_file)
+        )
+
+    def fetch_test_command(self, test_class_name: str, modified_file: str, code: str) -> str:
+        """
+        Args:
+            test_class_name (str): The test class to run.
+            modified_file (str): The path of the file the candidate is written to.
+            code (str): The candidate.
+
+        Returns:
+            str: The shell command running the tests.
+        """
+        options = ["-B", f"-Dmaven.repo.local={self.local_repo}"]
+        if self.mvnd_path is not None:
+            # Plain output, in the same format as `mvn`
+            options.append("-Dmvnd.rawStreams=true")
+        if self.is_seeded:
+            options.append("-o")
+        command = f"export JAVA_HOME={self.java_home} && "
+        if self.has_stale_classes(modified_file):
+            compiled_output = " ".join(
+                shlex.quote(os.path.join(os.path.abspath(self.module_dir), "target", name))
+                for name in COMPILED_OUTPUT_DIRS
+            )
+            command += f"sudo rm -rf {compiled_output} && "
+        elif self.can_build_incrementally(modified_file, code):
+            # Despite its name, only recompiles the sources which are newer than their classes
+            options.append("-Dmaven.compiler.useIncrementalCompilation=false")
+        return command + (
+            f"sudo -E {self.executable} {' '.join(options)} test "
+            f'-Dtest="{test_class_name}" -DfailIfNoTests=false -Dsurefire.failIfNoSpecifiedTests=false'
+        )
+
+    def record_run(self, modified_file: str, code: str, output: str) -> None:
+        """
+        Updates the session state after a run.
+
+        Args:
+            modified_file (str): The path of the file the candidate was written to.
+            code (str): The candidate.
+            output (str): The Maven output.
+        """
+        tests_ran = "Tests run:" in output
+        state = self._load_state()
+        signature = fetch_api_signature(code)
+        compiled_sources = state["compiled_sources"]
+        if tests_ran:
+            # The module and its tests compiled: the classes of every file match its current content
+            for path in set(compiled_sources) | {modified_file}:
+                compiled_sources[path] = self._fetch_source_hash(path)
+                if compiled_sources[path] is None:
+                    # Deleted, and cleaned along with the module (see `has_stale_classes`)
+                    del compiled_sources[path]
+            state["seeded"] = True
+        else:
+            # The classes of the candidate are in an unknown state
+            compiled_sources[modified_file] = None
+        if tests_ran and signature is not None:
+            # Both the module and its tests compiled against this API
+            state["api_signatures"][modified_file] = signature
+        else:
+            state["api_signatures"].pop(modified_file, None)
+        self._save_state(state)
+
+
+def fetch_session(module_dir: str, java_home: str, mvn_path: str, local_repo: str = None) -> MavenSession:
+    """Returns the session of a module (shared by all the evaluators of the process)."""
+    key = os.path.abspath(module_dir)
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = MavenSession(module_dir, java_home, mvn_path, local_repo)
+        return _sessions[key]
@@ -0,0 +1,119 @@
+"""Isolated directories for concurrent evaluations of Java tasks.
+
+A `JavaEvaluator` built on the default directories (`temp/java/eval_repo/`, the default `~/.m2`)
+writes the candidate in place and runs Maven there, so two evaluations cannot run at once. A
+`JavaSandbox` gives an evaluation its own:
+
+- evaluation copy of the repository (copy-on-write where the filesystem supports it, and only
+  re-synced for the files which differ when the sandbox is reused),
+- working copy of the repository (for `JavaDataset.get_instance_and_setup_env`),
+- local Maven repository: a hardlinked overlay of the shared one (`JavaConstants.SHARED_MAVEN_REPO`),
+  which is never written to. The files Maven rewrites in place are copied, and the artifacts
+  downloaded by a sandbox only land in its overlay.
+
+    results = sandbox.evaluate_many(dataset, [(0, candidate_a), (0, candidate_b), (7, candidate_c)])
+"""
+
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, List, Tuple
+
+import project_utils.common_utils as utils
+from project_utils import tracing
+from project_utils.constants import JavaConstants
+from project_utils.repo_materialization import overlay_tree
+from repoclassbench.evaluator.base_evaluator import EvaluationData
+
+logger = utils.fetch_ist_adjusted_logger()
+
+
+def is_rewritten_maven_file(name: str) -> bool:
+    """Whether Maven rewrites the file in place (download tracking and metadata) rather than replacing it."""
+    return (
+        name.endswith((".lastUpdated", ".properties", ".repositories"))
+        or name.startswith("maven-metadata")
+    )
+
+
+class JavaSandbox:
+    """
+    The directories of one evaluation at a time.
+
+    Args:
+        root (str): The sandbox directory.
+        shared_local_repo (str): The local Maven repository the sandbox overlays.
+    """
+
+    def __init__(self, root: str, shared_local_repo: str = JavaConstants.SHARED_MAVEN_REPO):
+        self.root = root
+        self.shared_local_repo = shared_local_repo
+        self.eval_root = os.path.join(root, "eval_repo/")
+        self.working_root = os.path.join(root, "working_repo/")
+        self.local_repo = os.path.join(root, "m2/repository")
+        self._overlay_stamp = os.path.join(root, "m2/.overlay_done")
+
+    @tracing.traced(category="setup")
+    def prepare(self) -> None:
+        """Creates the overlay of the shared local Maven repository (once per sandbox)."""
+        if os.path.exists(self._overlay_stamp):
+            return
+        os.makedirs(self.local_repo, exist_ok=True)
+        if os.path.isdir(self.shared_local_repo):
+            stats = overlay_tree(self.shared_local_repo, self.local_repo, copy_if=is_rewritten_maven_file)
+            logger.debug(f"Overlaid {self.shared_local_repo} in {self.local_repo}: {stats}")
+        with open(self._overlay_stamp, "w") as f:
+            f.write(self.shared_local_repo)
+
+
+class SandboxPool:
+    """
+    A fixed set of sandboxes, lent to one evaluation at a time.
+
+    Args:
+        num_sandboxes (int): The number of sandboxes (ie. of concurrent evaluations).
+        root (str): Where the sandboxes live. They are kept between runs, so that later runs only
+            re-sync what differs.
+    """
+
+    def __init__(self, num_sandboxes: int, root: str = JavaConstants.SANDBOX_DIR):
+        self._free = queue.Queue()
+        for i in range(num_sandboxes):
+            self._free.put(JavaSandbox(os.path.join(root, f"sandbox_{i}")))
+
+    @contextmanager
+    def sandbox(self):
+        """Lends a (prepared) sandbox, waiting for one to be free."""
+        sandbox = self._free.get()
+        try:
+            sandbox.prepare()
+            yield sandbox
+        finally:
+            self._free.put(sandbox)
+
+
+def evaluate_many(
+    dataset, items: Iterable[Tuple[int, str]], max_workers: int = JavaConstants.EVAL_WORKERS, pool: SandboxPool = None
+) -> List[EvaluationData]:
+    """
+    Evaluates (task, candidate) pairs in parallel, each in its own sandbox.
+
+    Args:
+        dataset (JavaDataset): The dataset of the tasks.
+        items (Iterable[Tuple[int, str]]): The task indices and the candidates to evaluate.
+        max_workers (int): The number of concurrent evaluations.
+        pool (SandboxPool, optional): The sandboxes to use. Defaults to `max_workers` sandboxes.
+
+    Returns:
+        List[EvaluationData]: The results, in the order of `items`.
+    """
+    pool = pool or SandboxPool(max_workers)
+
+    def evaluate(item):
+        i, code = item
+        with pool.sandbox() as sandbox:
+            return dataset.fetch_evaluator(i, sandbox=sandbox).evaluate(code)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(evaluate, list(items)))
@@ -3,9 +3,15 @@ from repoclassbench.evaluator.base_evaluator import BaseEvaluator
 
 import os
 import json
+import contextvars
+import shlex
+import textwrap
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import Final
 
-from project_utils.constants import PythonConstants
+from project_utils import process_runner, tracing
+from project_utils.constants import ProcessConstants, PythonConstants
 import project_utils.common_utils as utils
 from repoclassbench.dataset.python_setup_utils import (
     data_utils,
@@ -17,6 +23,32 @@ from repoclassbench.evaluator.base_evaluator import EvaluationData
 
 logger = utils.fetch_ist_adjusted_logger()
 
+PREFLIGHT_MARKER = "RCB_PREFLIGHT "
+PREFLIGHT_IMPORT_TIMEOUT_SEC = 120
+
+# Run by the Python of the task environment (3.6+): imports the module and reports whether a failure
+# was raised while executing the generated class (lines `start_line` to `end_line` of the modified file),
+# or is a syntax error of the modified file. Failures of the rest of the file (such as its imports, without
+# the conftest and plugins of the pytest run) or of a broken package of the environment are not blamed.
+PREFLIGHT_IMPORT_SCRIPT = r"""
+import importlib, json, os, sys, traceback
+module_name, file_path = sys.argv[1], os.path.realpath(sys.argv[2])
+start_line, end_line = int(sys.argv[3]), int(sys.argv[4])
+sys.path.insert(0, os.getcwd())
+ans = {"ok": True, "in_generated_class": False, "traceback": ""}
+try:
+    importlib.import_module(module_name)
+except BaseException as e:
+    in_generated_class = any(
+        os.path.realpath(frame[0]) == file_path and start_line <= frame[1] <= end_line
+        for frame in traceback.extract_tb(sys.exc_info()[2])
+    )
+    if isinstance(e, SyntaxError) and e.filename and os.path.realpath(e.filename) == file_path:
+        in_generated_class = True
+    ans = {"ok": False, "in_generated_class": in_generated_class, "traceback": traceback.format_exc()}
+print("RCB_PREFLIGHT " + json.dumps(ans))
+"""
+
 
 class PythonEvaluator(BaseEvaluator):
     PLACEHOLDER_TEXT = "# <MSR CLASS PLACEHOLDER>"
@@ -40,18 +72,22 @@ class PythonEvaluator(BaseEvaluator):
             )
         )
 
-        self.CONDA_ENV_NAME: Final[str] = self.SWEBENCH_ISSUE_ID
-
         # Initialize the Python repository setup object
         self.setup_obj = python_repo_initializer.PythonRepoInitializer(
             repotools_task_id
         )
 
+        # The (possibly shared) conda environment resolved by the setup object
+        self.CONDA_ENV_NAME: Final[str] = self.setup_obj.CONDA_ENV_NAME
+
         # Maximum tokens allowed in feedback
         self.MAX_TOKENS_ALLOWED_IN_FEEDBACK = (
             PythonConstants.MAX_TOKENS_ALLOWED_IN_FEEDBACK
         )
 
+        # Whether the pre-flight import is trusted for the task (None: not checked on the ground truth yet)
+        self.preflight_import_enabled = None
+
     @property
     def name_of_class_to_generate(self):
         """
@@ -86,6 +122,7 @@ class PythonEvaluator(BaseEvaluator):
         """
         os.system(f"cd {self.REPO_DIR} && git status")
 
+    @tracing.traced(category="evaluation")
     def evaluate(self, new_class_gen) -> EvaluationData:
         """
         Takes generated code, adds it to the file to be modified, and evaluates the test cases.
@@ -97,6 +134,11 @@ class PythonEvaluator(BaseEvaluator):
             dict: The evaluation results including parsed and contextually evaluated results.
         """
 
+        # Pre-flight (1): A syntax error in the generated class does not need the environment at all
+        compile_error = self.preflight_compile(new_class_gen)
+        if compile_error is not None:
+            return self.fetch_preflight_failure_result(compile_error, lint=False)
+
         # Ensure the repository is in the final runnable state
         self.setup_obj.ensure_final_runnable_state(delete_ground_truth_class=True)
         logger.debug(
@@ -107,24 +149,55 @@ class PythonEvaluator(BaseEvaluator):
         curr_file_contents = open(self.setup_obj.file_to_modify_abs, "r").read()
         assert self.PLACEHOLDER_TEXT in curr_file_contents
 
+        # Pre-flight (2): Only trusted if the module imports with the ground truth class
+        if self.preflight_import_enabled is None:
+            self.preflight_import_enabled = self.check_preflight_import(curr_file_contents)
+
         # Replace the placeholder text with the generated class code
-        new_file_contents = curr_file_contents.replace(
-            self.PLACEHOLDER_TEXT, new_class_gen
-        )
+        new_file_contents, class_lines = self.fetch_file_with_class(curr_file_contents, new_class_gen)
 
         # Write the new file contents
         with open(self.setup_obj.file_to_modify_abs, "w") as f:
             f.write(new_file_contents)
 
-        # Evaluate the test cases
-        eval_result = self.run_testcases(self.REPO_DIR, run_all_testcases=False)
-        parsed_eval_result = evaluator_utils.PytestResults(eval_result["pytest_json"])
+        # Pre-flight (2): Import the modified module in the task environment
+        if self.preflight_import_enabled:
+            import_result = self.preflight_import(*class_lines)
+            if not import_result["ok"] and import_result["in_generated_class"]:
+                return self.fetch_preflight_failure_result(import_result["traceback"], lint=True)
+
+        # Lint the file while the test cases are running
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            linter_future = executor.submit(
+                contextvars.copy_context().run,
+                python_repo_initializer.fetch_linter_errors,
+                self.setup_obj.file_to_modify_abs,
+            )
 
-        # Contextually evaluate the parsed results
-        contextually_evaluated_result = self.contextually_evaluate(
-            parsed_eval_result, self.setup_obj.gt_has_linter_error
-        )
+            # Evaluate the test cases
+            eval_result = self.run_testcases(self.REPO_DIR, run_all_testcases=False)
+            parsed_eval_result = evaluator_utils.PytestResults(eval_result["pytest_json"])
+
+            # Contextually evaluate the parsed results
+            contextually_evaluated_result = self.contextually_evaluate(
+                parsed_eval_result,
+                self.setup_obj.gt_has_linter_error,
+                linter_error_df=linter_future.result(),
+            )
 
+        return self.format_evaluation_results(eval_result, contextually_evaluated_result)
+
+    def format_evaluation_results(self, eval_result, contextually_evaluated_result) -> EvaluationData:
+        """
+        Wraps the results of an evaluation into an `EvaluationData` object.
+
+        Args:
+            eval_result (dict): The results of running the test cases.
+            contextually_evaluated_result (dict): The output of `contextually_evaluate`.
+
+        Returns:
+            EvaluationData: The evaluation results.
+        """
         # Return the evaluation results in proper format
         evaluation_results_obj = EvaluationData(
             passed_tests=contextually_evaluated_result["summary"]["passed"],
@@ -142,6 +215,163 @@ class PythonEvaluator(BaseEvaluator):
 
         return evaluation_results_obj
 
+    def preflight_compile(self, new_class_gen):
+        """
+        Byte-compiles the generated class on its own (in the harness' interpreter).
+
+        Args:
+            new_class_gen (str): The generated class code.
+
+        Returns:
+            str: The formatted syntax error, or None if the class compiles.
+        """
+        try:
+            compile(textwrap.dedent(new_class_gen), self.setup_obj.file_to_modify_rel, "exec")
+        except (SyntaxError, ValueError):
+            return traceback.format_exc(limit=0)
+        return None
+
+    @property
+    def module_to_modify(self):
+        """The dotted name of the module being modified (eg: `pvlib/pvsystem.py` -> `pvlib.pvsystem`)."""
+        module_path = os.path.splitext(self.setup_obj.file_to_modify_rel)[0]
+        parts = module_path.split("/")
+        if parts[0] == "src":
+            parts = parts[1:]
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        return ".".join(parts)
+
+    def fetch_file_with_class(self, file_contents, class_code):
+        """
+        Replaces the placeholder of the file with a class.
+
+        Args:
+            file_contents (str): The file with the placeholder.
+            class_code (str): The class.
+
+        Returns:
+            tuple: The new file contents, and the (1-based, inclusive) first and last lines of the class.
+        """
+        start_line = file_contents[: file_contents.index(self.PLACEHOLDER_TEXT)].count("\n") + 1
+        end_line = start_line + class_code.count("\n")
+        return file_contents.replace(self.PLACEHOLDER_TEXT, class_code), (start_line, end_line)
+
+    def check_preflight_import(self, file_contents):
+        """
+        Runs the pre-flight import with the ground truth class in place of the placeholder.
+
+        The import runs without the conftest, plugins and settings of the pytest run: if the ground
+        truth does not import that way, the pre-flight import is disabled for the task.
+
+        Args:
+            file_contents (str): The file with the placeholder.
+
+        Returns:
+            bool: Whether the module imports with the ground truth class.
+        """
+        gt_file_contents, class_lines = self.fetch_file_with_class(
+            file_contents, self.REPOTOOLS_ELEM["ground_truth_class_body"]
+        )
+        with open(self.setup_obj.file_to_modify_abs, "w") as f:
+            f.write(gt_file_contents)
+        try:
+            import_result = self.preflight_import(*class_lines)
+        finally:
+            with open(self.setup_obj.file_to_modify_abs, "w") as f:
+                f.write(file_contents)
+        if not import_result["ok"]:
+            logger.info(
+                f"Pre-flight import of {self.module_to_modify} fails with the ground truth, disabling it"
+            )
+        return import_result["ok"]
+
+    @tracing.traced(category="evaluation")
+    def preflight_import(self, start_line, end_line):
+        """
+        Imports the modified module with the Python of the task environment.
+
+        Args:
+            start_line (int): The first line of the generated class in the modified file.
+            end_line (int): The last line of the generated class.
+
+        Returns:
+            dict: A dictionary with the following keys:
+                - 'ok': Whether the import succeeded (or could not be checked).
+                - 'in_generated_class': Whether the failure was raised from the generated class (or
+                  is a syntax error of the modified file).
+                - 'traceback': The formatted exception.
+        """
+        ans = {"ok": True, "in_generated_class": False, "traceback": ""}
+        if not os.path.exists(self.CONDA_ENV_PATH):
+            return ans
+        result = process_runner.run_process(
+            [
+                self.CONDA_ENV_PATH,
+                "-c",
+                PREFLIGHT_IMPORT_SCRIPT,
+                self.module_to_modify,
+                self.setup_obj.file_to_modify_abs,
+                str(start_line),
+                str(end_line),
+            ],
+            cwd=self.REPO_DIR,
+            timeout=PREFLIGHT_IMPORT_TIMEOUT_SEC,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        )
+        if result.timed_out:
+            logger.warning(f"Pre-flight import of {self.module_to_modify} timed out")
+            return ans
+        for line in result.stdout.split("\n"):
+            if line.startswith(PREFLIGHT_MARKER):
+                ans = json.loads(line[len(PREFLIGHT_MARKER) :])
+        logger.debug(f"Pre-flight import of {self.module_to_modify}: {ans}")
+        return ans
+
+    def fetch_preflight_failure_result(self, longrepr, lint) -> EvaluationData:
+        """
+        Reports a pre-flight failure as a failed collector, ie. in the same format as a pytest collection error.
+
+        Args:
+            longrepr (str): The formatted error.
+            lint (bool): Whether the modified file has been written (and can be linted).
+
+        Returns:
+            EvaluationData: The evaluation results.
+        """
+        eval_result = {
+            "stdout": "None <Command did not run>",
+            "stderr": longrepr,
+            "exit_status": None,
+            "pytest_json": {
+                "root": self.REPO_DIR,
+                "summary": {},
+                "comments": "Constructed by the pre-flight check",
+                "collectors": [
+                    {
+                        "result": [],
+                        "outcome": "failed",
+                        "nodeid": self.setup_obj.file_to_modify_rel,
+                        "longrepr": longrepr,
+                    }
+                ],
+                "tests": [],
+            },
+        }
+        parsed_eval_result = evaluator_utils.PytestResults(eval_result["pytest_json"])
+        if lint:
+            contextually_evaluated_result = self.contextually_evaluate(
+                parsed_eval_result, self.setup_obj.gt_has_linter_error
+            )
+        else:
+            contextually_evaluated_result = self.contextually_evaluate(
+                parsed_eval_result,
+                gt_has_linter_error=True,
+                linter_error_df={"error_list": [], "hint_str": ""},
+            )
+        return self.format_evaluation_results(eval_result, contextually_evaluated_result)
+
+    @tracing.traced(category="evaluation")
     @utils.with_tempfile(prefix="tmp_json_output_")
     def run_testcases(self, repo_dir_path, run_all_testcases=False, temp_file=None):
         """
@@ -174,19 +404,20 @@ class PythonEvaluator(BaseEvaluator):
             self.REPO_NAME
         ]
 
-        _test_directives = (
-            ""
-            if run_all_testcases
-            else evaluator_utils.get_test_directives(
-                self.REPOTOOLS_TASK_ID, self.REPOTOOLS_ELEM
-            )
+        # Only the files containing the expected test cases are collected, and every other test case
+        # is deselected by the in-repo pytest plugin (litestar runs its whole test suite)
+        _expected_node_ids = (
+            []
+            if run_all_testcases or "litestar" in self.REPOTOOLS_TASK_ID
+            else self.find_expected_to_pass_tc()
         )
+        _test_modules = evaluator_utils.get_test_modules(_expected_node_ids)
 
-        args_use["test_cmd"] = f"{_test_type} {' '.join(_test_directives)}"
+        args_use["test_cmd"] = f"{_test_type} {' '.join(shlex.quote(x) for x in _test_modules)}"
         args_use["repo_dir_path"] = repo_dir_path
 
         # Add specific dependencies based on the repository name
-        if "pytest-dev__pytest" not in self.CONDA_ENV_NAME:
+        if "pytest-dev__pytest" not in self.SWEBENCH_ISSUE_ID:
             args_use[
                 "additional_add_pytest_specific"
             ] += 'python -m pip install "pytest<=7.4.4"'
@@ -229,9 +460,19 @@ class PythonEvaluator(BaseEvaluator):
 
         assert "pytest" in _test_type
         tmp_file_path = temp_file.name
-        args_use[
-            "test_cmd"
-        ] += f" --json-report --json-report-file={tmp_file_path} --tb=auto --continue-on-collection-errors"
+        select_file_path = None
+        if len(_expected_node_ids) > 0:
+            select_file_path = tmp_file_path + ".select"
+            with open(select_file_path, "w") as f:
+                f.write("\n".join(_expected_node_ids) + "\n")
+        plugin_args = evaluator_utils.fetch_pytest_plugin_args(
+            tmp_file_path, select_file_path
+        )
+        args_use["test_cmd"] = (
+            f"PYTHONPATH={shlex.quote(evaluator_utils.PYTEST_PLUGIN_DIR)}${{PYTHONPATH:+:$PYTHONPATH}} "
+            + args_use["test_cmd"]
+            + f" {plugin_args} --tb=auto --continue-on-collection-errors"
+        )
 
         if run_all_testcases:
             # additional_cmd = self.fetch_files_to_ignore()
@@ -250,12 +491,23 @@ class PythonEvaluator(BaseEvaluator):
 
         self.run_tc_bash_script = bash_template.format(**args_use)
 
-        self.run_tc_result = utils.execute_bash_script(self.run_tc_bash_script)
+        self.run_tc_result = utils.execute_bash_script(
+            self.run_tc_bash_script, timeout=ProcessConstants.PYTEST_TIMEOUT_SEC
+        )
+        if self.run_tc_result["timed_out"]:
+            self.run_tc_result["stderr"] += (
+                f"\nThe test run was killed after {ProcessConstants.PYTEST_TIMEOUT_SEC:.0f} seconds (timeout)."
+            )
+        if select_file_path is not None:
+            os.remove(select_file_path)
         # logger.debug("Bash script used: %s", self.run_tc_bash_script)
         # logger.debug("Stdout Bash script used: %s", self.run_tc_result['stdout'])
         # logger.debug("Stderr Bash script used: %s", self.run_tc_result['stderr'])
         try:
-            self.run_tc_result["pytest_json"] = json.load(open(tmp_file_path, "r"))
+            self.run_tc_result["pytest_json"] = evaluator_utils.load_streamed_report(
+                tmp_file_path
+            )
+            assert self.run_tc_result["pytest_json"] is not None, "pytest did not start"
         except BaseException as E:
             self.run_tc_result["pytest_json"] = None
             # worst case:
@@ -273,7 +525,7 @@ class PythonEvaluator(BaseEvaluator):
             }
             # surely, some bad import incident has taken place
             logger.exception(
-                "Exception occurred while trying to load the pytest json file (%s): %s"
+                "Exception occurred while trying to load the pytest outcomes file (%s): %s"
                 % (tmp_file_path, E)
             )
 
@@ -296,13 +548,17 @@ class PythonEvaluator(BaseEvaluator):
         """
         return self.REPOTOOLS_ELEM["evaluation_metadata"]["test_directives"]
 
-    def contextually_evaluate(self, parsed_eval_result, gt_has_linter_error):
+    @tracing.traced(category="evaluation")
+    def contextually_evaluate(
+        self, parsed_eval_result, gt_has_linter_error, linter_error_df=None
+    ):
         """
         Contextually evaluates the parsed evaluation result.
 
         Args:
             parsed_eval_result (PytestResults): The parsed evaluation result.
             gt_has_linter_error (bool): Whether the ground truth has linter errors.
+            linter_error_df (dict, optional): The linter errors of the modified file, if already computed.
 
         Returns:
             dict: The contextually evaluated result.
@@ -363,19 +619,22 @@ class PythonEvaluator(BaseEvaluator):
                     )
 
         # Fetch linter error
-        linter_error_df = python_repo_initializer.fetch_linter_errors(
-            self.setup_obj.file_to_modify_abs
-        )
+        if linter_error_df is None:
+            linter_error_df = python_repo_initializer.fetch_linter_errors(
+                self.setup_obj.file_to_modify_abs
+            )
         logger.debug("Number of lint errors: %s", len(linter_error_df["error_list"]))
         if gt_has_linter_error:
             # Ignore evaluation linter errors also
             linter_error_df["error_list"] = []
             linter_error_df["hint_str"] = ""
 
-        feedback_str = ""
+        feedback_builder = utils.TokenBudgetBuilder(self.MAX_TOKENS_ALLOWED_IN_FEEDBACK)
         if (len(linter_error_df["error_list"])) > 0:
             additional_str = "Linter errors detected. Please fix them first. These are linter errors on the whole file and not just the class. Some errors such as symbol not found may either be due to missing imports or missing members in the class."
-            feedback_str = f"<Linter Errors>\n{additional_str}\n{linter_error_df['hint_str']}</Linter Errors>\n"
+            feedback_builder.add(
+                f"<Linter Errors>\n{additional_str}\n{linter_error_df['hint_str']}</Linter Errors>\n"
+            )
         if True:
             # Sort collector-level feedback
             failed_collector_df = {
@@ -392,27 +651,19 @@ class PythonEvaluator(BaseEvaluator):
                 )
             }
             for k, v in failed_collector_df.items():
-                feedback_to_add = f"<Feedback for collector `{k}`>\n{v}\n</End of feedback for collector>\n"
-                if (
-                    utils.estimate_token_cnt(feedback_str + feedback_to_add)
-                    > self.MAX_TOKENS_ALLOWED_IN_FEEDBACK
-                ):
-                    pass
-                feedback_str += feedback_to_add
+                feedback_builder.add(
+                    f"<Feedback for collector `{k}`>\n{v}\n</End of feedback for collector>\n"
+                )
             for k, v in generate_feedback_for_failed_tc_df.items():
-                feedback_to_add = f"<Feedback for test case `{k}`>\n{v}\n</End of feedback for test case>\n"
-                if (
-                    utils.estimate_token_cnt(feedback_str + feedback_to_add)
-                    > self.MAX_TOKENS_ALLOWED_IN_FEEDBACK
-                ):
-                    pass
-                feedback_str += feedback_to_add
-        feedback_str = utils.truncate_string_per_token(
-            feedback_str, self.MAX_TOKENS_ALLOWED_IN_FEEDBACK
-        )
+                feedback_builder.add(
+                    f"<Feedback for test case `{k}`>\n{v}\n</End of feedback for test case>\n"
+                )
+        feedback_str = feedback_builder.build()
 
         logger.debug(
-            "Tokens in feedback str: %s", utils.estimate_token_cnt(feedback_str)
+            "Tokens in feedback str: %s (%s fragments dropped)",
+            feedback_builder.token_cnt,
+            feedback_builder.dropped_fragments,
         )
 
         # Remove: Ignoring invalid distribution
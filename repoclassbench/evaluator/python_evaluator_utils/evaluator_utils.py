@@ -58,6 +58,128 @@ def get_test_directives(repotools_task_id, repotools_task_elem):
     return test_directives
 
 
+# Directory added to PYTHONPATH so that the task environments can load `-p rcb_pytest_plugin`
+PYTEST_PLUGIN_DIR = os.path.join(os.path.dirname(__file__), "pytest_plugin")
+PYTEST_PLUGIN_NAME = "rcb_pytest_plugin"
+
+
+def get_test_modules(test_directives):
+    """
+    Retrieves the test files containing the given (unquoted) node ids, in order of first appearance.
+
+    Args:
+        test_directives (list): Node ids such as `tests/test_x.py::TestY::test_z[param]`.
+
+    Returns:
+        list: The test file paths.
+    """
+    ans = []
+    for directive in test_directives:
+        module = directive.split("::")[0]
+        if module not in ans:
+            ans.append(module)
+    return ans
+
+
+def fetch_pytest_plugin_args(outcomes_file_path, select_file_path=None):
+    """
+    Builds the pytest command line arguments loading the in-repo plugin.
+
+    Args:
+        outcomes_file_path (str): The JSON-lines file receiving the outcomes.
+        select_file_path (str, optional): File with the node ids to run (one per line). All the collected items are run if None.
+
+    Returns:
+        str: The arguments to append to the pytest command.
+    """
+    args = f"-p {PYTEST_PLUGIN_NAME} --rcb-outcomes-file={outcomes_file_path}"
+    if select_file_path is not None:
+        args += f" --rcb-select-file={select_file_path}"
+    return args
+
+
+def _fetch_test_outcome(phases):
+    """Merges the outcomes of the setup/call/teardown phases of a test, like pytest-json-report does."""
+    if "setup" in phases and phases["setup"]["outcome"] == "failed":
+        return "error"
+    if "teardown" in phases and phases["teardown"]["outcome"] == "failed":
+        return "error"
+    last_phase = phases["call"] if "call" in phases else phases.get("setup", {})
+    outcome = last_phase.get("outcome", "error")
+    if last_phase.get("wasxfail", False):
+        return {"skipped": "xfailed", "passed": "xpassed"}.get(outcome, outcome)
+    return outcome
+
+
+def load_streamed_report(outcomes_file_path):
+    """
+    Builds a (compact) pytest-json-report-like dictionary from the records streamed by `rcb_pytest_plugin`.
+
+    The result contains the keys `root`, `summary`, `collectors` (one synthetic collector holding the
+    selected items, followed by the failed collectors) and `tests`, so it can be parsed by `PytestResults`.
+
+    Args:
+        outcomes_file_path (str): The JSON-lines file written by the plugin.
+
+    Returns:
+        dict: The report, or None if the plugin did not start (eg: pytest could not even be run).
+    """
+    if not os.path.exists(outcomes_file_path):
+        return None
+    root = None
+    items = {}
+    failed_collectors = {}
+    test_phases = {}
+    with open(outcomes_file_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Partially written line of an interrupted run
+                continue
+            if record["type"] == "session":
+                root = record["root"] if root is None else root
+            elif record["type"] == "item":
+                items.setdefault(record["nodeid"], record["item_type"])
+            elif record["type"] == "collector":
+                failed_collectors.setdefault(record["nodeid"], record)
+            elif record["type"] == "phase":
+                # Under pytest-xdist, workers and the controller both report the phases
+                phase = {k: v for k, v in record.items() if k not in ["type", "nodeid", "when"]}
+                test_phases.setdefault(record["nodeid"], {}).setdefault(record["when"], phase)
+    if root is None:
+        return None
+
+    tests = []
+    for nodeid, phases in test_phases.items():
+        test = {"nodeid": nodeid, "outcome": _fetch_test_outcome(phases)}
+        for when, phase in phases.items():
+            test[when] = {"outcome": phase["outcome"], "longrepr": phase.get("longrepr", "")}
+        tests.append(test)
+
+    summary = {"collected": len(items), "total": len(tests)}
+    for test in tests:
+        summary[test["outcome"]] = summary.get(test["outcome"], 0) + 1
+
+    collectors = [
+        {
+            "nodeid": "",
+            "outcome": "passed",
+            "result": [{"nodeid": k, "type": v} for k, v in items.items()],
+        }
+    ]
+    for nodeid, record in failed_collectors.items():
+        collectors.append(
+            {
+                "nodeid": nodeid,
+                "outcome": record["outcome"],
+                "longrepr": record["longrepr"],
+                "result": [],
+            }
+        )
+    return {"root": root, "summary": summary, "collectors": collectors, "tests": tests}
+
+
 class PytestResults:
     """A class to handle the results of pytest execution.
 
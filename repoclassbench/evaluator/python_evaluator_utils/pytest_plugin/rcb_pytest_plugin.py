@@ -0,0 +1,105 @@
+"""Pytest plugin loaded (through PYTHONPATH and `-p rcb_pytest_plugin`) into the task environments.
+
+* `--rcb-select-file`: file with one node id per line. Every other collected item is deselected.
+* `--rcb-outcomes-file`: JSON-lines file receiving the selected items, the failed collectors and the
+  outcome of every test phase as soon as it finishes.
+
+NOTE: This file is imported by the Python of the task environments (3.6+ with pytest<=7.4.4): it must
+not import anything from this repository nor use recent language features.
+"""
+
+import json
+import os
+
+# Report hooks do not receive the config object
+_CONFIG_HOLDER = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("rcb")
+    group.addoption("--rcb-select-file", default=None, help="File with the node ids to run")
+    group.addoption("--rcb-outcomes-file", default=None, help="JSON-lines file receiving the outcomes")
+
+
+def _write_record(config, record):
+    outcomes_file = getattr(config, "_rcb_outcomes_file", None)
+    if outcomes_file is None:
+        return
+    outcomes_file.write(json.dumps(record) + "\n")
+    outcomes_file.flush()
+
+
+def _longrepr(report):
+    if report.longrepr is None:
+        return ""
+    return str(report.longrepr)
+
+
+def pytest_configure(config):
+    _CONFIG_HOLDER["config"] = config
+    outcomes_path = config.getoption("rcb_outcomes_file")
+    config._rcb_outcomes_file = (
+        open(outcomes_path, "a") if outcomes_path is not None else None
+    )
+    select_path = config.getoption("rcb_select_file")
+    config._rcb_selected_ids = None
+    if select_path is not None:
+        with open(select_path, "r") as f:
+            config._rcb_selected_ids = set(line.rstrip("\n") for line in f if line.strip())
+    _write_record(
+        config, {"type": "session", "root": str(config.rootdir), "pid": os.getpid()}
+    )
+
+
+def pytest_unconfigure(config):
+    outcomes_file = getattr(config, "_rcb_outcomes_file", None)
+    if outcomes_file is not None:
+        outcomes_file.close()
+        config._rcb_outcomes_file = None
+
+
+def pytest_collection_modifyitems(session, config, items):
+    selected_ids = config._rcb_selected_ids
+    if selected_ids is not None:
+        selected = [item for item in items if item.nodeid in selected_ids]
+        deselected = [item for item in items if item.nodeid not in selected_ids]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+    for item in items:
+        _write_record(
+            config,
+            {"type": "item", "nodeid": item.nodeid, "item_type": type(item).__name__},
+        )
+
+
+def pytest_collectreport(report):
+    if not report.failed:
+        return
+    _write_record(
+        _CONFIG_HOLDER["config"],
+        {
+            "type": "collector",
+            "nodeid": report.nodeid,
+            "outcome": report.outcome,
+            "longrepr": _longrepr(report),
+        },
+    )
+
+
+def pytest_runtest_logreport(report):
+    record = {
+        "type": "phase",
+        "nodeid": report.nodeid,
+        "when": report.when,
+        "outcome": report.outcome,
+    }
+    if hasattr(report, "wasxfail"):
+        record["wasxfail"] = True
+    if report.outcome != "passed":
+        record["longrepr"] = _longrepr(report)
+    _write_record(_CONFIG_HOLDER["config"], record)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    _write_record(session.config, {"type": "finish", "exitstatus": int(exitstatus)})
@@ -0,0 +1,458 @@
+"""Runs a solver over the whole benchmark, sharded across worker processes and nodes.
+
+Usage:
+    python -m repoclassbench.runner run --language python --solver my_package.my_module:generate_class \
+        --run-name my_run --num-workers 4 [--num-nodes 2 --node-rank 0 | --queue-dir /shared/queue]
+    python -m repoclassbench.runner merge --language python --run-name my_run
+
+The solver is either `ground_truth` or a `module:function` taking a `TaskData` and returning the
+generated class.
+
+Tasks are grouped by the workspace key of the dataset (tasks of a group share a working directory
+or environment, so they always run in the same worker, one after the other). Groups are assigned
+to the workers either statically, by hashing the key over `num_nodes * num_workers` shards, or
+dynamically, by claiming them in a work-queue directory shared by all the nodes.
+
+Every worker is a separate process with its own `TMPDIR` and log file (in
+`<run_dir>/workers/<node>-w<worker>/`), and appends one JSON line per evaluated task to
+`<DATA_OUTPUT_DIR>/<language>/<run_name>/shard-<node>-w<worker>.jsonl`.
+A run can be restarted with the same arguments after a crash: tasks which already have a result
+in any shard of the run are skipped. With a queue, a node is named after its host and
+`--node-rank`, so that its restarted workers re-take their own claims. `merge` collects the shards into `results.jsonl` and
+`summary.json` (pass rate per language).
+
+The Java workers also set up and evaluate their tasks in their own `JavaSandbox` (working and
+evaluation copies of the repositories, overlay of the local Maven repository) in the worker
+directory. The Python and C# tasks have no such directories: two workers never set up the same
+conda environment or working copy at once only because a workspace key is handled by one worker.
+"""
+
+import glob
+import importlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from argparse import SUPPRESS, ArgumentParser
+from contextlib import contextmanager, nullcontext
+
+from project_utils import common_utils as utils
+from project_utils import tracing
+from project_utils.constants import DatasetConstants
+
+logger = utils.fetch_ist_adjusted_logger()
+
+LANGUAGES = ("java", "python", "csharp")
+SHARD_PREFIX = "shard-"
+# The claim file of a group is touched this often while a worker runs the group
+CLAIM_HEARTBEAT_SEC = 60
+# A claim of the work-queue whose file was not touched for this long is considered abandoned
+STALE_CLAIM_SEC = 10 * CLAIM_HEARTBEAT_SEC
+
+
+def fetch_run_dir(language: str, run_name: str) -> str:
+    """Returns the directory holding the results of a run for a language."""
+    return os.path.join(DatasetConstants.DATA_OUTPUT_DIR, language, run_name)
+
+
+def fetch_worker_dir(run_dir: str, owner: str) -> str:
+    """Returns the directory of a worker (temp directory, log file and Java sandbox)."""
+    return os.path.join(run_dir, "workers", owner)
+
+
+def load_solver(solver_spec: str):
+    """
+    Loads the function generating the class of a task.
+
+    Args:
+        solver_spec (str): `ground_truth`, or `module:function`.
+
+    Returns:
+        Callable[[TaskData], str]: The solver.
+    """
+    if solver_spec == "ground_truth":
+        return lambda task: task.ground_truth
+    module_name, _, function_name = solver_spec.partition(":")
+    assert function_name, f"Expected `module:function`, got: {solver_spec}"
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def shard_of(workspace_key: str, num_shards: int) -> int:
+    """Maps a workspace key to a shard, identically on every node."""
+    return int(utils.fetch_hash(workspace_key), 16) % num_shards
+
+
+def group_tasks(dataset, indices=None) -> dict:
+    """
+    Groups the task indices by workspace key.
+
+    Args:
+        dataset: A `Dataset` object.
+        indices (List[int], optional): The task indices. Defaults to all of them.
+
+    Returns:
+        dict: workspace key -> list of task indices (in dataset order).
+    """
+    indices = range(len(dataset)) if indices is None else indices
+    groups = {}
+    for i in indices:
+        groups.setdefault(dataset.workspace_key(i), []).append(i)
+    return groups
+
+
+def read_results(run_dir: str) -> dict:
+    """
+    Reads the results checkpointed by all the shards of a run.
+
+    A task evaluated several times (eg: retried after an error) keeps its last successful result.
+    Lines cut short by a crash are ignored.
+
+    Args:
+        run_dir (str): The directory of the run.
+
+    Returns:
+        dict: task index -> result record.
+    """
+    ans = {}
+    for shard_path in sorted(glob.glob(os.path.join(run_dir, SHARD_PREFIX + "*.jsonl"))):
+        with open(shard_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping a truncated line of {shard_path}")
+                    continue
+                previous = ans.get(record["task_index"])
+                if previous is not None and previous["error"] is None and record["error"] is not None:
+                    continue
+                ans[record["task_index"]] = record
+    return ans
+
+
+def fetch_completed_indices(run_dir: str, retry_errors: bool = False) -> set:
+    """Returns the indices of the tasks which already have a result (errors excluded if `retry_errors`)."""
+    return {
+        i
+        for i, record in read_results(run_dir).items()
+        if not (retry_errors and record["error"] is not None)
+    }
+
+
+class CheckpointWriter:
+    """Appends result records to a JSONL shard file, making each one durable before the next task starts."""
+
+    def __init__(self, shard_path: str):
+        os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+        self.shard_path = shard_path
+        self._file = open(shard_path, "a")
+
+    def write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class WorkQueue:
+    """
+    Hands out workspace groups to the workers of all the nodes, through a shared directory.
+
+    A group is claimed by creating `<key hash>.claim` exclusively, and marked as finished by
+    creating `<key hash>.done`. While a group runs, its claim file is touched every
+    `heartbeat_sec` (see `holding`); claims left untouched for `stale_after_sec` (eg: by a crashed
+    node) can be taken over. A worker restarted with the same owner name re-takes its own claims
+    at once.
+    """
+
+    def __init__(
+        self, queue_dir: str, stale_after_sec: int = STALE_CLAIM_SEC, heartbeat_sec: int = CLAIM_HEARTBEAT_SEC
+    ):
+        os.makedirs(queue_dir, exist_ok=True)
+        self.queue_dir = queue_dir
+        self.stale_after_sec = stale_after_sec
+        self.heartbeat_sec = heartbeat_sec
+
+    def _path(self, workspace_key: str, suffix: str) -> str:
+        return os.path.join(self.queue_dir, utils.fetch_hash(workspace_key)[:32] + suffix)
+
+    def _fetch_owner(self, claim_path: str):
+        try:
+            with open(claim_path, "r") as f:
+                return json.load(f)["owner"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def claim(self, workspace_key: str, owner: str) -> bool:
+        """Tries to claim a group. Returns True if the caller now owns it."""
+        if os.path.exists(self._path(workspace_key, ".done")):
+            return False
+        claim_path = self._path(workspace_key, ".claim")
+        try:
+            fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if self._fetch_owner(claim_path) == owner:
+                # Claimed by this worker before it was restarted
+                logger.info(f"Resuming the claim of {workspace_key}")
+                self.heartbeat(workspace_key)
+                return True
+            try:
+                age_sec = time.time() - os.path.getmtime(claim_path)
+            except FileNotFoundError:
+                return self.claim(workspace_key, owner)
+            if age_sec < self.stale_after_sec:
+                return False
+            # Take over the abandoned claim (the rename is atomic, only one worker wins it)
+            stale_path = f"{claim_path}.stale.{owner}"
+            try:
+                os.rename(claim_path, stale_path)
+            except FileNotFoundError:
+                return False
+            os.remove(stale_path)
+            logger.warning(f"Taking over the abandoned claim of {workspace_key}")
+            return self.claim(workspace_key, owner)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"workspace_key": workspace_key, "owner": owner, "claimed_at": utils.get_ist_time()}, f)
+        return True
+
+    def heartbeat(self, workspace_key: str) -> None:
+        try:
+            os.utime(self._path(workspace_key, ".claim"))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def holding(self, workspace_key: str):
+        """Touches the claim of a group every `heartbeat_sec` until the block exits."""
+        stop_event = threading.Event()
+
+        def beat():
+            while not stop_event.wait(self.heartbeat_sec):
+                self.heartbeat(workspace_key)
+
+        thread = threading.Thread(target=beat, name="rcb-claim-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop_event.set()
+            thread.join()
+
+    def finish(self, workspace_key: str) -> None:
+        with open(self._path(workspace_key, ".done"), "w") as f:
+            f.write(workspace_key)
+
+
+def evaluate_task(dataset, i: int, solver, trace_name: str = None, sandbox=None) -> dict:
+    """
+    Sets up a task, generates its class and evaluates it.
+
+    Args:
+        dataset: A `Dataset` object.
+        i (int): The task index.
+        solver (Callable[[TaskData], str]): The solver.
+        trace_name (str, optional): Name of the trace of the task, when tracing is enabled. Defaults to the index.
+        sandbox (JavaSandbox, optional): The directories to set up and evaluate a Java task in.
+
+    Returns:
+        dict: The result record (`evaluation` is `EvaluationData.dict()`, `error` a traceback or None).
+    """
+    record = {
+        "task_index": i,
+        "task_id": dataset.data[i].get("task_id"),
+        "workspace_key": dataset.workspace_key(i),
+        "evaluation": None,
+        "error": None,
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+    }
+    start_time = time.perf_counter()
+    with tracing.trace_task(trace_name or str(i)) as trace_path:
+        try:
+            if sandbox is None:
+                task = dataset.get_instance_and_setup_env(i)
+            else:
+                task = dataset.get_instance_and_setup_env(i, sandbox=sandbox)
+            with tracing.span("solver", "solver"):
+                generated_code = solver(task)
+            record["evaluation"] = task.evaluator.evaluate(generated_code).dict()
+        except Exception:
+            record["error"] = traceback.format_exc()
+            logger.exception(f"Task {i} failed")
+    record["trace"] = trace_path
+    record["elapsed_sec"] = time.perf_counter() - start_time
+    record["finished_at"] = utils.get_ist_time()
+    return record
+
+
+def run_worker(args) -> None:
+    """Evaluates the groups of one worker (a statically assigned shard, or whatever it claims from the queue)."""
+    from repoclassbench.dataset import Dataset
+
+    dataset = Dataset(args.language, args.specification, args.delete_relatives)
+    solver = load_solver(args.solver)
+    run_dir = fetch_run_dir(args.language, args.run_name)
+    completed = fetch_completed_indices(run_dir, args.retry_errors)
+    groups = group_tasks(dataset)
+    owner = f"{args.node_tag}-w{args.worker_id}"
+    sandbox = None
+    if args.language == "java":
+        from repoclassbench.evaluator.java_evaluator_utils.sandbox import JavaSandbox
+
+        sandbox = JavaSandbox(os.path.join(fetch_worker_dir(run_dir, owner), "sandbox"))
+        sandbox.prepare()
+
+    if args.queue_dir is None:
+        num_shards = args.num_nodes * args.num_workers
+        shard_id = args.node_rank * args.num_workers + args.worker_id
+        keys = [k for k in groups if shard_of(k, num_shards) == shard_id]
+        queue = None
+    else:
+        keys = list(groups)
+        queue = WorkQueue(args.queue_dir, args.stale_claim_sec)
+
+    shard_path = os.path.join(run_dir, f"{SHARD_PREFIX}{owner}.jsonl")
+    with CheckpointWriter(shard_path) as writer:
+        for key in keys:
+            pending = [i for i in groups[key] if i not in completed]
+            if queue is not None:
+                if not queue.claim(key, owner):
+                    continue
+            with nullcontext() if queue is None else queue.holding(key):
+                for i in pending:
+                    record = evaluate_task(dataset, i, solver, f"{args.language}-{i}", sandbox)
+                    writer.write(record)
+                    logger.info(f"[{owner}] Task {i} done in {record['elapsed_sec']:.1f}s")
+            if queue is not None:
+                queue.finish(key)
+
+
+def spawn_workers(args) -> int:
+    """
+    Starts `num_workers` worker processes on this node, each with its own temp directory and log file
+    (and Java sandbox, see `run_worker`).
+
+    Returns:
+        int: The number of workers which exited with a non-zero status.
+    """
+    run_dir = fetch_run_dir(args.language, args.run_name)
+    processes = []
+    for worker_id in range(args.num_workers):
+        worker_dir = fetch_worker_dir(run_dir, f"{args.node_tag}-w{worker_id}")
+        os.makedirs(os.path.join(worker_dir, "tmp"), exist_ok=True)
+        env = {
+            **os.environ,
+            "TMPDIR": os.path.join(worker_dir, "tmp"),
+            "LOG_FILE_PATH": os.path.join(worker_dir, "worker.log"),
+        }
+        command = [sys.executable, "-m", "repoclassbench.runner", "worker", "--worker-id", str(worker_id)]
+        command += args.forwarded_args
+        logger.info(f"Starting worker {worker_id}: {' '.join(command)}")
+        processes.append(subprocess.Popen(command, env=env))
+    return sum(process.wait() != 0 for process in processes)
+
+
+def merge_results(language: str, run_name: str) -> dict:
+    """
+    Merges the shards of a run into `results.jsonl` and `summary.json`.
+
+    Args:
+        language (str): The language of the run.
+        run_name (str): The name of the run.
+
+    Returns:
+        dict: The summary (number of tasks, evaluated, passed, errors and the pass rate).
+    """
+    from project_utils import dataset_store
+
+    run_dir = fetch_run_dir(language, run_name)
+    os.makedirs(run_dir, exist_ok=True)
+    results = read_results(run_dir)
+    num_tasks = len(dataset_store.load_dataset(language))
+    num_passed = sum(
+        1 for record in results.values()
+        if record["error"] is None and record["evaluation"]["test_status"] is True
+    )
+    summary = {
+        "language": language,
+        "run_name": run_name,
+        "num_tasks": num_tasks,
+        "num_evaluated": sum(1 for record in results.values() if record["error"] is None),
+        "num_errors": sum(1 for record in results.values() if record["error"] is not None),
+        "num_passed": num_passed,
+        "pass_rate": num_passed / num_tasks if num_tasks > 0 else 0.0,
+        "merged_at": utils.get_ist_time(),
+    }
+    with open(os.path.join(run_dir, "results.jsonl"), "w") as f:
+        for i in sorted(results):
+            f.write(json.dumps(results[i]) + "\n")
+    with open(os.path.join(run_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=1)
+    return summary
+
+
+def main():
+    parser = ArgumentParser(description="Run a solver over RepoClassBench")
+    parser.add_argument("command", choices=["run", "worker", "merge"])
+    parser.add_argument("--language", choices=LANGUAGES, action="append", required=True,
+                        help="Language(s) to run (merge accepts several)")
+    parser.add_argument("--run-name", required=True)
+    parser.add_argument("--solver", default="ground_truth",
+                        help="`ground_truth` or `module:function` (TaskData -> generated class)")
+    parser.add_argument("--specification", default="detailed", choices=["detailed", "sketchy"])
+    parser.add_argument("--delete-relatives", action="store_true")
+    parser.add_argument("--num-workers", type=int, default=1, help="Worker processes per node")
+    parser.add_argument("--num-nodes", type=int, default=1)
+    parser.add_argument("--node-rank", type=int, default=0)
+    parser.add_argument("--queue-dir", default=None,
+                        help="Shared directory to claim work from (instead of static sharding)")
+    parser.add_argument("--stale-claim-sec", type=int, default=STALE_CLAIM_SEC,
+                        help="Age after which an untouched claim of the queue is taken over")
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="Re-run the tasks whose previous attempt raised an error")
+    # Set by `run` for the worker processes it starts
+    parser.add_argument("--worker-id", type=int, default=0, help=SUPPRESS)
+    parser.add_argument("--node-tag", default=None, help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        for language in args.language:
+            print(json.dumps(merge_results(language, args.run_name), indent=1))
+        return
+
+    assert len(args.language) == 1, "`run` handles one language at a time"
+    args.language = args.language[0]
+    assert 0 <= args.node_rank < args.num_nodes
+
+    if args.command == "worker":
+        run_worker(args)
+        return
+
+    # Nodes are told apart by rank when sharding statically, by host (and rank) when sharing a queue.
+    # The tag is stable across restarts, so that the restarted workers find their shards and claims.
+    if args.node_tag is None:
+        args.node_tag = (
+            f"n{args.node_rank}"
+            if args.queue_dir is None
+            else f"{socket.gethostname()}-n{args.node_rank}"
+        )
+    args.forwarded_args = sys.argv[2:] + ["--node-tag", args.node_tag]
+    num_failed_workers = spawn_workers(args)
+    if num_failed_workers > 0:
+        logger.error(f"{num_failed_workers} worker(s) exited with an error")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
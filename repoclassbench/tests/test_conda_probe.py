@@ -0,0 +1,46 @@
+import json
+import os
+
+from repoclassbench.dataset.python_setup_utils import conda_probe
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_environments_and_editable_installs(tmp_path, monkeypatch):
+    conda_prefix = str(tmp_path / "conda")
+    monkeypatch.setattr(conda_probe.PythonConstants, "CONDA_PREFIX", conda_prefix)
+    monkeypatch.delenv("CONDA_ENVS_PATH", raising=False)
+    conda_probe.clear_cache()
+
+    os.makedirs(os.path.join(conda_prefix, "conda-meta"))
+    env_dir = os.path.join(conda_prefix, "envs", "rcb_env")
+    _write(os.path.join(env_dir, "conda-meta", "history"), "")
+    os.makedirs(os.path.join(conda_prefix, "envs", "not_an_env"))
+    site_packages = os.path.join(env_dir, "lib", "python3.9", "site-packages")
+
+    # Regular and editable (PEP 610) installs, plus a legacy develop install
+    _write(os.path.join(site_packages, "six-1.16.0.dist-info", "METADATA"), "Name: six\n")
+    _write(os.path.join(site_packages, "astroid-2.15.0.dist-info", "METADATA"), "Name: astroid\n")
+    _write(
+        os.path.join(site_packages, "astroid-2.15.0.dist-info", "direct_url.json"),
+        json.dumps({"url": "file:///testbed/astroid", "dir_info": {"editable": True}}),
+    )
+    _write(os.path.join(site_packages, "pylint.egg-link"), "/testbed/pylint\n.")
+
+    assert conda_probe.list_environments() == ["base", "rcb_env"]
+    assert conda_probe.get_referenced_directories("rcb_env") == [
+        ("astroid", "/testbed/astroid"),
+        ("pylint", "/testbed/pylint"),
+    ]
+    assert conda_probe.get_referenced_directories("missing_env") is None
+
+    # pip uninstalling a distribution invalidates the cached result
+    os.remove(os.path.join(site_packages, "pylint.egg-link"))
+    os.utime(site_packages, ns=(0, 0))
+    assert conda_probe.get_referenced_directories("rcb_env") == [
+        ("astroid", "/testbed/astroid")
+    ]
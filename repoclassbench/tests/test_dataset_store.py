@@ -0,0 +1,25 @@
+from project_utils import dataset_store
+
+
+def test_index_matches_records():
+    store = dataset_store.get_dataset_store("java", backend="json")
+    assert dataset_store.get_dataset_store("java", backend="json") is store
+    for i, record in enumerate(store.records):
+        assert store.get(record["task_id"]) is record
+        assert store.index[record["task_id"]] == i
+    assert dataset_store.fetch_task_elem("java", "no-such-task") is None
+
+
+def test_sqlite_backend_loads_large_fields_lazily(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        dataset_store.DatasetConstants, "DATASET_CACHE_DIR", str(tmp_path)
+    )
+    json_store = dataset_store.DatasetStore("csharp", backend="json")
+    sqlite_store = dataset_store.DatasetStore("csharp", backend="sqlite")
+    assert len(sqlite_store) == len(json_store)
+
+    expected = json_store.records[0]
+    record = sqlite_store.get(expected["task_id"])
+    assert "detailed_description" in record
+    assert not dict.__contains__(record, "detailed_description")
+    assert record.materialize() == expected
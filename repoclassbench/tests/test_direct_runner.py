@@ -0,0 +1,91 @@
+import json
+import os
+import stat
+
+from repoclassbench.evaluator.java_evaluator_utils import direct_runner
+
+POINT = """package a;
+
+public class Point {
+    public int getX() { return 1; }
+}
+"""
+
+CONSOLE_OUTPUT = """+-- JUnit Jupiter [OK]
+| '-- PointTest [OK]
+|   +-- testGetX() [OK]
+|   '-- testGetY() [X] expected: <1> but was: <2>
+'-- JUnit Vintage [OK]
+
+Failures (1):
+  JUnit Jupiter:PointTest:testGetY()
+    => org.opentest4j.AssertionFailedError: expected: <1> but was: <2>
+
+Test run finished after 64 ms
+[         1 tests successful      ]
+[         1 tests failed          ]
+[         1 tests aborted         ]
+"""
+
+
+def _write(path, content, executable=False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    if executable:
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+
+def _make_runner(tmp_path, monkeypatch, javac_script):
+    monkeypatch.setattr(direct_runner.JavaConstants, "DIRECT_WORK_DIR", str(tmp_path / "work"))
+    module_dir = tmp_path / "module"
+    _write(str(module_dir / "pom.xml"), "<project/>")
+    _write(str(module_dir / "src/main/java/a/Point.java"), POINT)
+    _write(str(module_dir / "src/main/java/a/Line.java"), "package a; class Line { Point p; }")
+    _write(str(module_dir / "src/main/java/a/Other.java"), "package a; class Other {}")
+    _write(str(module_dir / "src/test/java/a/PointTest.java"), "package a; class PointTest { Point p; }")
+    java_home = tmp_path / "jdk"
+    # Records the sources given to javac
+    _write(str(java_home / "bin/javac"), f'#!/bin/sh\necho "$@" > {tmp_path}/javac_args\n{javac_script}', True)
+    _write(str(java_home / "bin/java"), f"#!/bin/sh\ncat <<'EOF'\n{CONSOLE_OUTPUT}EOF\n", True)
+    runner = direct_runner.DirectTestRunner(str(module_dir), str(java_home), "mvn")
+    _write(runner.classpath_file, "/m2/junit.jar\n")
+    return runner, str(module_dir / "src/main/java/a/Point.java")
+
+
+def test_test_class_pattern():
+    pattern = direct_runner.fetch_test_class_pattern("PointTest, a.b.LineTest#testLength")
+    assert pattern == r"^(.*\.)?(PointTest|a\.b\.LineTest)$"
+
+
+def test_body_change_only_recompiles_the_modified_file(tmp_path, monkeypatch):
+    runner, modified_file = _make_runner(tmp_path, monkeypatch, "exit 0")
+    code = POINT.replace("return 1;", "return 2;")
+    result = runner.evaluate(modified_file, POINT, code, "PointTest")
+    javac_args = (tmp_path / "javac_args").read_text()
+    assert "Point.java" in javac_args and "Line.java" not in javac_args
+    assert "/m2/junit.jar" in javac_args
+    assert (result.passed_tests, result.failed_tests) == (2, 1)
+    assert result.output.startswith("Failures (1):")
+    assert "testGetY" in result.output and "testGetX" not in result.output
+
+
+def test_api_change_recompiles_dependents(tmp_path, monkeypatch):
+    runner, modified_file = _make_runner(
+        tmp_path, monkeypatch, 'echo "$PWD/src/test/java/a/PointTest.java:1: error: cannot find symbol"; exit 1'
+    )
+    code = POINT.replace("getX", "getY")
+    result = runner.evaluate(modified_file, POINT, code, "PointTest")
+    javac_args = (tmp_path / "javac_args").read_text()
+    assert "Line.java" in javac_args and "PointTest.java" in javac_args and "Other.java" not in javac_args
+    assert result.test_compilation_failure and not result.compilation_failure
+    assert "cannot find symbol" in result.output
+
+
+def test_prepare_is_skipped_for_a_prepared_module(tmp_path, monkeypatch):
+    runner, _ = _make_runner(tmp_path, monkeypatch, "exit 0")
+    os.makedirs(runner.test_classes_dir)
+    with open(runner.stamp_file, "w") as f:
+        json.dump(runner._fetch_stamp(), f)
+    # Maven is not installed here: preparing again would fail
+    runner.prepare()
@@ -0,0 +1,51 @@
+import os
+import subprocess
+
+from repoclassbench.dataset.python_setup_utils.git_related_utils import reset_to_commit
+
+
+def _git(repo_dir, *args):
+    return subprocess.run(
+        ["git", "-C", repo_dir, "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def _write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_reset_restores_only_dirty_paths(tmp_path):
+    repo_dir = str(tmp_path)
+    _git(repo_dir, "init", "-q")
+    _write(os.path.join(repo_dir, "a.py"), "a = 1\n")
+    _write(os.path.join(repo_dir, "b.py"), "b = 1\n")
+    _write(os.path.join(repo_dir, ".gitignore"), "*.log\n")
+    _git(repo_dir, "add", ".")
+    _git(repo_dir, "commit", "-q", "-m", "first")
+    first_commit = _git(repo_dir, "rev-parse", "HEAD")
+    _write(os.path.join(repo_dir, "a.py"), "a = 2\n")
+    _git(repo_dir, "commit", "-q", "-am", "second")
+
+    assert not reset_to_commit(repo_dir, "0" * 40)
+
+    # Modified, deleted, renamed and newly staged paths are restored; ignored files are kept
+    _write(os.path.join(repo_dir, "a.py"), "broken\n")
+    _git(repo_dir, "mv", "b.py", "c.py")
+    _write(os.path.join(repo_dir, "[new].py"), "")
+    _git(repo_dir, "add", "[new].py")
+    _write(os.path.join(repo_dir, "run.log"), "keep me\n")
+    assert reset_to_commit(repo_dir, "HEAD")
+    assert _git(repo_dir, "status", "--porcelain", "--untracked-files=no") == ""
+    assert open(os.path.join(repo_dir, "a.py")).read() == "a = 2\n"
+    assert not os.path.exists(os.path.join(repo_dir, "c.py"))
+    assert not os.path.exists(os.path.join(repo_dir, "[new].py"))
+    assert os.path.exists(os.path.join(repo_dir, "run.log"))
+
+    # A different commit still goes through a hard reset
+    assert reset_to_commit(repo_dir, first_commit[:10])
+    assert _git(repo_dir, "rev-parse", "HEAD") == first_commit
+    assert open(os.path.join(repo_dir, "a.py")).read() == "a = 1\n"
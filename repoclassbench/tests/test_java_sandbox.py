@@ -0,0 +1,47 @@
+import threading
+import time
+
+from repoclassbench.evaluator.java_evaluator_utils import sandbox
+
+
+class FakeEvaluator:
+    def __init__(self, i, sandbox_obj, state):
+        self.i = i
+        self.sandbox = sandbox_obj
+        self.state = state
+
+    def evaluate(self, code):
+        with self.state["lock"]:
+            # No two concurrent evaluations share a sandbox
+            assert self.sandbox.root not in self.state["busy"]
+            self.state["busy"].add(self.sandbox.root)
+            self.state["max_busy"] = max(self.state["max_busy"], len(self.state["busy"]))
+        time.sleep(0.05)
+        with self.state["lock"]:
+            self.state["busy"].remove(self.sandbox.root)
+        return (self.i, code)
+
+
+class FakeDataset:
+    def __init__(self):
+        self.state = {"lock": threading.Lock(), "busy": set(), "max_busy": 0}
+
+    def fetch_evaluator(self, i, sandbox=None):
+        return FakeEvaluator(i, sandbox, self.state)
+
+
+def test_evaluate_many_in_sandboxes(tmp_path):
+    shared_repo = tmp_path / "m2"
+    (shared_repo / "g").mkdir(parents=True)
+    (shared_repo / "g" / "a.jar").write_text("jar")
+    pool = sandbox.SandboxPool(3, root=str(tmp_path / "sandboxes"))
+    for sandbox_obj in list(pool._free.queue):
+        sandbox_obj.shared_local_repo = str(shared_repo)
+
+    dataset = FakeDataset()
+    items = [(i % 4, f"candidate {i}") for i in range(12)]
+    results = sandbox.evaluate_many(dataset, items, max_workers=3, pool=pool)
+    assert results == items
+    assert dataset.state["max_busy"] > 1
+    for i in range(3):
+        assert (tmp_path / "sandboxes" / f"sandbox_{i}" / "m2/repository/g/a.jar").read_text() == "jar"
@@ -0,0 +1,36 @@
+import os
+import stat
+import zipfile
+
+from project_utils import java_setup_utils
+
+COMPONENT = java_setup_utils.JavaComponent("tool-1.0", "https://example.invalid/tool.zip")
+
+
+def test_install_once_then_stamp_check(tmp_path, monkeypatch):
+    monkeypatch.setattr(java_setup_utils, "JAVA_EXTERNAL_DIR", str(tmp_path))
+    with zipfile.ZipFile(tmp_path / "tool-1.0.zip", "w") as zip_ref:
+        zip_ref.writestr("tool-1.0/bin/tool", "#!/bin/sh\n")
+        zip_ref.writestr("tool-1.0/lib/tool.jar", "jar")
+
+    assert not java_setup_utils.is_installed(COMPONENT)
+    java_setup_utils.ensure_installed(COMPONENT)
+    tool_path = tmp_path / "tool-1.0/bin/tool"
+    assert os.stat(tool_path).st_mode & stat.S_IXUSR
+    assert java_setup_utils.is_installed(COMPONENT) and java_setup_utils.verify(COMPONENT)
+
+    # Later calls only check the stamp
+    def fail(*args, **kwargs):
+        raise AssertionError("The toolchain should not be walked again")
+
+    monkeypatch.setattr(java_setup_utils, "_make_accessible", fail)
+    monkeypatch.setattr(java_setup_utils, "fetch_tree_digest", fail)
+    java_setup_utils.ensure_installed(COMPONENT)
+    monkeypatch.undo()
+    monkeypatch.setattr(java_setup_utils, "JAVA_EXTERNAL_DIR", str(tmp_path))
+
+    (tmp_path / "tool-1.0/lib/tool.jar").unlink()
+    assert java_setup_utils.is_installed(COMPONENT) and not java_setup_utils.verify(COMPONENT)
+    java_setup_utils.install(COMPONENT, force=True)
+    assert java_setup_utils.verify(COMPONENT)
+    assert (tmp_path / "tool-1.0/lib/tool.jar").read_text() == "jar"
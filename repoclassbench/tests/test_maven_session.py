@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from repoclassbench.evaluator.java_evaluator_utils import maven_session
+
+CODE = """package a;
+
+// A point
+public class Point {
+    public static final int ORIGIN = 0;
+    private int x;
+    static { System.out.println("loaded"); }
+
+    public Point(int x) { this.x = x; }
+
+    public int getX() {
+        return x; /* the x */
+    }
+}
+"""
+
+
+def test_api_signature_ignores_bodies_and_comments():
+    signature = maven_session.fetch_api_signature(CODE)
+    assert signature is not None
+    assert "return x" not in signature and "the x" not in signature and "loaded" not in signature
+    assert "public int getX()" in signature
+
+    same_api = CODE.replace("return x;", "return x + 0;").replace("// A point", "")
+    assert maven_session.fetch_api_signature(same_api) == signature
+    for changed_api in [
+        CODE.replace("ORIGIN = 0", "ORIGIN = 1"),
+        CODE.replace("public int getX()", "public long getX()"),
+        CODE.replace("private int x;", "private int x;\n    private int y;"),
+    ]:
+        assert maven_session.fetch_api_signature(changed_api) != signature
+    assert maven_session.fetch_api_signature("public class {") is None
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.setattr(maven_session.JavaConstants, "MAVEN_LOCAL_REPO", str(tmp_path / "m2"))
+    monkeypatch.setattr(maven_session.JavaConstants, "MAVEN_SESSION_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr(maven_session.JavaConstants, "MVND_PATH", str(tmp_path / "missing"))
+    module_dir = tmp_path / "module"
+    os.makedirs(module_dir / "target" / "classes")
+    os.makedirs(module_dir / "a")
+    (module_dir / "pom.xml").write_text("<project/>")
+    return maven_session.MavenSession(str(module_dir), "/jdk", "/mvn")
+
+
+def _write_candidate(session, name, code):
+    path = os.path.join(session.module_dir, "a", name)
+    with open(path, "w") as f:
+        f.write(code)
+    return path
+
+
+def test_incremental_build_after_successful_run(session):
+    point_path = _write_candidate(session, "Point.java", CODE)
+    command = session.fetch_test_command("PointTest", point_path, CODE)
+    assert " -o " not in command and "useIncrementalCompilation" not in command
+
+    session.record_run(point_path, CODE, "[ERROR] COMPILATION ERROR")
+    assert not session.is_seeded
+    session.record_run(point_path, CODE, "Tests run: 3, Failures: 0, Errors: 0, Skipped: 0")
+    assert session.is_seeded
+    # The state is not kept in the module (whose `target/` is created by Maven through sudo)
+    assert os.listdir(os.path.join(session.module_dir, "target")) == ["classes"]
+
+    command = session.fetch_test_command("PointTest", point_path, CODE.replace("return x;", "return -x;"))
+    assert " -o " in command and "-Dmaven.compiler.useIncrementalCompilation=false" in command
+    command = session.fetch_test_command("PointTest", point_path, CODE.replace("int getX", "int getY"))
+    assert "useIncrementalCompilation" not in command and "rm -rf" not in command
+
+
+def test_restored_sources_force_a_clean_build(session):
+    point_code = CODE.replace("return x;", "return -x;")
+    point_path = _write_candidate(session, "Point.java", point_code)
+    session.record_run(point_path, point_code, "Tests run: 3, Failures: 0, Errors: 0, Skipped: 0")
+
+    # Another task: Point.java is restored, but its classes still hold the candidate of the first task
+    _write_candidate(session, "Point.java", CODE)
+    line_code = "package a;\npublic class Line {\n}\n"
+    line_path = _write_candidate(session, "Line.java", line_code)
+
+    command = session.fetch_test_command("LineTest", line_path, line_code)
+    classes_dir = os.path.join(session.module_dir, "target", "classes")
+    assert f"sudo rm -rf {classes_dir} " in command and "useIncrementalCompilation" not in command
+    # The clean plugin is not needed, so the run stays offline
+    assert " -o " in command and " clean " not in command
+    session.record_run(line_path, line_code, "Tests run: 1, Failures: 0, Errors: 0, Skipped: 0")
+    command = session.fetch_test_command("LineTest", line_path, line_code)
+    assert "rm -rf" not in command and "-Dmaven.compiler.useIncrementalCompilation=false" in command
@@ -0,0 +1,44 @@
+from repoclassbench.benchmarks import perf_suite
+
+
+def test_run_case_reports_skips_and_timings():
+    calls = []
+    case = perf_suite.BenchmarkCase("python.tools.x", "python", "tools", lambda: calls.append(1), repeat=3, warmup=1)
+    result = perf_suite.run_case(case)
+    assert result["status"] == "ok" and len(calls) == 4
+    assert len(result["samples_sec"]) == 3 and result["min_sec"] <= result["median_sec"]
+
+    def _missing():
+        raise perf_suite.SkipCase("no dataset")
+
+    result = perf_suite.run_case(perf_suite.BenchmarkCase("java.0.dataset_setup", "java", "dataset_setup", _missing))
+    assert result["status"] == "skipped" and "median_sec" not in result
+
+
+def test_compare_to_baseline_thresholds():
+    baseline = {
+        "results": [
+            {"name": "slow", "median_sec": 10.0},
+            {"name": "fast", "median_sec": 0.01},
+            {"name": "steady", "median_sec": 2.0},
+            {"name": "skipped_now"},
+            {"name": "broken_now", "median_sec": 1.0},
+        ]
+    }
+    results = [
+        {"name": "slow", "median_sec": 13.0},
+        # 3x slower, but below the absolute noise floor
+        {"name": "fast", "median_sec": 0.03},
+        {"name": "steady", "median_sec": 2.1},
+        {"name": "skipped_now", "status": "skipped"},
+        {"name": "broken_now", "status": "error", "error": "Traceback"},
+        {"name": "new_case", "median_sec": 1.0},
+    ]
+    comparison = {x["name"]: x for x in perf_suite.compare_to_baseline(results, baseline, threshold=0.25)}
+    assert sorted(comparison) == ["broken_now", "fast", "slow", "steady"]
+    assert comparison["slow"]["regressed"]
+    # A case which fails outright regresses
+    assert comparison["broken_now"]["regressed"] and comparison["broken_now"]["current_sec"] is None
+    assert not comparison["fast"]["regressed"]
+    assert not comparison["steady"]["regressed"]
+    assert "REGRESSED" in perf_suite.format_comparison(list(comparison.values()))
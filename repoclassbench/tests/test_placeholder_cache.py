@@ -0,0 +1,20 @@
+from project_utils.constants import PythonConstants
+from repoclassbench.dataset.python_setup_utils import python_repo_initializer
+
+
+def test_placeholder_file_cache_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(PythonConstants, "DIR_FOR_PLACEHOLDER_FILE_CACHE", str(tmp_path))
+    monkeypatch.setattr(python_repo_initializer, "_PLACEHOLDER_FILE_CACHE", {})
+
+    key = python_repo_initializer.fetch_placeholder_cache_key("task-1", "class A: pass\n", True)
+    assert key != python_repo_initializer.fetch_placeholder_cache_key("task-1", "class A: pass\n", False)
+    assert key != python_repo_initializer.fetch_placeholder_cache_key("task-1", "class B: pass\n", True)
+    assert python_repo_initializer.load_placeholder_file(key) is None
+
+    python_repo_initializer.store_placeholder_file(key, "# <MSR CLASS PLACEHOLDER>\n", False)
+    assert python_repo_initializer.load_placeholder_file(key)["content"] == "# <MSR CLASS PLACEHOLDER>\n"
+
+    # A new process only has the disk cache
+    monkeypatch.setattr(python_repo_initializer, "_PLACEHOLDER_FILE_CACHE", {})
+    cached = python_repo_initializer.load_placeholder_file(key)
+    assert cached == {"content": "# <MSR CLASS PLACEHOLDER>\n", "gt_has_linter_error": False}
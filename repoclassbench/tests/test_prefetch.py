@@ -0,0 +1,43 @@
+import threading
+import time
+
+from repoclassbench.dataset.prefetch import PrefetchingIterator
+
+
+class FakeDataset:
+    """Records which tasks were being set up while another task of the same workspace was held."""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.held = set()
+        self.conflicts = []
+        self.setup_threads = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def workspace_key(self, i):
+        return self.keys[i]
+
+    def get_instance_and_setup_env(self, i):
+        if self.keys[i] in self.held:
+            self.conflicts.append(i)
+        self.setup_threads[i] = threading.current_thread().name
+        time.sleep(0.01)
+        return f"task-{i}"
+
+
+def test_prefetch_order_and_isolation():
+    dataset = FakeDataset(["a", "a", "b", "c", "b"])
+    seen = []
+    with PrefetchingIterator(dataset, lookahead=2, max_workers=2) as tasks:
+        for i, task in tasks:
+            dataset.held = {dataset.keys[i]}
+            seen.append((i, task))
+            time.sleep(0.05)
+            dataset.held = set()
+    assert seen == [(i, f"task-{i}") for i in range(5)]
+    assert dataset.conflicts == []
+    # The first task, and the task sharing the workspace of the one before it, are set up on request
+    assert tasks.stats["synchronous"] == 2 and tasks.stats["prefetched"] == 3
+    assert any(name.startswith("rcb-prefetch") for name in dataset.setup_threads.values())
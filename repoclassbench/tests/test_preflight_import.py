@@ -0,0 +1,59 @@
+import json
+import subprocess
+import sys
+
+from repoclassbench.evaluator import python_evaluator
+
+
+def _preflight(repo_dir, module_name, file_path, start_line, end_line):
+    result = subprocess.run(
+        [
+            sys.executable, "-c", python_evaluator.PREFLIGHT_IMPORT_SCRIPT,
+            module_name, file_path, str(start_line), str(end_line),
+        ],
+        cwd=repo_dir,
+        capture_output=True,
+        text=True,
+    )
+    line = [x for x in result.stdout.split("\n") if x.startswith(python_evaluator.PREFLIGHT_MARKER)][-1]
+    return json.loads(line[len(python_evaluator.PREFLIGHT_MARKER) :])
+
+
+def test_preflight_import_blames_only_the_generated_class(tmp_path):
+    pkg_dir = tmp_path / "pkg"
+    pkg_dir.mkdir()
+    (pkg_dir / "__init__.py").write_text("")
+    (pkg_dir / "ok.py").write_text("class A:\n    pass\n")
+    (pkg_dir / "broken.py").write_text("import os\n\nclass A:\n    x = undefined_name\n")
+    (pkg_dir / "syntax.py").write_text("import os\n\nclass A:\n    def f(self:\n        pass\n")
+    (pkg_dir / "optional.py").write_text("import missing_optional_dependency\n\nclass A:\n    pass\n")
+
+    assert _preflight(str(tmp_path), "pkg.ok", str(pkg_dir / "ok.py"), 1, 2)["ok"]
+
+    ans = _preflight(str(tmp_path), "pkg.broken", str(pkg_dir / "broken.py"), 3, 4)
+    assert not ans["ok"] and ans["in_generated_class"]
+    assert "NameError" in ans["traceback"]
+
+    ans = _preflight(str(tmp_path), "pkg.syntax", str(pkg_dir / "syntax.py"), 3, 5)
+    assert not ans["ok"] and ans["in_generated_class"]
+
+    # The failure is raised by an import statement of the file, outside of the generated class
+    ans = _preflight(str(tmp_path), "pkg.optional", str(pkg_dir / "optional.py"), 3, 4)
+    assert not ans["ok"] and not ans["in_generated_class"]
+
+    # A broken package `__init__` is not blamed on the generated class
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    (other_dir / "__init__.py").write_text("raise RuntimeError('environment issue')\n")
+    (other_dir / "mod.py").write_text("class A:\n    pass\n")
+    ans = _preflight(str(tmp_path), "other.mod", str(other_dir / "mod.py"), 1, 2)
+    assert not ans["ok"] and not ans["in_generated_class"]
+
+
+def test_class_lines():
+    evaluator = python_evaluator.PythonEvaluator.__new__(python_evaluator.PythonEvaluator)
+    contents, lines = evaluator.fetch_file_with_class(
+        "import os\n\n# <MSR CLASS PLACEHOLDER>\n\nx = 1\n", "class A:\n    pass"
+    )
+    assert contents.split("\n")[2:4] == ["class A:", "    pass"]
+    assert lines == (3, 4)
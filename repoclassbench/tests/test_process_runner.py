@@ -0,0 +1,104 @@
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+from project_utils import process_runner
+
+
+def test_exit_status_output_and_rusage():
+    result = process_runner.run_process(
+        "echo out; echo err >&2; python -c 'x = bytearray(50 * 1024 * 1024)'; exit 3", shell=True
+    )
+    assert result.exit_status == 3
+    assert result.stdout == "out\n"
+    assert result.stderr == "err\n"
+    assert not result.timed_out
+    assert result.max_rss_kb > 50 * 1024
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        result.check()
+    assert exc_info.value.output == "out\n"
+
+
+def test_timeout_kills_the_process_group(tmp_path):
+    pid_file = tmp_path / "child.pid"
+    start_time = time.monotonic()
+    result = process_runner.run_process(
+        f"sleep 60 & echo $! > {pid_file}; wait", shell=True, timeout=0.5, kill_grace_sec=1
+    )
+    assert result.timed_out
+    assert result.exit_status != 0
+    assert time.monotonic() - start_time < 10
+    # The grandchild has been killed along with the shell (it is gone, or a zombie left to init)
+    stat_path = f"/proc/{int(pid_file.read_text())}/stat"
+    time.sleep(0.2)
+    if os.path.exists(stat_path):
+        with open(stat_path) as f:
+            assert f.read().rsplit(")", 1)[1].split()[0] == "Z"
+
+
+def test_cancellation():
+    cancel_event = threading.Event()
+    threading.Timer(0.3, cancel_event.set).start()
+    result = process_runner.run_process(["sleep", "60"], cancel_event=cancel_event, kill_grace_sec=1)
+    assert result.cancelled and not result.timed_out
+
+
+def test_output_is_streamed_and_bounded(tmp_path):
+    chunks = []
+    result = process_runner.run_process(
+        ["python", "-c", "import sys; [print(f'line {i}') for i in range(10000)]"],
+        merge_stderr=True,
+        on_stdout=chunks.append,
+        max_output_bytes=1000,
+        spill_dir=str(tmp_path),
+        keep_spill=True,
+    )
+    full_output = "".join(f"line {i}\n" for i in range(10000))
+    assert "".join(chunks) == full_output
+    assert result.stdout_truncated
+    assert len(result.stdout) == 1000
+    assert full_output.endswith(result.stdout)
+    with open(result.stdout_spill_path) as f:
+        assert f.read() == full_output
+
+
+def test_concurrency_limit():
+    process_runner.set_concurrency_limit("test-group", 1)
+    running = []
+    max_running = [0]
+    lock = threading.Lock()
+
+    def on_stdout(_):
+        with lock:
+            running.append(1)
+            max_running[0] = max(max_running[0], len(running))
+
+    def run():
+        process_runner.run_process(
+            "echo start; sleep 0.2", shell=True, on_stdout=on_stdout, concurrency_group="test-group"
+        )
+        with lock:
+            running.pop()
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max_running[0] == 1
+
+
+def test_spill_files_are_opt_in_and_expire(tmp_path):
+    command = ["python", "-c", "print('x' * 5000)"]
+    result = process_runner.run_process(command, max_output_bytes=1000, spill_dir=str(tmp_path))
+    assert result.stdout_truncated and result.stdout_spill_path is None
+    assert os.listdir(tmp_path) == []
+
+    old_path = tmp_path / "rcb_stdout_old.log"
+    old_path.write_text("x")
+    os.utime(old_path, (0, 0))
+    result = process_runner.run_process(command, max_output_bytes=1000, spill_dir=str(tmp_path), keep_spill=True)
+    assert os.listdir(tmp_path) == [os.path.basename(result.stdout_spill_path)]
@@ -0,0 +1,86 @@
+import json
+import os
+import stat
+
+import pytest
+
+from repoclassbench.dataset.python_setup_utils import provision_environments
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_collect_environment_specs(monkeypatch):
+    monkeypatch.setattr(provision_environments.environment_manager, "get_environment_name", lambda elem: elem["env"])
+    records = [{"env": "a", "id": 1}, {"env": "b", "id": 2}, {"env": "a", "id": 3}]
+    assert provision_environments.collect_environment_specs(records) == {
+        "a": {"env": "a", "id": 1},
+        "b": {"env": "b", "id": 2},
+    }
+
+
+def test_build_environments(monkeypatch):
+    def ensure_environment(elem, env_name):
+        if env_name == "broken":
+            raise RuntimeError("solver failed")
+        if env_name == "present":
+            return {"env_name": env_name, "action": "exists", "result": None}
+        return {"env_name": env_name, "action": "built", "result": {"exit_status": elem["exit_status"]}}
+
+    monkeypatch.setattr(provision_environments.environment_manager, "ensure_environment", ensure_environment)
+    results = provision_environments.build_environments(
+        {"present": {}, "built": {"exit_status": 0}, "failing": {"exit_status": 1}, "broken": {}}, max_workers=2
+    )
+    assert {k: (v["action"], v["exit_status"]) for k, v in results.items()} == {
+        "present": ("exists", 0),
+        "built": ("built", 0),
+        "failing": ("built", 1),
+        "broken": ("failed", None),
+    }
+
+
+@pytest.fixture
+def conda_prefix(tmp_path, monkeypatch):
+    conda_prefix = str(tmp_path / "conda")
+    monkeypatch.setattr(provision_environments.PythonConstants, "CONDA_PREFIX", conda_prefix)
+    monkeypatch.setattr(provision_environments, "_conda_pack_executable", lambda: None)
+    _write(os.path.join(conda_prefix, "envs", "rcb_env", "lib", "site.py"), "print('hello')\n")
+    return conda_prefix
+
+
+def test_export_import_round_trip(tmp_path, conda_prefix):
+    packs_dir = str(tmp_path / "packs")
+    env_dir = os.path.join(conda_prefix, "envs", "rcb_env")
+    pack_path = provision_environments.export_environment("rcb_env", packs_dir)
+    assert os.path.exists(pack_path)
+    with open(os.path.join(packs_dir, "rcb_env.json")) as f:
+        assert json.load(f)["method"] == "tarball"
+
+    # Not restored over an existing environment
+    assert not provision_environments.import_environment("rcb_env", packs_dir)
+    os.rename(env_dir, env_dir + ".old")
+    assert provision_environments.import_environment("rcb_env", packs_dir)
+    with open(os.path.join(env_dir, "lib", "site.py")) as f:
+        assert f.read() == "print('hello')\n"
+
+
+def test_failed_unpack_removes_the_environment(tmp_path, conda_prefix):
+    packs_dir = str(tmp_path / "packs")
+    env_dir = os.path.join(conda_prefix, "envs", "rcb_env")
+    conda_unpack = os.path.join(env_dir, "bin", "conda-unpack")
+    _write(conda_unpack, "#!/bin/sh\nexit 1\n")
+    os.chmod(conda_unpack, os.stat(conda_unpack).st_mode | stat.S_IEXEC)
+    provision_environments.export_environment("rcb_env", packs_dir)
+    metadata_path = os.path.join(packs_dir, "rcb_env.json")
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    with open(metadata_path, "w") as f:
+        json.dump({**metadata, "method": "conda-pack"}, f)
+
+    os.rename(env_dir, env_dir + ".old")
+    with pytest.raises(Exception):
+        provision_environments.import_environment("rcb_env", packs_dir)
+    assert not os.path.exists(env_dir)
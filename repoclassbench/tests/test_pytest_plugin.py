@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+from repoclassbench.evaluator.python_evaluator_utils import evaluator_utils
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_streamed_outcomes_of_selected_node_ids(tmp_path):
+    repo_dir = str(tmp_path / "repo")
+    _write(
+        os.path.join(repo_dir, "tests/test_a.py"),
+        "import pytest\n\n"
+        "def test_pass():\n    pass\n\n"
+        "def test_fail():\n    assert 1 == 2\n\n"
+        "def test_not_expected():\n    assert False\n\n"
+        "@pytest.fixture\ndef broken():\n    raise RuntimeError('setup')\n\n"
+        "def test_error(broken):\n    pass\n",
+    )
+    _write(os.path.join(repo_dir, "tests/test_b.py"), "import missing_module\n")
+
+    expected = [
+        "tests/test_a.py::test_pass",
+        "tests/test_a.py::test_fail",
+        "tests/test_a.py::test_error",
+        "tests/test_b.py::test_x",
+    ]
+    outcomes_path = str(tmp_path / "outcomes.jsonl")
+    select_path = str(tmp_path / "select.txt")
+    with open(select_path, "w") as f:
+        f.write("\n".join(expected) + "\n")
+
+    subprocess.run(
+        [sys.executable, "-m", "pytest", "-p", "no:cacheprovider"]
+        + evaluator_utils.get_test_modules(expected)
+        + evaluator_utils.fetch_pytest_plugin_args(outcomes_path, select_path).split()
+        + ["--continue-on-collection-errors"],
+        cwd=repo_dir,
+        env={**os.environ, "PYTHONPATH": evaluator_utils.PYTEST_PLUGIN_DIR},
+        capture_output=True,
+    )
+
+    report = evaluator_utils.load_streamed_report(outcomes_path)
+    parsed = evaluator_utils.PytestResults(report)
+    assert parsed.test_bifurcation["passed"] == ["tests/test_a.py::test_pass"]
+    assert parsed.test_bifurcation["failed"] == ["tests/test_a.py::test_fail"]
+    assert parsed.test_bifurcation["error"] == ["tests/test_a.py::test_error"]
+    assert "tests/test_a.py::test_not_expected" not in parsed.test_to_details_mapping
+    assert "assert 1 == 2" in parsed.test_to_details_mapping["tests/test_a.py::test_fail"]["call"]["longrepr"]
+    assert [x["nodeid"] for x in report["collectors"] if x["outcome"] == "failed"] == [
+        "tests/test_b.py"
+    ]
+    assert parsed.summary["collected"] == 3
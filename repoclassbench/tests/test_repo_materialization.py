@@ -0,0 +1,90 @@
+import os
+import subprocess
+
+from project_utils.repo_materialization import materialize_repo, overlay_tree
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def _read(path):
+    with open(path, "r") as f:
+        return f.read()
+
+
+def test_fresh_copy_and_sync(tmp_path):
+    """A fresh copy is complete, and a later sync only touches what differs."""
+    source_dir = str(tmp_path / "original")
+    target_dir = str(tmp_path / "working")
+    _write(os.path.join(source_dir, "pkg/a.py"), "a = 1\n")
+    _write(os.path.join(source_dir, "pkg/b.py"), "b = 2\n")
+    os.symlink("a.py", os.path.join(source_dir, "pkg/link.py"))
+
+    stats = materialize_repo(source_dir, target_dir)
+    assert stats["strategy"] in ["reflink", "copy"]
+    assert _read(os.path.join(target_dir, "pkg/a.py")) == "a = 1\n"
+    assert os.readlink(os.path.join(target_dir, "pkg/link.py")) == "a.py"
+
+    # Modify the working copy the way a task would
+    _write(os.path.join(target_dir, "pkg/a.py"), "")
+    _write(os.path.join(target_dir, "pkg/extra/c.py"), "c = 3\n")
+
+    stats = materialize_repo(source_dir, target_dir)
+    assert stats["strategy"] == "sync"
+    assert stats["copied_files"] == 1
+    assert stats["removed_paths"] == 1
+    assert _read(os.path.join(target_dir, "pkg/a.py")) == "a = 1\n"
+    assert not os.path.exists(os.path.join(target_dir, "pkg/extra"))
+
+    # Nothing left to do
+    stats = materialize_repo(source_dir, target_dir)
+    assert stats["copied_files"] == 0 and stats["removed_paths"] == 0
+
+
+def test_hardlink_and_worktree(tmp_path):
+    source_dir = str(tmp_path / "original")
+    _write(os.path.join(source_dir, "a.txt"), "hello\n")
+    subprocess.run(["git", "init", "-q", source_dir], check=True)
+    subprocess.run(["git", "-C", source_dir, "add", "."], check=True)
+    subprocess.run(
+        ["git", "-C", source_dir, "-c", "user.name=t", "-c", "user.email=t@t",
+         "commit", "-q", "-m", "init"],
+        check=True,
+    )
+
+    link_dir = str(tmp_path / "linked")
+    stats = materialize_repo(source_dir, link_dir, strategy="hardlink")
+    assert stats["linked_files"] > 0
+    assert os.stat(os.path.join(link_dir, "a.txt")).st_ino == os.stat(
+        os.path.join(source_dir, "a.txt")
+    ).st_ino
+
+    worktree_dir = str(tmp_path / "worktree")
+    stats = materialize_repo(source_dir, worktree_dir, strategy="worktree")
+    assert stats["strategy"] == "worktree"
+    assert _read(os.path.join(worktree_dir, "a.txt")) == "hello\n"
+
+
+def test_overlay_links_missing_files_only(tmp_path):
+    source_dir = str(tmp_path / "shared")
+    target_dir = str(tmp_path / "overlay")
+    _write(os.path.join(source_dir, "g/a.jar"), "jar")
+    _write(os.path.join(source_dir, "g/_remote.repositories"), "tracking")
+    _write(os.path.join(target_dir, "g/b.jar"), "downloaded by the overlay")
+
+    stats = overlay_tree(source_dir, target_dir, copy_if=lambda name: name.endswith(".repositories"))
+    assert stats["linked_files"] == 1 and stats["copied_files"] == 1
+    assert os.path.samefile(os.path.join(source_dir, "g/a.jar"), os.path.join(target_dir, "g/a.jar"))
+    assert not os.path.samefile(
+        os.path.join(source_dir, "g/_remote.repositories"), os.path.join(target_dir, "g/_remote.repositories")
+    )
+    # Rewriting the copied files leaves the shared directory untouched
+    _write(os.path.join(target_dir, "g/_remote.repositories"), "rewritten")
+    assert _read(os.path.join(source_dir, "g/_remote.repositories")) == "tracking"
+    assert _read(os.path.join(target_dir, "g/b.jar")) == "downloaded by the overlay"
+
+    stats = overlay_tree(source_dir, target_dir)
+    assert stats["linked_files"] == 0 and stats["copied_files"] == 0
@@ -0,0 +1,94 @@
+import json
+import os
+import time
+
+from repoclassbench import runner
+
+
+class _FakeDataset:
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def workspace_key(self, i):
+        return self.keys[i]
+
+
+def test_groups_are_sharded_by_workspace_key():
+    dataset = _FakeDataset(["repo_a", "repo_b", "repo_a", "repo_c", "repo_b"])
+    groups = runner.group_tasks(dataset)
+    assert groups == {"repo_a": [0, 2], "repo_b": [1, 4], "repo_c": [3]}
+    shards = {key: runner.shard_of(key, 4) for key in groups}
+    assert shards == {key: runner.shard_of(key, 4) for key in groups}
+    assert all(0 <= x < 4 for x in shards.values())
+
+
+def test_results_survive_crashes_and_retries(tmp_path):
+    run_dir = str(tmp_path)
+    with runner.CheckpointWriter(os.path.join(run_dir, "shard-n0-w0.jsonl")) as writer:
+        writer.write({"task_index": 0, "error": None, "evaluation": {"test_status": True}})
+        writer.write({"task_index": 1, "error": "Traceback", "evaluation": None})
+    with runner.CheckpointWriter(os.path.join(run_dir, "shard-n1-w0.jsonl")) as writer:
+        writer.write({"task_index": 1, "error": None, "evaluation": {"test_status": False}})
+        writer.write({"task_index": 0, "error": "Traceback", "evaluation": None})
+    # A line cut short by a crash
+    with open(os.path.join(run_dir, "shard-n1-w0.jsonl"), "a") as f:
+        f.write(json.dumps({"task_index": 2, "error": None})[:10])
+
+    results = runner.read_results(run_dir)
+    assert sorted(results) == [0, 1]
+    assert results[0]["evaluation"]["test_status"] is True
+    assert results[1]["evaluation"]["test_status"] is False
+    assert runner.fetch_completed_indices(run_dir) == {0, 1}
+
+
+def test_work_queue_claims(tmp_path):
+    queue = runner.WorkQueue(str(tmp_path), stale_after_sec=3600)
+    assert queue.claim("repo_a", "node1-w0")
+    assert not queue.claim("repo_a", "node2-w0")
+    queue.finish("repo_a")
+    assert not queue.claim("repo_a", "node2-w0")
+
+    assert queue.claim("repo_b", "node1-w0")
+    # The restarted worker re-takes its own claim at once
+    assert queue.claim("repo_b", "node1-w0")
+    # The claim of a crashed worker is taken over once stale
+    stale_queue = runner.WorkQueue(str(tmp_path), stale_after_sec=0)
+    assert stale_queue.claim("repo_b", "node2-w0")
+
+
+def test_claims_are_kept_fresh_while_held(tmp_path):
+    queue = runner.WorkQueue(str(tmp_path), stale_after_sec=0.5, heartbeat_sec=0.05)
+    assert queue.claim("repo_a", "node1-w0")
+    with queue.holding("repo_a"):
+        time.sleep(1)
+        assert not queue.claim("repo_a", "node2-w0")
+    time.sleep(1)
+    assert queue.claim("repo_a", "node2-w0")
+
+
+def test_tasks_are_set_up_in_the_worker_sandbox():
+    class _Evaluator:
+        def evaluate(self, code):
+            return _Evaluation()
+
+    class _Evaluation:
+        def dict(self):
+            return {"test_status": True}
+
+    class _Task:
+        evaluator = _Evaluator()
+
+    class _SetupDataset(_FakeDataset):
+        data = [{"task_id": "t0"}]
+
+        def get_instance_and_setup_env(self, i, sandbox=None):
+            self.sandbox = sandbox
+            return _Task()
+
+    dataset = _SetupDataset(["repo_a"])
+    record = runner.evaluate_task(dataset, 0, lambda task: "class A {}", sandbox="worker-sandbox")
+    assert record["error"] is None and record["evaluation"] == {"test_status": True}
+    assert dataset.sandbox == "worker-sandbox"
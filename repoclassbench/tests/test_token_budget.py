@@ -0,0 +1,31 @@
+import pytest
+
+from project_utils import common_utils as utils
+
+
+@pytest.fixture(autouse=True)
+def _require_encoder():
+    try:
+        utils.get_token_encoder()
+    except Exception as E:
+        pytest.skip(f"tiktoken encoding is not available: {E}")
+
+
+def test_token_budget_builder_truncates_at_fragment_boundaries():
+    fragments = [f"<Feedback for test case `test_{i}`>\nassert {i} == 0\n</End>\n" for i in range(50)]
+    fragment_tokens = utils.estimate_token_cnt(fragments[0])
+    max_tokens = 3 * fragment_tokens + fragment_tokens // 2
+
+    builder = utils.TokenBudgetBuilder(max_tokens)
+    added = [builder.add(x) for x in fragments]
+    assert added[:3] == [True, True, True] and not any(added[3:])
+    assert builder.dropped_fragments == 47
+    assert builder.token_cnt == max_tokens
+
+    feedback_str = builder.build()
+    assert feedback_str.startswith("".join(fragments[:3]))
+
+    builder = utils.TokenBudgetBuilder(max_tokens, truncate_overflow=False)
+    for x in fragments:
+        builder.add(x)
+    assert builder.build() == "".join(fragments[:3])
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+from project_utils import tracing
+
+
+def test_spans_nest_per_task_and_per_asyncio_task(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "_enabled", True)
+    tracing.reset()
+
+    @tracing.traced(category="tools")
+    async def lookup(delay):
+        await asyncio.sleep(delay)
+        with tracing.span("inner", "tools"):
+            pass
+
+    async def run_lookups():
+        with tracing.span("outer", "tools"):
+            await asyncio.gather(lookup(0.01), lookup(0.0))
+
+    with tracing.trace_task("python-7", trace_dir=str(tmp_path)) as trace_path:
+        asyncio.run(run_lookups())
+
+    with open(trace_path, "r") as f:
+        events = {e["args"]["span_id"]: e for e in json.load(f)["traceEvents"]}
+    by_name = {}
+    for event in events.values():
+        by_name.setdefault(event["name"], []).append(event)
+    assert len(by_name["python-7"]) == 1 and len(by_name["outer"]) == 1
+    outer_id = by_name["outer"][0]["args"]["span_id"]
+    lookup_name = [x for x in by_name if x.endswith("lookup")][0]
+    assert {e["args"]["parent_id"] for e in by_name[lookup_name]} == {outer_id}
+    # Every `inner` span is nested in its own `lookup` span
+    lookup_ids = {e["args"]["span_id"] for e in by_name[lookup_name]}
+    assert {e["args"]["parent_id"] for e in by_name["inner"]} == lookup_ids
+
+    summary = {row["name"]: row for row in tracing.fetch_summary()}
+    assert summary["inner"]["count"] == 2
+    assert "inner" in tracing.format_summary()
+    tracing.reset()
+
+
+def test_disabled_tracing_is_a_noop(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "_enabled", False)
+    tracing.reset()
+    with tracing.trace_task("java-1", trace_dir=str(tmp_path)) as trace_path:
+        with tracing.span("outer") as span:
+            span.set(exit_status=0)
+    assert trace_path is None
+    assert tracing.fetch_summary() == []
+
@@ -2,10 +2,24 @@
 
 from abc import ABC, abstractmethod
 
+from project_utils import tracing
+
 
 class BaseTools(ABC):
     """Base class for tools"""
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every call of a tool is traced (see `project_utils/tracing.py`)
+        for method_name in BaseTools.__abstractmethods__:
+            method = cls.__dict__.get(method_name)
+            if callable(method):
+                setattr(
+                    cls,
+                    method_name,
+                    tracing.traced(name=f"{cls.__name__}.{method_name}", category="tools")(method),
+                )
+
     @abstractmethod
     def get_imports(self, file_content: str) -> str:
         """Returns the suggested imports given the file content"""
@@ -8,6 +8,7 @@ import pickle
 import torch
 import torch.nn as nn
 from transformers import RobertaTokenizer, RobertaModel, RobertaConfig
+from project_utils import tracing
 
 BATCH_SIZE = 8
 
@@ -145,6 +146,7 @@ class UniXcoder(nn.Module):
 
         return preds
 
+    @tracing.traced(category="embedding")
     def get_embeddings_from_snippet(self, snippet):
         token_ids = self.tokenize(snippet,padding=True)
         source_ids = torch.tensor(token_ids).cuda()
@@ -180,6 +182,7 @@ class UniXcoder(nn.Module):
         return pickle.dump(values,open(file_path,"wb"))
 
 
+    @tracing.traced(category="embedding")
     def get_score(self, snippet1, snippet2, use_cache=False):
         with torch.no_grad():
             e1=self.get_embeddings_from_snippet([snippet1])
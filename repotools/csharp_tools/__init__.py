@@ -18,6 +18,7 @@ from .Scorer.unixcoder import UniXcoder
 # csharp_setup_utils module also handles essential env-var setup
 from project_utils.csharp_setup_utils import setup_dotnet, setup_multilspy
 from .fqcn import FQCNKind
+from repotools.base_tools import BaseTools
 
 def find_free_port() -> int:
     """Function to find a free port starting from start_port."""
@@ -28,7 +29,7 @@ def find_free_port() -> int:
     return port
 
 
-class CSharpTools:
+class CSharpTools(BaseTools):
 
     server_proc: Optional[subprocess.Popen] = None
     auto_shutdown_server = True
@@ -19,6 +19,64 @@ from .OLSPlibs.lsp.types import (
 
 from typing import List, Tuple, Union, Any
 
+from project_utils import tracing
+from project_utils.constants import JavaConstants
+
+
+def fetch_full_range(text: str) -> dict:
+    """The LSP range spanning all of `text` (whose characters are counted in UTF-16 code units)."""
+    last_line = text.rsplit("\n", 1)[-1]
+    return {
+        "start": {"line": 0, "character": 0},
+        "end": {"line": text.count("\n"), "character": len(last_line.encode("utf-16-le")) // 2},
+    }
+
+
+class ScratchpadDocument:
+    """A scratch file of the repository, open in the server, which completion probes are written to."""
+
+    def __init__(self, server: LanguageServer, path: str):
+        self.server = server
+        self.path = path
+        self.text = ""
+        self.version = 0
+
+    def open(self):
+        with open(self.path, "w") as f:
+            f.write("")
+        self.server.notify.did_open_text_document(
+            {
+                "textDocument": {
+                    "version": self.version,
+                    "languageId": "java",
+                    "text": self.text,
+                    "uri": pathlib.Path(self.path).as_uri(),
+                }
+            }
+        )
+
+    def replace_text(self, text):
+        self.version += 1
+        self.server.notify.did_change_text_document(
+            {
+                "textDocument": {
+                    "version": self.version,
+                    "uri": pathlib.Path(self.path).as_uri(),
+                },
+                "contentChanges": [{"range": fetch_full_range(self.text), "text": text}],
+            }
+        )
+        self.text = text
+
+    def close(self):
+        self.server.notify.did_close_text_document(
+            {"textDocument": {"uri": pathlib.Path(self.path).as_uri()}}
+        )
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
 
 class EclipseJDTLS:
 
@@ -70,7 +128,9 @@ class EclipseJDTLS:
 
         return d
 
-    def initialize_scratchpad_file(self, scratchpad_file_path: str):
+    def initialize_scratchpad_file(
+        self, scratchpad_file_path: str, num_probe_documents: int = JavaConstants.JDTLS_PROBE_DOCUMENTS
+    ):
         self.scratchpad_file_path = scratchpad_file_path
         self.current_text = ""
         self.file_change_id = 0
@@ -86,8 +146,41 @@ class EclipseJDTLS:
                 }
             }
         )
+        # The completion probes of the tools are written to documents next to the scratchpad file (same
+        # package and classpath), so that independent probes can run concurrently (see `probe_completions`)
+        root, extension = os.path.splitext(scratchpad_file_path)
+        self.probe_documents = [
+            ScratchpadDocument(self.server, f"{root}__probe{i}{extension}") for i in range(num_probe_documents)
+        ]
+        for document in self.probe_documents:
+            document.open()
+        self._free_probe_documents = None
+
+    def close_scratchpad_file(self):
+        """Closes the scratchpad file, so that the server can serve another one (see `server_pool`)."""
+        if getattr(self, "scratchpad_file_path", None) is None:
+            return
+        self.server.notify.did_close_text_document(
+            {"textDocument": {"uri": pathlib.Path(self.scratchpad_file_path).as_uri()}}
+        )
+        for document in self.probe_documents:
+            document.close()
+        self.probe_documents = []
+        self.scratchpad_file_path = None
+
+    def notify_watched_files_changed(self, changes: List[Tuple[str, int]]):
+        """Notifies the server of files changed on disk: (absolute path, 1 created / 2 changed / 3 deleted) pairs."""
+        if not changes:
+            return
+        self.server.notify.did_change_watched_files(
+            {"changes": [{"uri": pathlib.Path(path).as_uri(), "type": change_type} for path, change_type in changes]}
+        )
 
-    def __init__(self, repository_root_path: str, ws_dir: str, dep_folder_path: str):
+    def is_service_ready(self) -> bool:
+        """Whether the server reported ServiceReady, ie. imported the project (it may be used before, see `server_pool`)."""
+        return self.service_ready_event.is_set()
+
+    def __init__(self, repository_root_path: str, ws_dir: str, dep_folder_path: str, clear_persisted_state: bool = True):
         self.dep_folder_path = dep_folder_path
                 
 
@@ -103,7 +196,7 @@ class EclipseJDTLS:
         )
         # if os.path.exists(os.path.abspath("temp/java/working_repo/.cache")):
         #     shutil.rmtree(os.path.abspath("temp/java/working_repo/.cache"))
-        shared_cache_location = os.path.abspath("temp/java/working_repo/.cache/.jdt/index")
+        shared_cache_location = os.path.abspath(JavaConstants.JDTLS_SHARED_INDEX_DIR)
         # jdtls_launcher_jar = os.path.join(
         #     self.dep_folder_path,
         #     "vscode-java/server/plugins/org.eclipse.equinox.launcher_1.6.400.v20210924-0641.jar",
@@ -113,8 +206,8 @@ class EclipseJDTLS:
             "repository/plugins/org.eclipse.equinox.launcher_1.6.900.v20240613-2009.jar",
         )
 
-        ## Delete the working repo
-        if os.path.exists(ws_dir):
+        ## Delete the workspace data of the previous server (unless the workspace is persisted for a reused server)
+        if clear_persisted_state and os.path.exists(ws_dir):
             shutil.rmtree(ws_dir)
 
         os.makedirs(ws_dir, exist_ok=True)
@@ -178,8 +271,8 @@ class EclipseJDTLS:
                 jdtls_config_path,
                 "-data",
                 data_dir,
-                "-clearPersistedState"
             ]
+            + (["-clearPersistedState"] if clear_persisted_state else [])
         )
 
         self.repository_root_path: str = repository_root_path
@@ -315,6 +408,7 @@ class EclipseJDTLS:
     async def on_log_message_async(self, x):
         self.on_log_message(x)
 
+    @tracing.traced(category="jdtls")
     async def complete(
         self,
         completion_params: CompletionParams,
@@ -403,6 +497,7 @@ class EclipseJDTLS:
         else:
             return legal_completions, all_method_signatures
 
+    @tracing.traced(category="jdtls")
     async def get_definition(self, l, c, file_path) -> Union[List, Tuple[List, Any]]:
         definitions_params: DefinitionParams = {
             "position": {"line": l, "character": c},
@@ -420,6 +515,7 @@ class EclipseJDTLS:
             return response
         return response
 
+    @tracing.traced(category="jdtls")
     async def get_signatures(self, l, c, file_path) -> Union[List, Tuple[List, Any]]:
         signature_params: SignatureHelpParams = {
             "position": {"line": l, "character": c},
@@ -437,6 +533,7 @@ class EclipseJDTLS:
             return response
         return response
 
+    @tracing.traced(category="jdtls")
     async def get_code_actions(
         self, file_path, range, diagnostics
     ) -> Union[List, Tuple[List, Any]]:
@@ -481,15 +578,7 @@ class EclipseJDTLS:
                     "version": self.file_change_id,
                     "uri": pathlib.Path(self.scratchpad_file_path).as_uri(),
                 },
-                "contentChanges": [
-                    {
-                        "range": {
-                            "start": {"line": 0, "character": 0},
-                            "end": {"line": 0, "character": len(self.current_text)},
-                        },
-                        "text": text,
-                    }
-                ],
+                "contentChanges": [{"range": fetch_full_range(self.current_text), "text": text}],
             }
         )
         self.current_text=text
@@ -498,18 +587,22 @@ class EclipseJDTLS:
 
 
 
+    @tracing.traced(category="jdtls")
     async def get_completions(
         self,
         file_path,
-        index=None
+        index=None,
+        text=None,
     ):
+        if text is None:
+            text = self.current_text
         if index is None:
-            index = len(self.current_text)
+            index = len(text)
         l = 0
         c = 0
         idx = 0
         while idx < index:
-            if self.current_text[idx] == "\n":
+            if text[idx] == "\n":
                 l += 1
                 c = 1
             else:
@@ -530,4 +623,30 @@ class EclipseJDTLS:
             return_empty_on_check_fail=False,
         )
 
-        return legal_completions1, signatures1, response1
\ No newline at end of file
+        return legal_completions1, signatures1, response1
+
+    @tracing.traced(category="jdtls")
+    async def probe_completions(self, texts: List[str]) -> List[tuple]:
+        """
+        Runs completion probes concurrently, each one in a free probe document.
+
+        Args:
+            texts (List[str]): The probes. The completions are requested before their last character.
+
+        Returns:
+            List[tuple]: The `get_completions` results, in the order of `texts`.
+        """
+        if self._free_probe_documents is None:
+            self._free_probe_documents = asyncio.Queue()
+            for document in self.probe_documents:
+                self._free_probe_documents.put_nowait(document)
+
+        async def probe(text):
+            document = await self._free_probe_documents.get()
+            try:
+                document.replace_text(text)
+                return await self.get_completions(document.path, index=len(text) - 1, text=text)
+            finally:
+                self._free_probe_documents.put_nowait(document)
+
+        return await asyncio.gather(*[probe(text) for text in texts])
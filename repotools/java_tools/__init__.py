@@ -1,23 +1,19 @@
 """Java class for tools"""
 
-import asyncio
 import os
-import threading
-import zipfile
-import gdown
+import weakref
+from project_utils import java_setup_utils
 from repotools.base_tools import BaseTools
-from repotools.java_tools.EclipseJDTLS import EclipseJDTLS
+from repotools.java_tools import server_pool
 from repotools.java_tools.class_info_tool import ClassInfoTool
 from repotools.java_tools.signature_tool import SignatureTool
 from repotools.java_tools.get_relevant_code import RelevantCodeTool
 from repotools.java_tools.import_tool import ImportTool
-from repotools.java_tools.tree_sitter_utils import get_tree
+from repotools.java_tools import symbol_index
 from repotools.java_tools.unixcoder import UniXcoder
 
 import torch
 
-from repotools.java_tools.utils import lsp_runner
-
 class JavaTools(BaseTools):
     """Java class for tools"""
 
@@ -25,32 +21,9 @@ class JavaTools(BaseTools):
         
         assert file_path is not None, "file_path cannot be None"
 
-        os.makedirs("external/java",exist_ok=True)
-
-        if not os.path.exists("external/java/jdk-17.0.6"):
-            if not os.path.exists("external/java/jdk-17.0.6.zip"):
-                data_url = "https://drive.google.com/uc?id=1HIJICJgQQvM_LzbSVRdBlQyiD_kY5BNc"
-                gdown.download(data_url, "external/java/jdk-17.0.6.zip", quiet=False)            
-            with zipfile.ZipFile("external/java/jdk-17.0.6.zip", "r") as zip_ref:
-                zip_ref.extractall("external/java")
-
-        if not os.path.exists("external/java/language-server-files"):
-            if not os.path.exists("external/java/language-server-files.zip"):
-                data_url = "https://drive.google.com/uc?id=1QS8cae9VqWoFrSA88ozty4gMhBRSNKC8"
-                gdown.download(data_url, "external/java/language-server-files.zip", quiet=False)
-
-            with zipfile.ZipFile("external/java/language-server-files.zip", "r") as zip_ref:
-                zip_ref.extractall("external/java")
-
-        ## Give permissions
-        for root, dirs, files in os.walk("external/java"):
-            for d in dirs:
-                os.chmod(
-                    os.path.join(root, d), 0o777
-                )  # Set permissions for directories
-            for f in files:
-                os.chmod(os.path.join(root, f), 0o777)  # Set permissions for files
-        
+        ## Extract the jdk and the language server (once; later constructions only check the install stamps)
+        java_setup_utils.ensure_installed(java_setup_utils.JDK, java_setup_utils.LANGUAGE_SERVER)
+
         self.abs_repo_root_dir = os.path.join(os.getcwd(),repo_root_dir)
         
         self.embedding_model = UniXcoder("microsoft/unixcoder-base")
@@ -58,16 +31,6 @@ class JavaTools(BaseTools):
         if torch.cuda.is_available():
             self.embedding_model.cuda()
 
-        self.running_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.running_loop)
-        asyncio_running_thread = threading.Thread(
-            target=self.running_loop.run_forever
-        )
-        
-        # Sets the thread as a daemon so that it will terminate when the main thread terminates
-        asyncio_running_thread.setDaemon(True)
-        asyncio_running_thread.start()
-        
         self.content=""#\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\n"
 
         # Add a scratchpad file to the repo
@@ -77,39 +40,20 @@ class JavaTools(BaseTools):
             "w", encoding="utf-8"
         ) as f:
             f.write(self.content)
+
+        # Build the snippet and class corpus of the repository (later queries only refresh the modified files)
+        self.get_relevant_code_object.corpus.refresh()
         
-        # Create language server object
-        self.language_server = EclipseJDTLS(
+        # Get a language server for the repository (kept alive between the tools of the repository)
+        self.server_pool = server_pool.fetch_pool()
+        self.pooled_server = self.server_pool.acquire(
             self.abs_repo_root_dir,
-            ws_dir=os.path.join(os.getcwd(),"temp/java/working_repo/ws_dir"),
             dep_folder_path=os.path.join(os.getcwd(),"external/java/language-server-files"),
         )
-
-
-        while True:
-            asyncio_tasks_list = []
-            servers_stopped_events = []
-            server_started = threading.Event()
-            exit_event = asyncio.Event()
-            server_stopped = threading.Event()
-            # Calling run_coroutine_threadsafe from main thread
-            asyncio_tasks_list.append(
-                ## LSP runner is a thread that runs the language server and send the exit singal when it ends
-                asyncio.run_coroutine_threadsafe(
-                    lsp_runner(self.language_server, server_started, exit_event, server_stopped),
-                    self.running_loop,
-                )
-            )
-            servers_stopped_events.append(server_stopped)
-
-            # Main thread waiting for server to start
-            try:
-                server_started.wait(timeout=10)
-            except Exception:
-                # Servers not started, retrying
-                continue
-            # Main thread woke after server started
-            break
+        self.language_server = self.pooled_server.language_server
+        self.running_loop = self.pooled_server.loop
+        # Give the server back to the pool once the tools are closed or garbage collected
+        self._release_server = weakref.finalize(self, self.server_pool.release, self.pooled_server)
 
         self.language_server.initialize_scratchpad_file(self.abs_file_path)
 
@@ -117,6 +61,10 @@ class JavaTools(BaseTools):
         self.class_info_tool=ClassInfoTool(self.language_server,self.abs_file_path,self.abs_repo_root_dir,self.running_loop)
         self.signature_tool=SignatureTool(self.language_server,self.abs_file_path,self.abs_repo_root_dir,self.running_loop)
 
+    def close(self) -> None:
+        """Gives the language server back to the pool"""
+        self._release_server()
+
     def get_imports(self, file_content: str) -> str:
         """Returns the suggested imports given the file content"""
         try:
@@ -135,15 +83,10 @@ class JavaTools(BaseTools):
 
     def get_method_body(self, class_name: str, method_name: str) -> str:
         """Returns the body of the method given the class name and method name"""
-        classes = get_tree(
-            self.abs_repo_root_dir,
-            [],
-        )
-        class_names=list(filter(lambda x:x.split(".")[-1]==class_name,list(classes.keys())))
-        if class_names==[]:
+        method_bodies = symbol_index.fetch_index(self.abs_repo_root_dir).get_method_bodies(class_name, method_name)
+        if method_bodies is None:
             return "Class not found in the repository"
-        required_definitions = "\n".join([a[:1000] for a in list(filter(lambda x:method_name+"(" in x,list(classes[class_names[0].strip()].values())))])
-        return required_definitions
+        return "\n".join([method_body[:1000] for method_body in method_bodies])
 
     def get_class_info(self, class_name: str, ranking_query_string: str = None) -> str:
         """Returns the class information given the class name"""
@@ -2,6 +2,7 @@ import asyncio
 import time
 import numpy as np
 from repotools.java_tools.EclipseJDTLS import EclipseJDTLS
+from repotools.java_tools.result_cache import ToolResultCache
 
 def create_batches(input_list, batch_size):
     batches = []
@@ -17,8 +18,15 @@ class ClassInfoTool:
         self.abs_file_path = abs_file_path
         self.abs_repo_root_dir = abs_repo_root_dir
         self.running_loop = running_loop
+        self.result_cache = ToolResultCache(abs_repo_root_dir, is_ready=language_server.is_service_ready)
         
-    def get_member(self,class_name, static=False, protected=False, abstract=False, abstract_control=False, member_name=""):
+    def run_probes(self, probes):
+        """Runs completion probes concurrently (see `EclipseJDTLS.probe_completions`)"""
+        return asyncio.run_coroutine_threadsafe(
+            self.language_server.probe_completions(probes), self.running_loop
+        ).result()
+
+    def fetch_member_probe(self, class_name, static=False, protected=False, abstract=False, abstract_control=False, member_name=""):
         if static:
             modified_class_name_or_object_name = "\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\n"+";\n" + class_name + "." + member_name
         elif protected:
@@ -29,21 +37,14 @@ class ClassInfoTool:
             modified_class_name_or_object_name = "public class a{\n" + member_name
         else:
             modified_class_name_or_object_name = "\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\n" + class_name + " a;\na." + member_name
+        return modified_class_name_or_object_name
 
-        self.language_server.replace_text_in_scratchpad(modified_class_name_or_object_name)
-        (
-            completions,
-            signatures,
-            response,
-        ) = asyncio.run_coroutine_threadsafe(
-            self.language_server.get_completions(
-                self.abs_file_path,
-                index=len(self.language_server.current_text)-1
-            ),self.running_loop
-        ).result()
+    def get_member(self,class_name, static=False, protected=False, abstract=False, abstract_control=False, member_name=""):
+        probe = self.fetch_member_probe(class_name, static, protected, abstract, abstract_control, member_name)
+        completions, signatures, response = self.run_probes([probe])[0]
+        return self.parse_member_completions(completions)
 
-        self.language_server.replace_text_in_scratchpad("")
-        
+    def parse_member_completions(self, completions):
         return_value = []
         for completion in completions:
             try:
@@ -73,8 +74,22 @@ class ClassInfoTool:
                 
         return return_value
 
+    def fetch_class_info_probes(self, class_or_object_name):
+        """The instance, static, protected, abstract and abstract control probes of `get_class_info`"""
+        return [
+            self.fetch_member_probe(class_or_object_name),
+            self.fetch_member_probe(class_or_object_name, static=True),
+            self.fetch_member_probe(class_or_object_name, protected=True),
+            self.fetch_member_probe(class_or_object_name, abstract=True),
+            self.fetch_member_probe(class_or_object_name, abstract_control=True),
+        ]
+
     def get_class_info(self, class_or_object_name):
-        im = self.get_member(class_or_object_name, static=False)
+        results = self.run_probes(self.fetch_class_info_probes(class_or_object_name))
+        return self.fetch_class_info_from_results(results)
+
+    def fetch_class_info_from_results(self, results):
+        im, sm, pm, am, am_control = [self.parse_member_completions(completions) for completions, _, _ in results]
         default_list = [
             "equals(",
             "getClass(",
@@ -89,14 +104,12 @@ class ClassInfoTool:
             for member in im
             if all([v not in member for v in default_list])
         ]
-        sm = self.get_member(class_or_object_name, static=True)
         static_members = [
             member
             for member in sm
             if all([v not in member for v in default_list])
         ]
 
-        pm = self.get_member(class_or_object_name, protected=True)
         protected_members = [
             member
             for member in pm
@@ -105,8 +118,6 @@ class ClassInfoTool:
         
         
 
-        am = self.get_member(class_or_object_name, abstract=True)
-        am_control = self.get_member(class_or_object_name, abstract_control=True)            
         abstract_members = [member
             for member in am
             if (all([v not in member for v in default_list]) and all([v not in member for v in instance_members]) and (member not in am_control) and all([v not in member for v in protected_members]))
@@ -131,22 +142,12 @@ class ClassInfoTool:
         return static_members, list(reversed(instance_members))
  
  
-    def get_fqdns(self,class_name):
-        self.language_server.replace_text_in_scratchpad("\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\n"+ class_name)
-        (
-            completions,
-            signatures,
-            response,
-        ) = asyncio.run_coroutine_threadsafe(
-            self.language_server.get_completions(
-                self.abs_file_path,
-                index=len(self.language_server.current_text)-1
-            ),
-            self.running_loop,
-        ).result()
-        
-
-        self.language_server.replace_text_in_scratchpad("")
+    def get_fqdns(self,class_name,fingerprint=None):
+        fingerprint=fingerprint or self.result_cache.fetch_fingerprint()
+        cached_fqdns=self.result_cache.get(fingerprint,"fqdns",class_name)
+        if cached_fqdns is not None:
+            return cached_fqdns
+        completions, signatures, response = self.run_probes(["\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\n"+ class_name])[0]
 
         final_fqdns=[]
         for sig in signatures:
@@ -158,30 +159,39 @@ class ClassInfoTool:
                 else:
                     if sig["detail"].endswith("."+class_name) or sig["detail"]==class_name:
                         final_fqdns.append(sig["detail"])
-                    
-        return list(set(final_fqdns))
 
-    def get_constructor(self,class_name):
-        self.language_server.replace_text_in_scratchpad("\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\nnew " + class_name + "(")
-        (
-            completions,
-            signatures,
-            response,
-        ) = asyncio.run_coroutine_threadsafe(
-            self.language_server.get_completions(
-                self.abs_file_path,
-                index=len(self.language_server.current_text)-1
-            ),
-            self.running_loop,
-        ).result()
+        final_fqdns=list(set(final_fqdns))
+        self.result_cache.put(fingerprint,"fqdns",class_name,value=final_fqdns)
+        return final_fqdns
+
+    def fetch_constructor_probe(self,class_name):
+        return "\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\nnew " + class_name + "("
+
+    def fetch_constructor_from_result(self,class_name,result):
+        completions, signatures, response = result
         return [sig["detail"] for sig in signatures if (("detail" in sig) and (class_name.split(".")[-1]+"(" in sig["detail"]))]
 
+    def get_constructor(self,class_name):
+        result = self.run_probes([self.fetch_constructor_probe(class_name)])[0]
+        return self.fetch_constructor_from_result(class_name, result)
+
     def get_class_info_formatted(self, class_name, ranking_query_string=None,embedding_model=None):
-        fqdns=self.get_fqdns(class_name)
+        fingerprint=self.result_cache.fetch_fingerprint()
+        fqdns=self.get_fqdns(class_name,fingerprint)
+        # The raw (unranked) infos of the classes probed before are cached, the probes of the others run at once
+        raw_infos={fqdn:self.result_cache.get(fingerprint,"class_info",fqdn) for fqdn in fqdns}
+        uncached_fqdns=[fqdn for fqdn in fqdns if raw_infos[fqdn] is None]
+        probes=[]
+        for fqdn in uncached_fqdns:
+            probes+=[self.fetch_constructor_probe(fqdn)]+self.fetch_class_info_probes(fqdn)
+        results=self.run_probes(probes) if len(probes)>0 else []
+        for k,fqdn in enumerate(uncached_fqdns):
+            fqdn_results=results[6*k:6*k+6]
+            raw_infos[fqdn]=[self.fetch_constructor_from_result(fqdn, fqdn_results[0]), *self.fetch_class_info_from_results(fqdn_results[1:])]
+            self.result_cache.put(fingerprint,"class_info",fqdn,value=raw_infos[fqdn])
         class_infos=[]
         for fqdn in fqdns:
-            res_const = self.get_constructor(fqdn)                            
-            all_static_members, all_instance_members = self.get_class_info(fqdn)
+            res_const, all_static_members, all_instance_members = raw_infos[fqdn]
             static_scores=[]
             instance_scores=[]
             if ranking_query_string!=None:
@@ -1,41 +1,149 @@
 import os
-from repotools.java_tools.tree_sitter_utils import get_tree, get_classes_dict
+import threading
+from dataclasses import dataclass
+from typing import List
+
+from repotools.java_tools import symbol_index
+
+
+@dataclass(frozen=True)
+class CodeSnippet:
+    """A window of lines of a file of the repository."""
+
+    code: str
+    file_path: str  # Relative to the repository
+    start_line: int  # 1-based, inclusive
+    end_line: int
+
+    @property
+    def location(self) -> str:
+        return f"{self.file_path}, lines {self.start_line}-{self.end_line}"
+
+
+@dataclass(frozen=True)
+class ClassSummary:
+    """The non private declarations of a top level class, on which the relevance of the class is scored."""
+
+    qualified_name: str
+    definition: str
+    file_path: str
+    start_line: int
+    end_line: int
+
+    @property
+    def location(self) -> str:
+        return f"{self.file_path}, lines {self.start_line}-{self.end_line}"
+
+
+def fetch_file_snippets(file_path: str, content: str, window_size: int = 20, sliding_size: int = 10) -> List[CodeSnippet]:
+    """Splits a file in overlapping windows of `window_size` lines, starting every `sliding_size` lines."""
+    lines = content.split("\n")
+    l = len(lines)
+    snippets = []
+    for ndx in range(0, l, sliding_size):
+        end = min(ndx + window_size, l)
+        code = "\n".join(lines[ndx:end])
+        if code != "":
+            snippets.append(CodeSnippet(code, file_path, ndx + 1, end))
+    return snippets
+
+
+def fetch_class_definition(class_code: str) -> str:
+    """The public and protected lines of a class, with their bodies dropped."""
+    non_private_sigs = list(filter(lambda x: ("public" in x or "protected" in x) and "private" not in x, class_code.split("\n")))
+    return "\n".join([sig.replace("{", ";") for sig in non_private_sigs])
+
+
+class RepoCorpus:
+    """
+    The snippets and class summaries of a repository, which the relevance of its code is scored on.
+
+    The corpus is kept between queries: a refresh only reads the files whose size or modification
+    time changed (as told by the symbol index of the repository).
+
+    Args:
+        repo_dir (str): The repository.
+        window_size (int): The number of lines of the snippets.
+        sliding_size (int): The number of lines between the starts of consecutive snippets.
+    """
+
+    def __init__(self, repo_dir: str, window_size: int = 20, sliding_size: int = 10):
+        self.repo_dir = repo_dir
+        self.window_size = window_size
+        self.sliding_size = sliding_size
+        self.snippets: List[CodeSnippet] = []
+        self.classes: List[ClassSummary] = []
+        self._files = {}  # Relative path -> (stat, snippets, class summaries)
+        self._lock = threading.Lock()
+
+    def _index_file(self, index: symbol_index.SymbolIndex, relative_path: str, entry: dict) -> tuple:
+        with open(os.path.join(index.repo_dir, relative_path), "rb") as f:
+            content_bytes = f.read()
+        snippets = fetch_file_snippets(
+            relative_path, content_bytes.decode("utf-8", errors="replace"), self.window_size, self.sliding_size)
+        classes = [
+            ClassSummary(
+                type_entry["qualified_name"],
+                fetch_class_definition(
+                    content_bytes[type_entry["span"][0]:type_entry["span"][1]].decode("utf-8", errors="replace")),
+                relative_path,
+                *type_entry["lines"],
+            )
+            for type_entry in entry["types"]
+            if type_entry["top_level"]
+        ]
+        return entry["stat"], snippets, classes
+
+    def refresh(self) -> None:
+        """Brings the corpus up to date with the repository."""
+        with self._lock:
+            index = symbol_index.fetch_index(self.repo_dir)
+            index.refresh()
+            changed = set(self._files) != set(index.files)
+            files = {}
+            for relative_path, entry in index.files.items():
+                cached = self._files.get(relative_path)
+                if cached is None or cached[0] != entry["stat"]:
+                    try:
+                        cached = self._index_file(index, relative_path, entry)
+                    except FileNotFoundError:
+                        continue
+                    changed = True
+                files[relative_path] = cached
+            self._files = files
+            if changed:
+                self.snippets = [snippet for _, snippets, _ in files.values() for snippet in snippets]
+                self.classes = [summary for _, _, classes in files.values() for summary in classes]
+
+
+def fetch_top_indices(scores: List[float], num: int) -> List[int]:
+    """The indices of the `num` highest scores, from the highest."""
+    return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:num]
+
 
 class RelevantCodeTool:
     
     def __init__(self, parent_context, repo_root_dir: str, class_name: str = None):
         self.repo_root_dir = repo_root_dir
         self.parent_context = parent_context
+        self.corpus = RepoCorpus(repo_root_dir)
+        # The embeddings of the snippets are stored per repository
+        self.repo_key = os.path.abspath(repo_root_dir)
 
   
     def get_relevant_snippets(self, search_string, return_scores=False):
-        repo_dir=self.repo_root_dir
-        snippets=[]
-        window_size=20
-        sliding_size=10
         num_snippets=5
-        for root, _, files in os.walk(repo_dir):
-            for file in files:
-                file_path=os.path.join(root,file)
-                if file_path[-5:] == ".java":
-                    with open(file_path,"r") as f:
-                        lines=f.read().split("\n")
-                        l = len(lines)
-                        snippets+=["\n".join(lines[ndx:min(ndx + window_size, l)]) for ndx in range(0, l, sliding_size)]
-
-        snippets=[snippet for snippet in snippets if snippet!=""]
-        top_snippets=[]        
-        scores=self.parent_context.embedding_model.get_score(search_string, snippets, use_cache=True)
-        
-        top_scores = sorted(scores)[-1*num_snippets:]        
-        for k, score in enumerate(reversed(top_scores)):
-            i = scores.index(score)
-            top_snippets.append(snippets[i])
+        self.corpus.refresh()
+        snippets=self.corpus.snippets
+        scores=self.parent_context.embedding_model.get_score(search_string, [snippet.code for snippet in snippets], use_cache=True, repo_key=self.repo_key)
+        top_indices=fetch_top_indices(scores, num_snippets)
+        top_snippets=[snippets[i] for i in top_indices]
+        top_scores=[scores[i] for i in top_indices]
         
         return_string=""
         
         for i,snippet in enumerate(top_snippets):
-            return_string+=f"\n####SNIPPET {i+1}\n"+snippet+"```"
+            return_string+=f"\n####SNIPPET {i+1} ({snippet.location})\n"+snippet.code+"```"
         if return_scores:
             return top_snippets, top_scores
         else:            
@@ -45,35 +153,23 @@ class RelevantCodeTool:
 
       
     def get_relevant_classes(self, search_string, return_scores=False):
-        classes=get_classes_dict(self.repo_root_dir,[])
-        score_list = []
-        class_list = []
-        for class_name in classes:
-            non_private_sigs=list(filter(lambda x:("public" in x or "protected" in x) and "private" not in x,classes[class_name].split("\n")))
-            definition = "\n".join([sig.replace("{",";") for sig in non_private_sigs])
-            score_list.append(
-                definition
-            )
-            class_list.append(class_name)
-        score_list=self.parent_context.embedding_model.get_score(search_string, score_list, use_cache=True)
+        self.corpus.refresh()
+        classes=self.corpus.classes
+        score_list=self.parent_context.embedding_model.get_score(search_string, [summary.definition for summary in classes], use_cache=True, repo_key=self.repo_key)
         
 
-        top_scores = sorted(score_list)[-5:]
         class_infos = []
-        for k, score in enumerate(reversed(top_scores)):
+        top_scores = []
+        for i in fetch_top_indices(score_list, 5):
             try:
-                i = score_list.index(score)
-                class_name = class_list[i]
-                class_infos.append(self.parent_context.get_class_info(class_name,search_string))
-                score_list = score_list[:i] + score_list[i + 1 :]
-                class_list = (
-                    class_list[:i] + class_list[i + 1 :]
-                )
+                summary = classes[i]
+                class_infos.append(self.parent_context.get_class_info(summary.qualified_name,search_string)+f"\nLocation: {summary.location}")
+                top_scores.append(score_list[i])
             except Exception as e:
                 print("Get relevant methods error",e)
                 
         if return_scores:
-            return class_infos, list(reversed(top_scores))
+            return class_infos, top_scores
         else:
             return "\n".join(class_infos)+"\nNote that get_relevant_classes is limited to the repository and does not check external libraries. It is possible that the method you are looking for comes from an external library."
 
@@ -88,10 +184,10 @@ class RelevantCodeTool:
         c1,s1=0,0
         codes=[]
         for _ in range(3):
-            if len(classes_scores)>c1 and classes_scores[c1]>snippets_scores[s1]:
+            if len(classes_scores)>c1 and (len(snippets_scores)<=s1 or classes_scores[c1]>snippets_scores[s1]):
                 codes.append(classes[c1])
                 c1+=1                
             elif len(snippets_scores)>s1:
-                codes.append(snippets[s1])
+                codes.append(f"Location: {snippets[s1].location}\n{snippets[s1].code}")
                 s1+=1
         return "\n".join([f"#### Code Piece {i+1}:\n{code}" for i,code in enumerate(codes)])
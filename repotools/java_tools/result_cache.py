@@ -0,0 +1,110 @@
+"""Persistent cache of the JDT LS results of the Java tools.
+
+`get_class_info` and `get_signature` cost several completion round trips per class. Their raw
+results (FQDNs, constructors, member lists, signatures — before any ranking by query) are cached
+by (source fingerprint of the repository, kind of probe, FQDN and method). The fingerprint (see
+`SymbolIndex.fetch_source_fingerprint`) changes with the content of the sources and build files, so
+that a change of the repository invalidates its results. One JSON file per fingerprint is kept in
+`JavaConstants.TOOL_RESULT_CACHE_DIR`.
+
+A server still importing the project (used once `JavaConstants.JDTLS_START_TIMEOUT_SEC` is over, see
+`server_pool`) returns partial results, such as JDK classes only: nothing is cached until it reports
+ServiceReady. Empty results are not cached either.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Callable, Optional
+
+from project_utils.common_utils import fetch_ist_adjusted_logger
+from project_utils.constants import JavaConstants
+from repotools.java_tools import symbol_index
+
+logger = fetch_ist_adjusted_logger()
+
+
+class ToolResultCache:
+    """
+    The cached results of a repository.
+
+    Args:
+        repo_dir (str): The repository.
+        cache_dir (str): Where the results are saved.
+        is_ready (Callable[[], bool], optional): Whether the results are complete (such as
+            `EclipseJDTLS.is_service_ready`). Defaults to always.
+    """
+
+    def __init__(
+        self,
+        repo_dir: str,
+        cache_dir: str = JavaConstants.TOOL_RESULT_CACHE_DIR,
+        is_ready: Optional[Callable[[], bool]] = None,
+    ):
+        self.repo_dir = repo_dir
+        self.cache_dir = cache_dir
+        self.is_ready = is_ready
+        self._fingerprint = None
+        self._results = {}  # The results of `_fingerprint`
+        self._lock = threading.Lock()
+
+    def fetch_fingerprint(self) -> str:
+        """The current source fingerprint of the repository."""
+        return symbol_index.fetch_index(self.repo_dir).fetch_source_fingerprint()
+
+    def _fetch_path(self, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, f"{fingerprint}.json")
+
+    def _load(self, fingerprint: str) -> None:
+        if fingerprint == self._fingerprint:
+            return
+        try:
+            with open(self._fetch_path(fingerprint), "r") as f:
+                results = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            results = {}
+        self._fingerprint = fingerprint
+        self._results = results
+
+    @staticmethod
+    def _fetch_key(kind: str, *names: str) -> str:
+        return "\0".join([kind, *names])
+
+    def get(self, fingerprint: str, kind: str, *names: str) -> Optional[Any]:
+        """
+        Returns a cached result.
+
+        Args:
+            fingerprint (str): The source fingerprint (see `fetch_fingerprint`).
+            kind (str): The kind of probe, such as "class_info".
+            *names (str): The class name or FQDN (and method name) the probe is about.
+
+        Returns:
+            Optional[Any]: The result, or None if it is not cached.
+        """
+        with self._lock:
+            self._load(fingerprint)
+            return self._results.get(self._fetch_key(kind, *names))
+
+    def put(self, fingerprint: str, kind: str, *names: str, value: Any) -> None:
+        """Caches a (JSON serializable) result, unless it is empty or the results are not complete yet."""
+        if not value or not any(value):
+            return
+        if self.is_ready is not None and not self.is_ready():
+            logger.debug(f"Not caching the {kind} result of {names}: the language server is not ready")
+            return
+        with self._lock:
+            self._load(fingerprint)
+            self._results[self._fetch_key(kind, *names)] = value
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._fetch_path(fingerprint)
+            ## Keep the results saved meanwhile by the other tools and processes
+            try:
+                with open(path, "r") as f:
+                    self._results = {**json.load(f), **self._results}
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, "w") as f:
+                json.dump(self._results, f)
+            os.replace(tmp_path, path)
@@ -0,0 +1,249 @@
+"""Eclipse JDT LS servers kept alive between the `JavaTools` of a repository.
+
+Starting JDT LS (workspace import, IntelliCode enablement) dominates the construction of `JavaTools`.
+The pool keeps one server per repository directory: when a `JavaTools` is done with it (`release`),
+its scratchpad file is closed and the state of the working copy is recorded. The next `JavaTools` of
+the repository reuses the server, which is told about the files changed meanwhile (such as the
+working copy of another task) through `workspace/didChangeWatchedFiles` notifications. The workspace
+data of the servers is persisted in `JavaConstants.JDTLS_WORKSPACE_DIR`, so that a server started
+again for a repository does not import it from scratch either.
+
+The idle servers are stopped, least recently used first, while the servers of the pool use more
+than `JavaConstants.JDTLS_POOL_MEMORY_MB` of memory.
+"""
+
+import asyncio
+import atexit
+import glob
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from project_utils import tracing
+from project_utils.common_utils import fetch_ist_adjusted_logger
+from project_utils.constants import JavaConstants
+from repotools.java_tools.EclipseJDTLS import EclipseJDTLS
+from repotools.java_tools.utils import lsp_runner
+
+logger = fetch_ist_adjusted_logger()
+
+WATCHED_FILE_SUFFIXES = (".java", "pom.xml", ".gradle")
+FILE_CREATED, FILE_CHANGED, FILE_DELETED = 1, 2, 3
+
+
+def stat_watched_files(repo_dir: str) -> Dict[str, Tuple[int, int]]:
+    """Returns the size and modification time (ns) of the sources and build files of a repository, by absolute path."""
+    file_stats = {}
+    for root, dirs, files in os.walk(repo_dir):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        for name in files:
+            if not name.endswith(WATCHED_FILE_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            try:
+                path_stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            file_stats[path] = (path_stat.st_size, path_stat.st_mtime_ns)
+    return file_stats
+
+
+def fetch_file_changes(before: Dict[str, tuple], after: Dict[str, tuple]) -> List[Tuple[str, int]]:
+    """The `workspace/didChangeWatchedFiles` changes between two `stat_watched_files` snapshots."""
+    changes = [(path, FILE_DELETED) for path in before if path not in after]
+    for path, file_stat in after.items():
+        if path not in before:
+            changes.append((path, FILE_CREATED))
+        elif before[path] != file_stat:
+            changes.append((path, FILE_CHANGED))
+    return changes
+
+
+def fetch_process_tree_rss_kb(pid: int) -> int:
+    """The resident memory of a process and of its descendants (0 once they are gone)."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            rss_kb = next((int(line.split()[1]) for line in f if line.startswith("VmRSS:")), 0)
+        children = []
+        for children_path in glob.glob(f"/proc/{pid}/task/*/children"):
+            with open(children_path, "r") as f:
+                children += [int(child) for child in f.read().split()]
+    except (FileNotFoundError, ProcessLookupError):
+        return 0
+    return rss_kb + sum(fetch_process_tree_rss_kb(child) for child in children)
+
+
+class PooledServer:
+    """
+    A JDT LS process and the event loop thread serving it.
+
+    Args:
+        repo_root_dir (str): The repository.
+        dep_folder_path (str): The language server files (`external/java/language-server-files`).
+        ws_dir (str): The workspace directory of the server.
+        persistent (bool): Whether the workspace data is kept for the next servers of the repository.
+    """
+
+    def __init__(self, repo_root_dir: str, dep_folder_path: str, ws_dir: str, persistent: bool = True):
+        self.repo_root_dir = repo_root_dir
+        self.ws_dir = ws_dir
+        self.persistent = persistent
+        self.loop = asyncio.new_event_loop()
+        # The asyncio primitives of the server are created with its loop as the current one
+        asyncio.set_event_loop(self.loop)
+        self.language_server = EclipseJDTLS(
+            repo_root_dir, ws_dir=ws_dir, dep_folder_path=dep_folder_path, clear_persisted_state=not persistent
+        )
+        # Daemon thread, so that it terminates when the main thread terminates
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.in_use = False
+        self.last_used = time.monotonic()
+        self.file_stats = None  # The working copy, as last seen by the server
+        self._exit_event = None
+        self._server_stopped = threading.Event()
+
+    @tracing.traced(category="jdtls")
+    def start(self) -> None:
+        """Starts the server, and waits (up to `JavaConstants.JDTLS_START_TIMEOUT_SEC`) for it to be ready."""
+        server_started = threading.Event()
+
+        async def run():
+            self._exit_event = asyncio.Event()
+            ## LSP runner runs the language server until the exit event is set
+            await lsp_runner(self.language_server, server_started, self._exit_event, self._server_stopped)
+
+        asyncio.run_coroutine_threadsafe(run(), self.loop)
+        if not server_started.wait(timeout=JavaConstants.JDTLS_START_TIMEOUT_SEC):
+            logger.warning(f"JDT LS of {self.repo_root_dir} not ready after {JavaConstants.JDTLS_START_TIMEOUT_SEC}s")
+
+    def stop(self) -> None:
+        if self._exit_event is not None:
+            self.loop.call_soon_threadsafe(self._exit_event.set)
+            self._server_stopped.wait(timeout=30)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if not self.persistent:
+            shutil.rmtree(self.ws_dir, ignore_errors=True)
+
+    def is_alive(self) -> bool:
+        process = self.language_server.server.process
+        return process is not None and process.returncode is None
+
+    def fetch_rss_kb(self) -> int:
+        process = self.language_server.server.process
+        return 0 if process is None else fetch_process_tree_rss_kb(process.pid)
+
+
+class JDTLSServerPool:
+    """
+    The JDT LS servers of the process, by repository directory.
+
+    Args:
+        memory_cap_mb (int): The memory above which idle servers are stopped.
+    """
+
+    def __init__(self, memory_cap_mb: int = JavaConstants.JDTLS_POOL_MEMORY_MB):
+        self.memory_cap_mb = memory_cap_mb
+        self._servers: "OrderedDict[str, PooledServer]" = OrderedDict()  # Least recently used first
+        self._lock = threading.Lock()
+
+    def acquire(self, repo_root_dir: str, dep_folder_path: str) -> PooledServer:
+        """
+        Returns a started server for the repository, reused if the pool has an idle one.
+
+        If the server of the repository is in use, a server with a temporary (and cleared) workspace is
+        started instead, and stopped on release.
+        """
+        repo_root_dir = os.path.abspath(repo_root_dir)
+        with self._lock:
+            server = self._servers.get(repo_root_dir)
+            if server is not None and not server.in_use and not server.is_alive():
+                logger.info(f"JDT LS of {repo_root_dir} exited, starting a new one")
+                del self._servers[repo_root_dir]
+                server = None
+            if server is not None and not server.in_use:
+                server.in_use = True
+                self._servers.move_to_end(repo_root_dir)
+                reused = True
+            else:
+                if server is None:
+                    repo_key = hashlib.sha1(repo_root_dir.encode()).hexdigest()
+                    server = PooledServer(
+                        repo_root_dir, dep_folder_path, os.path.join(JavaConstants.JDTLS_WORKSPACE_DIR, repo_key)
+                    )
+                    self._servers[repo_root_dir] = server
+                else:
+                    server = PooledServer(
+                        repo_root_dir, dep_folder_path, tempfile.mkdtemp(prefix="jdtls_ws_"), persistent=False
+                    )
+                server.in_use = True
+                reused = False
+
+        if reused:
+            server.language_server.notify_watched_files_changed(
+                fetch_file_changes(server.file_stats, stat_watched_files(repo_root_dir))
+            )
+            logger.debug(f"Reusing the JDT LS of {repo_root_dir}")
+        else:
+            server.start()
+        self.evict()
+        return server
+
+    def release(self, server: PooledServer) -> None:
+        """Gives the server back to the pool (stops it if it is not pooled)."""
+        try:
+            server.language_server.close_scratchpad_file()
+        except Exception as e:
+            logger.warning(f"Could not close the scratchpad file of the JDT LS of {server.repo_root_dir}: {e}")
+        with self._lock:
+            pooled = self._servers.get(server.repo_root_dir) is server
+        if not pooled:
+            server.stop()
+            return
+        server.file_stats = stat_watched_files(server.repo_root_dir)
+        server.last_used = time.monotonic()
+        server.in_use = False
+        self.evict()
+
+    def evict(self) -> None:
+        """Stops idle servers, least recently used first, while the pool is over its memory cap."""
+        with self._lock:
+            rss_kb = {key: server.fetch_rss_kb() for key, server in self._servers.items()}
+            total_mb = sum(rss_kb.values()) / 1024
+            evicted = []
+            for key, server in list(self._servers.items()):
+                if total_mb <= self.memory_cap_mb:
+                    break
+                if server.in_use:
+                    continue
+                total_mb -= rss_kb[key] / 1024
+                evicted.append(self._servers.pop(key))
+        for server in evicted:
+            logger.info(f"Stopping the idle JDT LS of {server.repo_root_dir} (memory cap of {self.memory_cap_mb} MB)")
+            server.stop()
+
+    def shutdown(self) -> None:
+        """Stops all the servers."""
+        with self._lock:
+            servers = list(self._servers.values())
+            self._servers.clear()
+        for server in servers:
+            server.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def fetch_pool() -> JDTLSServerPool:
+    """Returns the server pool of the process (stopped at exit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = JDTLSServerPool()
+            atexit.register(_pool.shutdown)
+        return _pool
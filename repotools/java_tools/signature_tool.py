@@ -3,6 +3,7 @@ import time
 
 import numpy as np
 from repotools.java_tools.EclipseJDTLS import EclipseJDTLS
+from repotools.java_tools.result_cache import ToolResultCache
 
 def create_batches(input_list, batch_size):
     batches = []
@@ -18,8 +19,15 @@ class SignatureTool:
         self.abs_file_path = abs_file_path
         self.abs_repo_root_dir = abs_repo_root_dir
         self.running_loop = running_loop
+        self.result_cache = ToolResultCache(abs_repo_root_dir, is_ready=language_server.is_service_ready)
         
-    def get_signature(self,class_name, method_name, static=False, protected=False, abstract=False):
+    def run_probes(self, probes):
+        """Runs completion probes concurrently (see `EclipseJDTLS.probe_completions`)"""
+        return asyncio.run_coroutine_threadsafe(
+            self.language_server.probe_completions(probes), self.running_loop
+        ).result()
+
+    def fetch_signature_probe(self,class_name, method_name, static=False, protected=False, abstract=False):
 
         if static:
             modified_class_name_or_object_name = "\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\n"+";\n" + class_name + "." + method_name + "("
@@ -31,37 +39,22 @@ class SignatureTool:
             modified_class_name_or_object_name = (
                 "\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\n" + class_name + " a;\na." + method_name+ "("
             )
-        self.language_server.replace_text_in_scratchpad(modified_class_name_or_object_name)
-        
-        (
-            completions,
-            signatures,
-            response,
-        ) = asyncio.run_coroutine_threadsafe(
-            self.language_server.get_completions(
-                self.abs_file_path,
-                index=len(self.language_server.current_text)-1
-            ),self.running_loop
-        ).result()
-        self.language_server.replace_text_in_scratchpad("")
-        
+        return modified_class_name_or_object_name
+
+    def fetch_signatures_from_result(self, result):
+        completions, signatures, response = result
         return [sig["detail"] for sig in signatures if "detail" in sig]
 
-    def get_fqdns(self,class_name):
-        self.language_server.replace_text_in_scratchpad("\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\n"+ class_name)
-        (
-            completions,
-            signatures,
-            response,
-        ) = asyncio.run_coroutine_threadsafe(
-            self.language_server.get_completions(
-                self.abs_file_path,
-                index=len(self.language_server.current_text)-1
-            ),
-            self.running_loop,
-        ).result()
+    def get_signature(self,class_name, method_name, static=False, protected=False, abstract=False):
+        result = self.run_probes([self.fetch_signature_probe(class_name, method_name, static, protected, abstract)])[0]
+        return self.fetch_signatures_from_result(result)
 
-        self.language_server.replace_text_in_scratchpad("")
+    def get_fqdns(self,class_name,fingerprint=None):
+        fingerprint=fingerprint or self.result_cache.fetch_fingerprint()
+        cached_fqdns=self.result_cache.get(fingerprint,"fqdns",class_name)
+        if cached_fqdns is not None:
+            return cached_fqdns
+        completions, signatures, response = self.run_probes(["\n\n\npublic class Scratchpad{\npublic void m1(){\n\n\n\n"+ class_name])[0]
 
         final_fqdns=[]
         for sig in signatures:
@@ -73,29 +66,31 @@ class SignatureTool:
                 else:
                     if sig["detail"].endswith("."+class_name) or sig["detail"]==class_name:
                         final_fqdns.append(sig["detail"])
-                    
-        return list(set(final_fqdns))
+
+        final_fqdns=list(set(final_fqdns))
+        self.result_cache.put(fingerprint,"fqdns",class_name,value=final_fqdns)
+        return final_fqdns
 
     def get_signature_formatted(self, class_name, method_name):
         all_sigs=[]
-        fqdns=self.get_fqdns(class_name)
-        for fqdn in fqdns:
-            signatures1 = self.get_signature(
-                fqdn, method_name=method_name, static=False
-            )
-            signatures2 = self.get_signature(
-                fqdn, method_name=method_name, static=True
-            )
-
-            signatures3 = self.get_signature(
-                fqdn, method_name=method_name, protected=True
-            )        
-
-            
-
-            signatures4 = self.get_signature(
-                fqdn, method_name=method_name, abstract=True
-            )
+        fingerprint=self.result_cache.fetch_fingerprint()
+        fqdns=self.get_fqdns(class_name,fingerprint)
+        # The signatures of the classes probed before are cached, the probes of the others run at once
+        cached_sigs={fqdn:self.result_cache.get(fingerprint,"signatures",fqdn,method_name) for fqdn in fqdns}
+        uncached_fqdns=[fqdn for fqdn in fqdns if cached_sigs[fqdn] is None]
+        probes=[]
+        for fqdn in uncached_fqdns:
+            probes+=[
+                self.fetch_signature_probe(fqdn, method_name=method_name, static=False),
+                self.fetch_signature_probe(fqdn, method_name=method_name, static=True),
+                self.fetch_signature_probe(fqdn, method_name=method_name, protected=True),
+                self.fetch_signature_probe(fqdn, method_name=method_name, abstract=True),
+            ]
+        results=self.run_probes(probes) if len(probes)>0 else []
+        for k,fqdn in enumerate(uncached_fqdns):
+            signatures1, signatures2, signatures3, signatures4 = [
+                self.fetch_signatures_from_result(result) for result in results[4*k:4*k+4]
+            ]
             
             signatures4 = [
                 "abstract "+signature for signature in signatures4 if (signature not in signatures1) and (signature not in signatures2) and (signature not in signatures3)
@@ -122,5 +117,8 @@ class SignatureTool:
                 signature.split(":")[1] + " " + signature.split(":")[0]
                 for signature in signatures
             ]        
-            all_sigs+=signatures
+            cached_sigs[fqdn]=signatures
+            self.result_cache.put(fingerprint,"signatures",fqdn,method_name,value=signatures)
+        for fqdn in fqdns:
+            all_sigs+=cached_sigs[fqdn]
         return str(all_sigs)
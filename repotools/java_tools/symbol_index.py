@@ -0,0 +1,283 @@
+"""Persistent index of the Java types and methods of a repository.
+
+`get_method_body` and `get_relevant_classes` used to re-parse every `.java` file of the repository
+on each call. The index parses each file once and records, per file, its package, its (nested)
+types and their methods, with the byte spans of their code. It is saved as JSON in
+`JavaConstants.SYMBOL_INDEX_DIR`, and later refreshes only stat the files: the files whose size or
+modification time changed (such as the scratchpad file) are parsed again, the others are reused.
+The index also hashes the files, for the source fingerprint which the cached results of the tools
+are keyed by (see `result_cache.py`).
+
+    index = fetch_index(repo_dir)
+    index.get_method_bodies("Complex", "setImaginary")
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from project_utils import tracing
+from project_utils.common_utils import fetch_ist_adjusted_logger
+from project_utils.constants import JavaConstants
+from repotools.java_tools.tree_sitter_utils import parser
+
+logger = fetch_ist_adjusted_logger()
+
+INDEX_VERSION = 3
+TYPE_DECLARATIONS = ("class_declaration", "record_declaration", "interface_declaration", "enum_declaration")
+METHOD_DECLARATIONS = ("method_declaration", "constructor_declaration")
+# Not indexed, but part of the source fingerprint of the repository (see `fetch_source_fingerprint`)
+BUILD_FILE_NAMES = ("pom.xml", "build.gradle", "build.gradle.kts")
+
+
+def _fetch_line_starts(code_bytes: bytes) -> List[int]:
+    line_starts = [0]
+    position = code_bytes.find(b"\n")
+    while position >= 0:
+        line_starts.append(position + 1)
+        position = code_bytes.find(b"\n", position + 1)
+    return line_starts
+
+
+def _fetch_span(line_starts: List[int], body_node) -> List[int]:
+    """The span of a declaration, as `tree_sitter_utils.get_method_body` returns it: from the line
+    preceding the line where the body starts, to the end of the body."""
+    return [line_starts[max(body_node.start_point[0] - 1, 0)], body_node.end_byte]
+
+
+def index_file_content(code: str) -> dict:
+    """
+    Indexes the types and methods of a Java file.
+
+    Args:
+        code (str): The content of the file.
+
+    Returns:
+        dict: The package of the file (None if it has none) and its types. Each type has its simple
+            and qualified names, whether it is a top level type, its (1-based) lines, the span of its
+            code and its methods (name, signature, lines and span, for the methods with a body). The
+            spans are byte offsets.
+    """
+    code_bytes = code.encode("utf-8")
+    root_node = parser.parse(code_bytes).root_node
+    line_starts = _fetch_line_starts(code_bytes)
+    package = None
+    types = []
+
+    def visit_type(node, outer_name: Optional[str]) -> None:
+        name_node = node.child_by_field_name("name")
+        body_node = node.child_by_field_name("body")
+        if name_node is None or body_node is None:
+            return
+        name = name_node.text.decode()
+        nested_name = f"{outer_name}.{name}" if outer_name else name
+        methods = []
+        types.append({
+            "name": name,
+            "qualified_name": f"{package}.{nested_name}" if package else nested_name,
+            "top_level": outer_name is None,
+            "lines": [node.start_point[0] + 1, node.end_point[0] + 1],
+            "span": _fetch_span(line_starts, body_node),
+            "methods": methods,
+        })
+        members = list(body_node.children)
+        for member in body_node.children:
+            if member.type == "enum_body_declarations":
+                members += member.children
+        for member in members:
+            if member.type in TYPE_DECLARATIONS:
+                visit_type(member, nested_name)
+            elif member.type in METHOD_DECLARATIONS:
+                method_name_node = member.child_by_field_name("name")
+                parameters_node = member.child_by_field_name("parameters")
+                method_body_node = member.child_by_field_name("body")
+                if method_name_node is None or parameters_node is None or method_body_node is None:
+                    continue
+                method_name = method_name_node.text.decode()
+                methods.append({
+                    "name": method_name,
+                    "signature": method_name + parameters_node.text.decode(),
+                    "lines": [member.start_point[0] + 1, member.end_point[0] + 1],
+                    "span": _fetch_span(line_starts, method_body_node),
+                })
+
+    for child in root_node.children:
+        if child.type == "package_declaration":
+            for package_child in child.children:
+                if package_child.type in ("scoped_identifier", "identifier"):
+                    package = package_child.text.decode()
+        elif child.type in TYPE_DECLARATIONS:
+            visit_type(child, None)
+    return {"package": package, "types": types}
+
+
+def stat_source_files(repo_dir: str) -> Dict[str, List[int]]:
+    """Returns the size and modification time (ns) of the `.java` and build files of a repository, by relative path."""
+    file_stats = {}
+    for root, dirs, files in os.walk(repo_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(".java") and name not in BUILD_FILE_NAMES:
+                continue
+            path = os.path.join(root, name)
+            try:
+                path_stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            file_stats[os.path.relpath(path, repo_dir)] = [path_stat.st_size, path_stat.st_mtime_ns]
+    return file_stats
+
+
+class SymbolIndex:
+    """
+    The symbol index of a repository, persisted across processes.
+
+    Args:
+        repo_dir (str): The repository.
+        index_dir (str): Where the index is saved.
+    """
+
+    def __init__(self, repo_dir: str, index_dir: str = JavaConstants.SYMBOL_INDEX_DIR):
+        self.repo_dir = os.path.abspath(repo_dir)
+        repo_key = hashlib.sha1(self.repo_dir.encode()).hexdigest()
+        self.index_path = os.path.join(index_dir, f"{repo_key}.json")
+        self.fingerprint = None
+        self.files = {}  # Relative path -> {"stat": [size, mtime_ns], "sha1": ..., "package": ..., "types": [...]}
+        self.build_files = {}  # Relative path -> {"stat": [size, mtime_ns], "sha1": ...}
+        self._source_fingerprint = None  # (fingerprint, source fingerprint)
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, "r") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if saved.get("version") == INDEX_VERSION and saved.get("repo_dir") == self.repo_dir:
+            self.fingerprint = saved["fingerprint"]
+            self.files = saved["files"]
+            self.build_files = saved["build_files"]
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "repo_dir": self.repo_dir,
+                "fingerprint": self.fingerprint,
+                "files": self.files,
+                "build_files": self.build_files,
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+    @tracing.traced(category="tools")
+    def refresh(self) -> int:
+        """
+        Brings the index up to date with the repository, parsing only the new and modified files.
+
+        Returns:
+            int: The number of files (re-)parsed or removed from the index.
+        """
+        with self._lock:
+            file_stats = stat_source_files(self.repo_dir)
+            fingerprint = hashlib.sha1(json.dumps(file_stats, sort_keys=True).encode()).hexdigest()
+            if fingerprint == self.fingerprint:
+                return 0
+            changes = len((set(self.files) | set(self.build_files)) - set(file_stats))
+            files = {}
+            build_files = {}
+            for relative_path, file_stat in file_stats.items():
+                is_java_file = relative_path.endswith(".java")
+                entry = (self.files if is_java_file else self.build_files).get(relative_path)
+                if entry is None or entry["stat"] != file_stat:
+                    try:
+                        with open(os.path.join(self.repo_dir, relative_path), "rb") as f:
+                            content = f.read()
+                    except FileNotFoundError:
+                        continue
+                    entry = {"stat": file_stat, "sha1": hashlib.sha1(content).hexdigest()}
+                    if is_java_file:
+                        entry.update(index_file_content(content.decode("utf-8", errors="replace")))
+                    changes += 1
+                (files if is_java_file else build_files)[relative_path] = entry
+            self.files = files
+            self.build_files = build_files
+            self.fingerprint = fingerprint
+            self._save()
+            logger.debug(f"Refreshed the symbol index of {self.repo_dir}: {changes} files changed")
+            return changes
+
+    def fetch_source_fingerprint(self) -> str:
+        """
+        A digest of the content of the non empty `.java` and build files of the repository.
+
+        Unlike the modification times, it does not change when the working copy is materialized again,
+        nor with the (empty) scratchpad files of the tools.
+        """
+        with self._lock:
+            self.refresh()
+            if self._source_fingerprint is None or self._source_fingerprint[0] != self.fingerprint:
+                digest = hashlib.sha1()
+                for relative_path, entry in sorted({**self.files, **self.build_files}.items()):
+                    if entry["stat"][0] > 0:
+                        digest.update(f"{relative_path}\0{entry['sha1']}\n".encode())
+                self._source_fingerprint = (self.fingerprint, digest.hexdigest())
+            return self._source_fingerprint[1]
+
+    def iter_types(self, top_level_only: bool = False) -> Iterator[Tuple[str, dict]]:
+        """Yields the (relative path, type) pairs of the index (refreshed first)."""
+        self.refresh()
+        for relative_path, entry in self.files.items():
+            for type_entry in entry["types"]:
+                if type_entry["top_level"] or not top_level_only:
+                    yield relative_path, type_entry
+
+    def fetch_code(self, relative_path: str, span: List[int]) -> str:
+        """Reads the code of a span of an (indexed) file."""
+        with open(os.path.join(self.repo_dir, relative_path), "rb") as f:
+            f.seek(span[0])
+            return f.read(span[1] - span[0]).decode("utf-8", errors="replace")
+
+    def get_method_bodies(self, class_name: str, method_name: str) -> Optional[List[str]]:
+        """
+        Returns the code of the methods (all the overloads) of a class.
+
+        Args:
+            class_name (str): The simple name of the class (the first class of the repository with this name is used).
+            method_name (str): The name of the method.
+
+        Returns:
+            Optional[List[str]]: The code of the methods, or None if no class has this name.
+        """
+        for relative_path, type_entry in self.iter_types():
+            if type_entry["name"] == class_name:
+                return [
+                    self.fetch_code(relative_path, method["span"])
+                    for method in type_entry["methods"]
+                    if method["name"] == method_name
+                ]
+        return None
+
+    def fetch_classes_dict(self) -> Dict[str, str]:
+        """Returns the code of the top level types, by qualified name."""
+        return {
+            type_entry["qualified_name"]: self.fetch_code(relative_path, type_entry["span"])
+            for relative_path, type_entry in self.iter_types(top_level_only=True)
+        }
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def fetch_index(repo_dir: str) -> SymbolIndex:
+    """Returns the symbol index of a repository (shared by all the tools of the process)."""
+    key = os.path.abspath(repo_dir)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = SymbolIndex(key)
+        return _indexes[key]
@@ -1,15 +1,26 @@
 # Copyright (c) Microsoft Corporation. 
 # Licensed under the MIT license.
 
+import collections
+import fcntl
+import glob
 import hashlib
-import json
 import os
-from pathlib import Path
 import pickle
+import threading
+import time
+from typing import List
+import numpy as np
 import torch
 import torch.nn as nn
 from transformers import RobertaTokenizer, RobertaModel, RobertaConfig
+from project_utils import tracing
+from project_utils.common_utils import fetch_ist_adjusted_logger
+from project_utils.constants import JavaConstants
 from tqdm import tqdm
+
+logger = fetch_ist_adjusted_logger()
+
 class UniXcoder(nn.Module):    
     def __init__(self, model_name):
         """
@@ -31,6 +42,9 @@ class UniXcoder(nn.Module):
         self.lsm = nn.LogSoftmax(dim=-1)
         
         self.tokenizer.add_tokens(["<mask0>"],special_tokens=True)
+        self.embedding_cache_dir = os.path.join(JavaConstants.EMBEDDING_CACHE_DIR, model_name.replace("/", "--"))
+        self._embedding_stores = collections.OrderedDict()  # Repository key -> store, most recently used last
+        self._embedding_stores_lock = threading.Lock()
           
     def tokenize(self, inputs, mode="<encoder-only>", max_length=512, padding=False):
         """ 
@@ -144,6 +158,7 @@ class UniXcoder(nn.Module):
 
         return preds  
     
+    @tracing.traced(category="embedding")
     def get_embeddings_from_snippet(self, snippet):
         token_ids = self.tokenize(snippet,padding=True,max_length=1023)
         if torch.cuda.is_available():
@@ -153,67 +168,184 @@ class UniXcoder(nn.Module):
         tokens_embeddings, snippet_embedding = self(source_ids)
         return snippet_embedding
 
-    def check_cache(self, snippets):
-        file_name=self.hash_list(tuple(snippets))+".pkl"
-        # script_directory = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join("temp", "java","unixcoder_cache", file_name)
-        return os.path.exists(file_path)                    
-
-    def hash_list(self,input_list):
-        list_str = json.dumps(input_list, sort_keys=True)
-        sha256 = hashlib.sha256()
-        sha256.update(list_str.encode('utf-8'))
-        return sha256.hexdigest()
-
-    def load_cache(self, snippets):
-        file_name=self.hash_list(tuple(snippets))+".pkl"
-        # script_directory = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join("temp", "java","unixcoder_cache", file_name)
-        values=pickle.load(open(file_path,"rb"))
-        if torch.cuda.is_available():
-            return torch.tensor(values).cuda()
-        else:
-            return torch.tensor(values)
-
-    def save_cache(self, snippets, values):
-        values=values.cpu().numpy()
-        file_name=self.hash_list(tuple(snippets))+".pkl"
-        file_path = os.path.join("temp", "java","unixcoder_cache", file_name)
-        return pickle.dump(values,open(file_path,"wb"))
-
-
-    def get_score(self, snippet1, snippet2, use_cache=False):
-        Path(os.path.join("temp", "java","unixcoder_cache")).mkdir(parents=True, exist_ok=True)
-        with torch.no_grad():        
-            e1=self.get_embeddings_from_snippet([snippet1])
-            cache_exists=False
-            if use_cache and hasattr(self,"cache") and len(snippet2)==len(self.cache):
-                e2s=self.cache            
-                cache_exists=True
-            elif use_cache and self.check_cache(snippet2):
-                try:
-                    print("Loading cache")
-                    self.cache=self.load_cache(snippet2)
-                    e2s=self.cache
-                    cache_exists=True
-                except KeyboardInterrupt:
-                    exit()                    
-                except Exception as e:
-                    print(e,"Cache corrupted, regenerating")
-            else:
-                if use_cache:
-                    print("Could not find cache, reloading")
+    def fetch_embedding_store(self, repo_key=None):
+        """
+        The embedding store of the snippets of a repository (of no repository in particular without `repo_key`).
+
+        Each repository has its own shards, so that a process only loads the embeddings of the repositories
+        it scores, and only the stores of the last `JavaConstants.EMBEDDING_CACHE_MAX_REPOS` of them are kept.
+        """
+        store_name = hashlib.sha1(repo_key.encode()).hexdigest()[:16] if repo_key else "shared"
+        with self._embedding_stores_lock:
+            store = self._embedding_stores.get(store_name)
+            if store is None:
+                store = SnippetEmbeddingStore(os.path.join(self.embedding_cache_dir, store_name))
+                self._embedding_stores[store_name] = store
+            self._embedding_stores.move_to_end(store_name)
+            while len(self._embedding_stores) > JavaConstants.EMBEDDING_CACHE_MAX_REPOS:
+                self._embedding_stores.popitem(last=False)
+            return store
+
+    @tracing.traced(category="embedding")
+    def get_score(self, snippet1, snippet2, use_cache=False, repo_key=None):
+        """
+        Cosine similarities between a query and snippets, computed with one matrix-vector product.
+
+        Only the snippets missing from the embedding store of `repo_key` (looked up by content hash) are
+        embedded. With `use_cache`, their embeddings are also persisted for the next processes.
+        """
+        embedding_store=self.fetch_embedding_store(repo_key)
+        with torch.no_grad():
+            e1=self.get_embeddings_from_snippet([snippet1]).cpu().numpy()[0]
+            missing_snippets=embedding_store.fetch_missing(snippet2)
+            if missing_snippets:
                 batch_size=20
                 batches = []
-                for i in range(0, len(snippet2), batch_size):
-                    batch = snippet2[i:i + batch_size]
+                for i in range(0, len(missing_snippets), batch_size):
+                    batch = missing_snippets[i:i + batch_size]
                     batches.append(batch)
-
                 e2s=torch.cat([self.get_embeddings_from_snippet(batch) for batch in batches],0)
-                if (not cache_exists) and use_cache:
-                    self.cache=e2s
-                    self.save_cache(snippet2,e2s)
-            return [nn.functional.cosine_similarity(e1,e2).cpu().item() for e2 in e2s]
+                embedding_store.add(missing_snippets, e2s.cpu().numpy(), persist=use_cache)
+        if len(snippet2)==0:
+            return []
+        e2s=embedding_store.fetch_matrix(snippet2)
+        norms=np.maximum(np.linalg.norm(e2s,axis=1)*np.linalg.norm(e1),1e-8)
+        return (e2s@e1/norms).tolist()
+
+
+class SnippetEmbeddingStore:
+    """
+    Embeddings of snippets, keyed by the sha256 of their content.
+
+    The embeddings are loaded on first use and persisted as append-only shards (one per batch of new
+    embeddings), so that a change in the repository only embeds and writes the new snippets. The
+    shards are merged once there are more than `max_shards` of them. The embeddings which are not
+    persisted are only kept for the `max_unpersisted` most recently used snippets.
+
+    Args:
+        cache_dir (str): Where the shards are saved.
+        max_shards (int): The number of shards above which they are merged.
+        max_unpersisted (int): The number of embeddings kept in memory without being persisted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_shards: int = JavaConstants.EMBEDDING_CACHE_MAX_SHARDS,
+        max_unpersisted: int = JavaConstants.EMBEDDING_CACHE_MAX_UNPERSISTED,
+    ):
+        self.cache_dir = cache_dir
+        self.max_shards = max_shards
+        self.max_unpersisted = max_unpersisted
+        self.embeddings = None  # Snippet hash -> embedding, of the persisted snippets
+        self._unpersisted = collections.OrderedDict()  # Snippet hash -> embedding, most recently used last
+        self._lock = threading.RLock()
+        self._matrix_keys = None
+        self._matrix = None
+
+    @staticmethod
+    def fetch_key(snippet: str) -> str:
+        return hashlib.sha256(snippet.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+    def _fetch_shard_paths(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.cache_dir, "embeddings-*.pkl")))
+
+    def _read_shard(self, path: str) -> dict:
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            logger.warning(f"Ignoring the embedding cache shard {path}: {e}")
+            return {}
+
+    def _write_shard(self, embeddings: dict) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, f"embeddings-{time.time_ns()}-{os.getpid()}-{threading.get_ident()}.pkl")
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(embeddings, f)
+        os.replace(path + ".tmp", path)
+
+    def _load(self) -> None:
+        if self.embeddings is None:
+            embeddings = {}
+            for path in self._fetch_shard_paths():
+                embeddings.update(self._read_shard(path))
+            self.embeddings = embeddings
+
+    def fetch_missing(self, snippets: List[str]) -> List[str]:
+        """Returns the (distinct) snippets without an embedding, in their order of appearance."""
+        with self._lock:
+            self._load()
+            missing = {}
+            for snippet in snippets:
+                key = self.fetch_key(snippet)
+                if key in self._unpersisted:
+                    self._unpersisted.move_to_end(key)
+                elif key not in self.embeddings:
+                    missing[snippet] = None
+            return list(missing)
+
+    def add(self, snippets: List[str], embeddings: np.ndarray, persist: bool = True) -> None:
+        """
+        Stores the embeddings of snippets.
+
+        Args:
+            snippets (List[str]): The snippets.
+            embeddings (np.ndarray): Their embeddings, one row per snippet.
+            persist (bool): Whether to also save them in a new shard (otherwise they are only kept in memory,
+                and the least recently used ones are dropped beyond `max_unpersisted`).
+        """
+        new_embeddings = {self.fetch_key(snippet): row for snippet, row in zip(snippets, embeddings)}
+        with self._lock:
+            self._load()
+            if not persist:
+                for key, row in new_embeddings.items():
+                    self._unpersisted[key] = row
+                    self._unpersisted.move_to_end(key)
+                ## The new embeddings are kept even beyond the bound, for the matrix of the caller
+                while len(self._unpersisted) > max(self.max_unpersisted, len(new_embeddings)):
+                    self._unpersisted.popitem(last=False)
+                return
+            self.embeddings.update(new_embeddings)
+            for key in new_embeddings:
+                self._unpersisted.pop(key, None)
+            self._write_shard(new_embeddings)
+            if len(self._fetch_shard_paths()) > self.max_shards:
+                self._merge_shards()
+
+    def _merge_shards(self) -> None:
+        """Merges the shards into one, with a lock on the cache directory against concurrent merges."""
+        with open(os.path.join(self.cache_dir, ".merge.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                ## Listed again under the lock: another process may have merged them meanwhile
+                shard_paths = self._fetch_shard_paths()
+                if len(shard_paths) <= self.max_shards:
+                    return
+                ## The shards written by other processes since the load are read again, so that none is lost
+                merged = {}
+                for path in shard_paths:
+                    merged.update(self._read_shard(path))
+                self._write_shard(merged)
+                for path in shard_paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def fetch_matrix(self, snippets: List[str]) -> np.ndarray:
+        """Returns the embeddings of (stored) snippets, stacked in a matrix."""
+        keys = [self.fetch_key(snippet) for snippet in snippets]
+        with self._lock:
+            if keys != self._matrix_keys:
+                self._load()
+                self._matrix = np.stack(
+                    [self._unpersisted[key] if key in self._unpersisted else self.embeddings[key] for key in keys]
+                )
+                self._matrix_keys = keys
+            return self._matrix
 
     
 class Beam(object):
@@ -7,6 +7,7 @@
 import torch
 import torch.nn as nn
 from transformers import RobertaTokenizer, RobertaModel, RobertaConfig
+from project_utils import tracing
 import logging
 import numpy as np
 logger = logging.getLogger("__main__")
@@ -275,6 +276,7 @@ class Beam(object):
         return sentence
 
 
+@tracing.traced(category="embedding")
 def fetch_unixcoder_embeddings(string_list, model=None):
     if model is None:
         model = UniXcoder("microsoft/unixcoder-base")
@@ -4,11 +4,13 @@ import os
 
 from repotools.python_tools import tree_sitter_related
 import project_utils.common_utils as utils  # TODO: remove dependency
+from project_utils import tracing
 
 # Fetching a logger with IST adjusted time
 logger = utils.fetch_ist_adjusted_logger()
 
 
+@tracing.traced(category="jedi")
 def fetch_script_obj_for_file_in_repo(file_path: str, repo_path: str, environment_path: str):
     """
     Fetches the Jedi script object for a file in a repository.
@@ -194,6 +196,7 @@ def dsu_goto_parent(_elem, max_times=100):
     return dsu_goto_parent(_goto_elem[0], max_times - 1)
 
 
+@tracing.traced(category="jedi")
 def fetch_relevant_elem(file_name, repo_dir, fqdn_use, expected_type, env_path):
     """Initializes the relevant elem with the appropriate class"""
     _script_obj = fetch_script_obj_for_file_in_repo(
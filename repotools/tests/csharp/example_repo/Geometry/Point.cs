@@ -0,0 +1,20 @@
+namespace Geometry;
+
+public class Point
+{
+    public double X { get; set; }
+    public double Y { get; set; }
+
+    public Point(double x, double y)
+    {
+        X = x;
+        Y = y;
+    }
+
+    public double DistanceTo(Point other)
+    {
+        var dx = X - other.X;
+        var dy = Y - other.Y;
+        return Math.Sqrt(dx * dx + dy * dy);
+    }
+}
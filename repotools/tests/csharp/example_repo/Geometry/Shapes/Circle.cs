@@ -0,0 +1,23 @@
+namespace Geometry.Shapes;
+
+public class Circle
+{
+    public Point Center { get; }
+    public double Radius { get; }
+
+    public Circle(Point center, double radius)
+    {
+        Center = center;
+        Radius = radius;
+    }
+
+    public double Area()
+    {
+        return Math.PI * Radius * Radius;
+    }
+
+    public bool Contains(Point point)
+    {
+        return Center.DistanceTo(point) <= Radius;
+    }
+}
@@ -0,0 +1,58 @@
+import glob
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from repotools.java_tools.unixcoder import SnippetEmbeddingStore
+
+
+class TestSnippetEmbeddingStore(unittest.TestCase):
+    """Class to test the per-snippet embedding store of the Java UniXcoder."""
+
+    def test_only_new_snippets_are_missing(self):
+        """Test that the embeddings are reused by content, across stores"""
+        cache_dir = tempfile.mkdtemp()
+        store = SnippetEmbeddingStore(cache_dir)
+        snippets = ["a", "b", "a", "c"]
+        assert store.fetch_missing(snippets) == ["a", "b", "c"]
+        store.add(["a", "b", "c"], np.eye(3, dtype=np.float32))
+        assert SnippetEmbeddingStore(cache_dir).fetch_missing(snippets + ["d"]) == ["d"]
+        assert store.fetch_matrix(snippets).tolist() == [[1, 0, 0], [0, 1, 0], [1, 0, 0], [0, 0, 1]]
+
+    def test_shards_are_merged(self):
+        """Test that the shards are merged without losing embeddings"""
+        cache_dir = tempfile.mkdtemp()
+        store = SnippetEmbeddingStore(cache_dir, max_shards=2)
+        for i in range(3):
+            store.add([str(i)], np.ones((1, 3), dtype=np.float32))
+        assert len(glob.glob(os.path.join(cache_dir, "*.pkl"))) == 1
+        assert SnippetEmbeddingStore(cache_dir).fetch_missing(["0", "1", "2"]) == []
+
+    def test_concurrent_merges(self):
+        """Test that stores merging the same shards at once neither fail nor lose embeddings"""
+        cache_dir = tempfile.mkdtemp()
+        stores = [SnippetEmbeddingStore(cache_dir, max_shards=2) for _ in range(4)]
+
+        def add_snippets(k):
+            for i in range(10):
+                stores[k].add([f"{k}-{i}"], np.ones((1, 3), dtype=np.float32))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(add_snippets, range(4)))
+        snippets = [f"{k}-{i}" for k in range(4) for i in range(10)]
+        assert SnippetEmbeddingStore(cache_dir).fetch_missing(snippets) == []
+
+    def test_unpersisted_embeddings_are_bounded(self):
+        """Test that only the most recently used embeddings are kept when they are not persisted"""
+        cache_dir = tempfile.mkdtemp()
+        store = SnippetEmbeddingStore(cache_dir, max_unpersisted=2)
+        store.add(["a", "b"], np.eye(2, dtype=np.float32), persist=False)
+        assert store.fetch_missing(["a"]) == []
+        store.add(["c"], np.ones((1, 2), dtype=np.float32), persist=False)
+        assert store.fetch_missing(["a", "b", "c"]) == ["b"]
+        store.add(["d", "e", "f"], np.ones((3, 2), dtype=np.float32), persist=False)
+        assert store.fetch_matrix(["d", "e", "f"]).shape == (3, 2)
+        assert os.listdir(cache_dir) == []
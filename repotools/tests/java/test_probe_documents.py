@@ -0,0 +1,80 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from repotools.java_tools.EclipseJDTLS import EclipseJDTLS, ScratchpadDocument
+
+
+class FakeNotify:
+    def __init__(self):
+        self.methods = []
+
+    def __getattr__(self, method):
+        return lambda params: self.methods.append((method, params))
+
+
+def apply_content_change(text, change):
+    """Applies an LSP content change to a (ASCII) text, as the server does."""
+    lines = text.split("\n")
+
+    def fetch_offset(position):
+        line_index = position["line"]
+        assert line_index < len(lines)
+        # A character past the end of its line is clamped to the end of the line
+        return sum(len(line) + 1 for line in lines[:line_index]) + min(position["character"], len(lines[line_index]))
+
+    start, end = fetch_offset(change["range"]["start"]), fetch_offset(change["range"]["end"])
+    return text[:start] + change["text"] + text[end:]
+
+
+class FakeServer:
+    def __init__(self):
+        self.notify = FakeNotify()
+
+
+class TestProbeDocuments(unittest.TestCase):
+    """Class to test the concurrent completion probes of the Java tools."""
+
+    def test_probes_run_concurrently_in_their_own_documents(self):
+        """Test that the probes overlap, and are each answered for the text of their document"""
+        language_server = EclipseJDTLS.__new__(EclipseJDTLS)
+        language_server.server = FakeServer()
+        scratchpad_file_path = os.path.join(tempfile.mkdtemp(), "Scratchpad.java")
+        language_server.initialize_scratchpad_file(scratchpad_file_path, num_probe_documents=3)
+        assert all(os.path.exists(document.path) for document in language_server.probe_documents)
+
+        in_flight = []
+        max_in_flight = []
+
+        async def get_completions(file_path, index=None, text=None):
+            in_flight.append(file_path)
+            max_in_flight.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(file_path)
+            return [], [text[index]], None
+
+        language_server.get_completions = get_completions
+        probes = ["a(", "b.", "c;", "d)", "e!"]
+        results = asyncio.run(language_server.probe_completions(probes))
+        assert [signatures[0] for _, signatures, _ in results] == ["(", ".", ";", ")", "!"]
+        assert max(max_in_flight) == 3
+
+        language_server.close_scratchpad_file()
+        assert language_server.probe_documents == []
+        assert os.listdir(os.path.dirname(scratchpad_file_path)) == ["Scratchpad.java"]
+
+    def test_replaced_text_is_the_whole_document(self):
+        """Test that replaying the changes of a document onto its text only leaves the last text"""
+        server = FakeServer()
+        document = ScratchpadDocument(server, os.path.join(tempfile.mkdtemp(), "Probe.java"))
+        document.open()
+        text = ""
+        for probe in ["class A {\n  void f() {\n    g(", "x.", "class B {\n}\n", "class C {\n  int y;"]:
+            document.replace_text(probe)
+            method, params = server.notify.methods[-1]
+            assert method == "did_change_text_document"
+            for change in params["contentChanges"]:
+                text = apply_content_change(text, change)
+            assert text == probe
+        document.close()
@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from repotools.java_tools import symbol_index
+from repotools.java_tools.get_relevant_code import RepoCorpus, fetch_file_snippets
+
+
+class TestRepoCorpus(unittest.TestCase):
+    """Class to test the snippet and class corpus of RelevantCodeTool."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.tmp_dir, "repo")
+        shutil.copytree("repotools/tests/java/example_repo/repo1", self.repo_dir)
+        # Keeps the index of the copy out of `JavaConstants.SYMBOL_INDEX_DIR`
+        self.index_dir = os.path.join(self.tmp_dir, "index")
+        symbol_index._indexes[os.path.abspath(self.repo_dir)] = symbol_index.SymbolIndex(self.repo_dir, self.index_dir)
+
+    def tearDown(self):
+        symbol_index._indexes.pop(os.path.abspath(self.repo_dir), None)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_snippets_have_their_location(self):
+        """Test the windows and their line ranges"""
+        snippets = fetch_file_snippets("A.java", "\n".join(str(i) for i in range(25)))
+        assert [(s.start_line, s.end_line) for s in snippets] == [(1, 20), (11, 25), (21, 25)]
+        assert snippets[1].code.startswith("10\n") and snippets[1].location == "A.java, lines 11-25"
+
+    def test_only_modified_files_are_read_again(self):
+        """Test the refresh of the corpus"""
+        corpus = RepoCorpus(self.repo_dir)
+        corpus.refresh()
+        complex_summary = [c for c in corpus.classes if c.qualified_name == "io.Complex"][0]
+        assert "public void setImaginary(float i);" in complex_summary.definition
+        assert complex_summary.file_path == "src/main/java/io/Complex.java"
+        snippets = list(corpus.snippets)
+
+        corpus.refresh()
+        assert all(a is b for a, b in zip(snippets, corpus.snippets))
+
+        with open(os.path.join(self.repo_dir, "src/main/java/io/Extra.java"), "w") as f:
+            f.write("package io;\npublic class Extra {\n    public void run() {}\n}\n")
+        corpus.refresh()
+        assert len(corpus.snippets) == len(snippets) + 1
+        assert "io.Extra" in [c.qualified_name for c in corpus.classes]
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from repotools.java_tools import symbol_index
+from repotools.java_tools.result_cache import ToolResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    """Class to test the cached results of ClassInfoTool and SignatureTool."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.tmp_dir, "repo")
+        shutil.copytree("repotools/tests/java/example_repo/repo1", self.repo_dir)
+        self.index_dir = os.path.join(self.tmp_dir, "index")
+        symbol_index._indexes[os.path.abspath(self.repo_dir)] = symbol_index.SymbolIndex(self.repo_dir, self.index_dir)
+
+    def tearDown(self):
+        symbol_index._indexes.pop(os.path.abspath(self.repo_dir), None)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fingerprint_follows_the_sources(self):
+        """Test that the fingerprint changes with the content of the sources, but not with empty files"""
+        cache = ToolResultCache(self.repo_dir, os.path.join(self.tmp_dir, "results"))
+        fingerprint = cache.fetch_fingerprint()
+        with open(os.path.join(self.repo_dir, "Scratchpad.java"), "w") as f:
+            f.write("")
+        assert cache.fetch_fingerprint() == fingerprint
+
+        with open(os.path.join(self.repo_dir, "src/main/java/io/Extra.java"), "w") as f:
+            f.write("package io;\npublic class Extra {}\n")
+        assert cache.fetch_fingerprint() != fingerprint
+
+    def test_results_are_persisted(self):
+        """Test the results of a fingerprint, saved for the next tools"""
+        cache_dir = os.path.join(self.tmp_dir, "results")
+        cache = ToolResultCache(self.repo_dir, cache_dir)
+        fingerprint = cache.fetch_fingerprint()
+        cache.put(fingerprint, "signatures", "io.Complex", "setImaginary", value=["void setImaginary(float i)"])
+        cache.put(fingerprint, "class_info", "io.Missing", value=[[], [], []])
+
+        cache = ToolResultCache(self.repo_dir, cache_dir)
+        assert cache.get(fingerprint, "signatures", "io.Complex", "setImaginary") == ["void setImaginary(float i)"]
+        assert cache.get(fingerprint, "signatures", "io.Complex", "getReal") is None
+        assert cache.get(fingerprint, "class_info", "io.Missing") is None
+        assert cache.get("other", "signatures", "io.Complex", "setImaginary") is None
+
+    def test_results_are_not_cached_before_the_server_is_ready(self):
+        """Test that the partial results of a server still importing the project are not cached"""
+        ready = []
+        cache = ToolResultCache(self.repo_dir, os.path.join(self.tmp_dir, "results"), is_ready=lambda: bool(ready))
+        fingerprint = cache.fetch_fingerprint()
+        cache.put(fingerprint, "fqdns", "Complex", value=["java.lang.Complex"])
+        assert cache.get(fingerprint, "fqdns", "Complex") is None
+
+        ready.append(True)
+        cache.put(fingerprint, "fqdns", "Complex", value=["io.Complex"])
+        assert cache.get(fingerprint, "fqdns", "Complex") == ["io.Complex"]
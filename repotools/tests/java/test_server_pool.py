@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from repotools.java_tools import server_pool
+
+
+class FakeServer:
+    """Stands for a started `PooledServer`, without a JDT LS process."""
+
+    def __init__(self, repo_root_dir, rss_mb, in_use=False):
+        self.repo_root_dir = repo_root_dir
+        self.rss_mb = rss_mb
+        self.in_use = in_use
+        self.stopped = False
+
+    def fetch_rss_kb(self):
+        return self.rss_mb * 1024
+
+    def stop(self):
+        self.stopped = True
+
+
+class TestServerPool(unittest.TestCase):
+    """Class to test the pool of JDT LS servers."""
+
+    def test_file_changes(self):
+        """Test the watched file changes between two snapshots of a working copy"""
+        repo_dir = tempfile.mkdtemp()
+        for name in ["A.java", "B.java", "pom.xml", "notes.txt"]:
+            with open(os.path.join(repo_dir, name), "w") as f:
+                f.write("a")
+        before = server_pool.stat_watched_files(repo_dir)
+        assert sorted(os.path.basename(path) for path in before) == ["A.java", "B.java", "pom.xml"]
+
+        with open(os.path.join(repo_dir, "A.java"), "w") as f:
+            f.write("changed")
+        os.remove(os.path.join(repo_dir, "B.java"))
+        with open(os.path.join(repo_dir, "C.java"), "w") as f:
+            f.write("a")
+        changes = server_pool.fetch_file_changes(before, server_pool.stat_watched_files(repo_dir))
+        assert sorted((os.path.basename(path), change) for path, change in changes) == [
+            ("A.java", server_pool.FILE_CHANGED),
+            ("B.java", server_pool.FILE_DELETED),
+            ("C.java", server_pool.FILE_CREATED),
+        ]
+
+    def test_idle_servers_are_evicted_least_recently_used_first(self):
+        """Test the eviction under the memory cap"""
+        pool = server_pool.JDTLSServerPool(memory_cap_mb=5000)
+        servers = [FakeServer("/a", 2000), FakeServer("/b", 2000, in_use=True), FakeServer("/c", 2000), FakeServer("/d", 2000)]
+        for server in servers:
+            pool._servers[server.repo_root_dir] = server
+        pool.evict()
+        # "/b" is in use: "/a" then "/c" are stopped
+        assert [server.stopped for server in servers] == [True, False, True, False]
+        assert list(pool._servers) == ["/b", "/d"]
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from repotools.java_tools import symbol_index
+
+CODE = """package a.b;
+
+public class Outer {
+    public int size() { return 1; }
+    static class Inner {
+        void size(int x) { String s = "}"; }
+    }
+}
+class Helper { Helper() {} }
+"""
+
+
+class TestSymbolIndex(unittest.TestCase):
+    """Class to test the Java symbol index."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.tmp_dir, "repo")
+        shutil.copytree("repotools/tests/java/example_repo/repo1", self.repo_dir)
+        self.index_dir = os.path.join(self.tmp_dir, "index")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_methods_are_attributed_to_their_class(self):
+        """Test that nested and secondary classes only own their methods"""
+        types = {t["qualified_name"]: t for t in symbol_index.index_file_content(CODE)["types"]}
+        assert sorted(types) == ["a.b.Helper", "a.b.Outer", "a.b.Outer.Inner"]
+        assert [m["signature"] for m in types["a.b.Outer"]["methods"]] == ["size()"]
+        assert [m["signature"] for m in types["a.b.Outer.Inner"]["methods"]] == ["size(int x)"]
+        assert not types["a.b.Outer.Inner"]["top_level"]
+
+    def test_method_bodies(self):
+        """Test the bodies, as get_method_body returns them"""
+        index = symbol_index.SymbolIndex(self.repo_dir, index_dir=self.index_dir)
+        bodies = index.get_method_bodies("Complex", "setImaginary")
+        assert bodies == ['    }\n    public void setImaginary(float i){\n        this.i=i;\n    }']
+        assert index.get_method_bodies("Missing", "setImaginary") is None
+        assert "io.Complex" in index.fetch_classes_dict()
+
+    def test_refresh_only_parses_modified_files(self):
+        """Test that the index is persisted and refreshed incrementally"""
+        index = symbol_index.SymbolIndex(self.repo_dir, index_dir=self.index_dir)
+        num_files = index.refresh()
+        assert num_files > 1 and index.refresh() == 0
+        assert symbol_index.SymbolIndex(self.repo_dir, index_dir=self.index_dir).refresh() == 0
+
+        with open(os.path.join(self.repo_dir, "src/main/java/io/Extra.java"), "w") as f:
+            f.write(CODE)
+        assert index.refresh() == 1
+        assert index.get_method_bodies("Inner", "size") == ['    static class Inner {\n        void size(int x) { String s = "}"; }']